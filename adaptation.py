@@ -0,0 +1,98 @@
+"""Adapt workouts to an experience level.
+
+adapt_exercise() holds the sets/reps rules used by /adapt_workout. For
+large batches (e.g. a coach adapting a whole class) adapt_columns() applies
+the same rules as NumPy operations over columns of sets and reps.
+Row-shaped batches stay on the per-dict path: building one dict per
+exercise dominates there, and round-tripping rows through arrays measured
+no faster than the plain loop (see benchmarks/bench_adaptation.py).
+"""
+from itertools import repeat
+
+import numpy as np
+
+BEGINNER = 0
+UNCHANGED = 1
+ADVANCED = 2
+LEVEL_CODES = {'beginner': BEGINNER, 'advanced': ADVANCED}
+# Batches only take integer sets and reps up to this, so both paths apply the same rules
+# and the column path's int64 arrays can't overflow
+MAX_COUNT = 10000
+
+
+def check_counts(values, field):
+    """Raises ValueError unless every value is an integer from 0 to MAX_COUNT."""
+    for value in values:
+        if type(value) is not int or not 0 <= value <= MAX_COUNT:
+            raise ValueError(f"{field} must be integers from 0 to {MAX_COUNT}")
+
+
+def adapt_exercise(exercise, experience_level):
+    adapted_exercise = exercise.copy()
+    if experience_level == 'beginner':
+        adapted_exercise['sets'] = max(1, exercise['sets'] - 1)
+        adapted_exercise['reps'] = max(1, int(exercise['reps'] * 0.8))
+    elif experience_level == 'advanced':
+        adapted_exercise['sets'] = exercise['sets'] + 1
+        adapted_exercise['reps'] = int(exercise['reps'] * 1.2)
+    else:  # Intermediate or default
+        adapted_exercise['sets'] = exercise['sets']
+        adapted_exercise['reps'] = exercise['reps']
+    return adapted_exercise
+
+
+def adapt_workouts(workouts, default_level):
+    """Adapt row-shaped workouts; each may set its own ``experience_level``.
+
+    Raises ValueError unless every workout is an object with a list of
+    exercise objects, each with integer sets and reps (see check_counts).
+    """
+    for workout in workouts:
+        if not isinstance(workout, dict) or not isinstance(workout.get('exercises'), list):
+            raise ValueError('each workout must be an object with a list of exercises')
+        if not all(isinstance(exercise, dict) for exercise in workout['exercises']):
+            raise ValueError('each exercise must be an object')
+        check_counts([exercise['sets'] for exercise in workout['exercises']], 'sets')
+        check_counts([exercise['reps'] for exercise in workout['exercises']], 'reps')
+    adapted_workouts = []
+    for workout in workouts:
+        level = workout.get('experience_level', default_level)
+        exercises = [adapt_exercise(exercise, level) for exercise in workout['exercises']]
+        adapted_workouts.append(dict(workout, exercises=exercises))
+    return adapted_workouts
+
+
+def adapt_sets_reps(sets, reps, levels):
+    """Apply the adaptation rules to integer arrays; ``levels`` holds level codes."""
+    beginner = levels == BEGINNER
+    advanced = levels == ADVANCED
+    new_sets = np.where(beginner, np.maximum(1, sets - 1), np.where(advanced, sets + 1, sets))
+    # astype truncates toward zero, like int() in adapt_exercise
+    new_reps = np.where(
+        beginner, np.maximum(1, (reps * 0.8).astype(np.int64)),
+        np.where(advanced, (reps * 1.2).astype(np.int64), reps)
+    )
+    return new_sets, new_reps
+
+
+def adapt_columns(columns, default_level):
+    """Adapt column-shaped data: equal-length ``sets`` and ``reps`` lists plus an
+    optional per-row ``experience_level`` list. Other columns pass through.
+    """
+    if not isinstance(columns['sets'], list) or not isinstance(columns['reps'], list):
+        raise ValueError('sets and reps must be lists')
+    if len(columns['sets']) != len(columns['reps']):
+        raise ValueError('sets and reps must be lists of the same length')
+    check_counts(columns['sets'], 'sets')
+    check_counts(columns['reps'], 'reps')
+    sets = np.asarray(columns['sets'], dtype=np.int64)
+    reps = np.asarray(columns['reps'], dtype=np.int64)
+    if 'experience_level' in columns:
+        if len(columns['experience_level']) != len(sets):
+            raise ValueError('experience_level must have one entry per row')
+        levels = np.fromiter(map(LEVEL_CODES.get, columns['experience_level'], repeat(UNCHANGED)),
+                             dtype=np.int8, count=len(sets))
+    else:
+        levels = np.full(len(sets), LEVEL_CODES.get(default_level, UNCHANGED), dtype=np.int8)
+    new_sets, new_reps = adapt_sets_reps(sets, reps, levels)
+    return dict(columns, sets=new_sets.tolist(), reps=new_reps.tolist())
@@ -1,14 +1,38 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+from flask import Flask, Response, abort, g, has_app_context, has_request_context, make_response, render_template, request, redirect, session, stream_with_context, url_for, flash, jsonify, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_cors import CORS
-from transformers import pipeline
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from datetime import datetime
+from sqlalchemy import and_, event, func, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session, selectinload
+from werkzeug.utils import safe_join
+from datetime import datetime, timedelta, timezone
+import hmac
+import io
+import math
+import mimetypes
 import os
+import re
+import time
 import logging
 from dotenv import load_dotenv
+from inference import ModelRegistry, MicroBatcher, generation_kwargs, load_text_generator, process_memory
+from caching import TTLCache
+from jobs import Job, JobQueue
+from adaptation import adapt_columns, adapt_exercise, adapt_workouts
+from workout_plans import EXERCISE_DATABASE, FITNESS_GOALS, WorkoutPlanTable
+from passwords import PasswordHashTimeout, PasswordHasher, RateLimiter
+from selection import ExerciseIndex, base_name, media_entry, select_workout
+from progress import empty_best, empty_week, exercise_volume, merge_best, summarize, week_start
+from onboarding import MemberImporter, duplicate_user_message, parse_members
+from metrics import MetricsRegistry
+from idempotency import IDEMPOTENCY_HEADER, IdempotencyKeyReused, idempotent_request, replay
+from export import parse_since, rows_to_columns, stream_csv, write_npz
+from profiling import PROFILE_HEADER, ProfileStore, RequestProfile, verify_profile_token
+from database import WriteQueue, apply_sqlite_pragmas, engine_options, is_sqlite, sqlite_pragmas
+from media import store_upload, generate_image_variants, image_variant_name, image_variant_labels, IMAGE_VARIANT_WIDTHS
+import json
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -24,16 +48,220 @@ CORS(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'default-dev-key')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///fitness.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 5))  # connections kept per process
+app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 10))  # extra connections opened under load
+app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds, below the server's idle timeout
+app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', 30))  # seconds to wait for a free connection
+app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+app.config['SQLITE_JOURNAL_MODE'] = os.getenv('SQLITE_JOURNAL_MODE', 'wal')
+app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'normal')  # 'full' also survives power loss
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # ms a writer waits for the lock
+app.config['SQLITE_WRITE_QUEUE'] = os.getenv('SQLITE_WRITE_QUEUE', 'true').lower() == 'true'  # one writer thread per process
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'],
+    pool_size=app.config['DB_POOL_SIZE'],
+    max_overflow=app.config['DB_MAX_OVERFLOW'],
+    pool_recycle=app.config['DB_POOL_RECYCLE'],
+    pool_timeout=app.config['DB_POOL_TIMEOUT'],
+    pool_pre_ping=app.config['DB_POOL_PRE_PING'],
+    busy_timeout_ms=app.config['SQLITE_BUSY_TIMEOUT']
+)
 app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'static', 'media', 'exercises')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['EXERCISES_PER_PAGE'] = int(os.getenv('EXERCISES_PER_PAGE', 24))
+app.config['MAX_EXERCISES_PER_PAGE'] = 100
+app.config['EXERCISE_LIST_CACHE_TTL'] = int(os.getenv('EXERCISE_LIST_CACHE_TTL', 300))  # seconds
+app.config['MEDIA_WORKERS'] = int(os.getenv('MEDIA_WORKERS', 1))
+app.config['MEDIA_MAX_AGE'] = int(os.getenv('MEDIA_MAX_AGE', 60 * 60))  # seconds, for files without a content hash
+app.config['USE_X_SENDFILE'] = os.getenv('MEDIA_X_SENDFILE', 'false').lower() == 'true'  # Apache/lighttpd
+app.config['MEDIA_ACCEL_REDIRECT_PREFIX'] = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX')  # nginx internal location
+app.config['USER_CACHE_TTL'] = int(os.getenv('USER_CACHE_TTL', 60))  # seconds, 0 disables the cache
+app.config['USER_SESSION_SNAPSHOT'] = os.getenv('USER_SESSION_SNAPSHOT', 'false').lower() == 'true'
+app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))  # 0 hashes inline
+app.config['PASSWORD_HASH_BULK_WORKERS'] = int(os.getenv('PASSWORD_HASH_BULK_WORKERS', 1))  # for member imports, 0 hashes inline
+app.config['LOGIN_ATTEMPTS_PER_USERNAME'] = int(os.getenv('LOGIN_ATTEMPTS_PER_USERNAME', 10))  # 0 disables the limit
+app.config['LOGIN_ATTEMPT_WINDOW'] = int(os.getenv('LOGIN_ATTEMPT_WINDOW', 5 * 60))  # seconds
+app.config['ONBOARDING_API_TOKEN'] = os.getenv('ONBOARDING_API_TOKEN')  # unset disables POST /onboard_members
+app.config['ONBOARDING_SYNC_LIMIT'] = int(os.getenv('ONBOARDING_SYNC_LIMIT', 20))  # larger rosters are imported as a job
+app.config['MAX_WORKOUTS_PER_BATCH'] = int(os.getenv('MAX_WORKOUTS_PER_BATCH', 500))
+app.config['IDEMPOTENCY_KEY_TTL'] = int(os.getenv('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))  # seconds a retry is recognised
+app.config['IDEMPOTENCY_CACHE_SIZE'] = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 4096))  # recent keys held per process
+app.config['WORKOUT_APPEND_WINDOW'] = int(os.getenv('WORKOUT_APPEND_WINDOW', 12 * 60 * 60))  # seconds a workout takes appends
+app.config['EXPORT_API_TOKEN'] = os.getenv('EXPORT_API_TOKEN')  # unset disables the /export endpoints
+app.config['EXPORT_PAGE_SIZE'] = int(os.getenv('EXPORT_PAGE_SIZE', 5000))  # rows per query and per .npz chunk
+app.config['HISTORY_PER_PAGE'] = int(os.getenv('HISTORY_PER_PAGE', 20))
+app.config['MAX_HISTORY_PER_PAGE'] = 100
+app.config['PROGRESS_WEEKS'] = int(os.getenv('PROGRESS_WEEKS', 12))  # weeks of volume shown on the dashboard
+app.config['PERSONALIZED_WORKOUTS'] = os.getenv('PERSONALIZED_WORKOUTS', 'true').lower() == 'true'  # false serves the fixed plans
+app.config['EXERCISE_INDEX_MAX_AGE'] = int(os.getenv('EXERCISE_INDEX_MAX_AGE', 300))  # seconds, picks up other workers' changes
+app.config['EXERCISE_HISTORY_CACHE_TTL'] = int(os.getenv('EXERCISE_HISTORY_CACHE_TTL', 300))  # seconds
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')  # unset leaves /metrics open, e.g. behind a private network
+app.config['PROFILE_REQUESTS'] = os.getenv('PROFILE_REQUESTS', 'false').lower() == 'true'  # profile every request
+app.config['PROFILE_SECRET'] = os.getenv('PROFILE_SECRET')  # signs X-Profile headers that profile a single request
+app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR', os.path.join(app.root_path, 'profiles'))
+app.config['PROFILE_KEEP'] = int(os.getenv('PROFILE_KEEP', 200))  # newest profiles kept on disk
+app.config['PROFILE_ALLOCATIONS'] = os.getenv('PROFILE_ALLOCATIONS', 'true').lower() == 'true'  # also run tracemalloc
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'webm'}
 
+# AI model configuration
+app.config['HEALTH_TIP_MODEL'] = os.getenv('HEALTH_TIP_MODEL', 'gpt2-medium')  # or e.g. distilgpt2 for smaller workers
+app.config['HEALTH_TIP_QUANTIZE'] = os.getenv('HEALTH_TIP_QUANTIZE', 'false').lower() == 'true'  # int8 dynamic quantization
+app.config['HEALTH_TIP_MAX_LENGTH'] = int(os.getenv('HEALTH_TIP_MAX_LENGTH', 100))  # tokens, prompt included
+app.config['HEALTH_TIP_MAX_NEW_TOKENS'] = int(os.getenv('HEALTH_TIP_MAX_NEW_TOKENS', 0))  # overrides MAX_LENGTH when > 0
+app.config['INFERENCE_THREADS'] = int(os.getenv('INFERENCE_THREADS', 0))  # torch threads per process, 0 uses all cores
+app.config['PRELOAD_MODELS'] = os.getenv('PRELOAD_MODELS', 'false').lower() == 'true'
+app.config['HEALTH_TIP_BATCH_SIZE'] = int(os.getenv('HEALTH_TIP_BATCH_SIZE', 8))
+app.config['HEALTH_TIP_BATCH_WAIT_MS'] = float(os.getenv('HEALTH_TIP_BATCH_WAIT_MS', 10))
+app.config['HEALTH_TIP_CACHE_SIZE'] = int(os.getenv('HEALTH_TIP_CACHE_SIZE', 512))
+app.config['HEALTH_TIP_CACHE_TTL'] = int(os.getenv('HEALTH_TIP_CACHE_TTL', 24 * 60 * 60))  # seconds
+app.config['HEALTH_TIP_AGE_BUCKET'] = int(os.getenv('HEALTH_TIP_AGE_BUCKET', 10))  # years, 1 disables bucketing
+app.config['WORKOUT_JOB_WORKERS'] = int(os.getenv('WORKOUT_JOB_WORKERS', 2))
+app.config['WORKOUT_JOB_TTL'] = int(os.getenv('WORKOUT_JOB_TTL', 600))  # seconds
+app.config['WORKOUT_JOB_STREAM_TIMEOUT'] = int(os.getenv('WORKOUT_JOB_STREAM_TIMEOUT', 120))  # seconds
+app.config['HEALTH_TIP_CACHE_FILE'] = os.getenv('HEALTH_TIP_CACHE_FILE', os.path.join(app.root_path, 'health_tips.json'))
+
 # Initialize extensions
 db = SQLAlchemy(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# WAL, synchronous and busy_timeout are per connection, so they are set on every new SQLite connection
+sqlite_connection_pragmas = sqlite_pragmas(app.config['SQLITE_JOURNAL_MODE'], app.config['SQLITE_SYNCHRONOUS'],
+                                           app.config['SQLITE_BUSY_TIMEOUT'])
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection, sqlite_connection_pragmas)
+
+# SQLite has a single write lock; workout writes take turns on one thread instead of contending for it
+write_queue = WriteQueue(app)
+
+def run_write(fn, *args, **kwargs):
+    if app.config['SQLITE_WRITE_QUEUE'] and is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        # Give the request's pooled connection back first: with every request thread holding one
+        # while it waits, the writer could be left without a connection of its own
+        db.session.close()
+        if has_request_context() and 'sql_queries' in g:
+            return write_queue.run(counted_for_request(fn, metrics_endpoint_label()), *args, **kwargs)
+        return write_queue.run(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+def counted_for_request(fn, endpoint):
+    """Wrap ``fn`` so the SQL it runs on the writer thread counts towards the calling request."""
+    request_g = g._get_current_object()
+
+    def counted(*args, **kwargs):
+        g.metrics_endpoint = endpoint
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # The request thread is blocked until this returns, so its g isn't updated concurrently
+            request_g.sql_queries += g.sql_queries
+            request_g.sql_seconds += g.sql_seconds
+    return counted
+
+# Password hashing runs in a process pool bounded to PASSWORD_HASH_WORKERS cores. The pools belong to this
+# process: under gunicorn every worker has its own, so the machine-wide budget is WORKERS times as large
+password_hasher = PasswordHasher(app.config['PASSWORD_HASH_METHOD'], max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                                 bulk_workers=app.config['PASSWORD_HASH_BULK_WORKERS'])
+login_limiter = RateLimiter(app.config['LOGIN_ATTEMPTS_PER_USERNAME'], app.config['LOGIN_ATTEMPT_WINDOW'])
+
+# Metrics for /metrics. A slow request can be attributed to its SQL (sql_* by endpoint),
+# the model (health_tip_inference_seconds) or the job queues (job_wait_seconds)
+metrics = MetricsRegistry()
+requests_total = metrics.counter('http_requests_total', 'Requests by endpoint and status', ('endpoint', 'method', 'status'))
+request_seconds = metrics.histogram('http_request_duration_seconds', 'Request latency by endpoint', ('endpoint', 'method'))
+request_sql_queries = metrics.histogram('http_request_sql_queries', 'SQL statements per request', ('endpoint',),
+                                        buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+request_sql_seconds = metrics.histogram('http_request_sql_seconds', 'Time per request spent in SQL', ('endpoint',))
+sql_queries_total = metrics.counter('sql_queries_total', 'SQL statements executed', ('endpoint',))
+sql_seconds_total = metrics.counter('sql_query_seconds_total', 'Seconds spent executing SQL statements', ('endpoint',))
+inference_seconds = metrics.histogram('health_tip_inference_seconds', 'Model time per batch of health-tip prompts',
+                                      buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+inference_prompts_total = metrics.counter('health_tip_prompts_total', 'Prompts run through the health-tip model')
+job_wait_seconds = metrics.histogram('job_wait_seconds', 'Time jobs spent queued before a worker picked them up', ('queue',))
+job_run_seconds = metrics.histogram('job_run_seconds', 'Time jobs spent running', ('queue', 'status'))
+uploads_total = metrics.counter('uploads_total', 'Uploaded media files; stored="false" for duplicates', ('kind', 'stored'))
+upload_bytes_total = metrics.counter('upload_bytes_total', 'Bytes of uploaded media', ('kind',))
+
+def metrics_endpoint_label():
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    # Writes a request handed to the writer thread are labelled with its endpoint (see run_write)
+    return g.get('metrics_endpoint', 'background') if has_app_context() else 'background'
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = metrics_endpoint_label()
+        request_seconds.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+        request_sql_queries.observe(g.sql_queries, endpoint=endpoint)
+        request_sql_seconds.observe(g.sql_seconds, endpoint=endpoint)
+        requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+# Opt-in per-request profiles (see profiling.py); without the flag or header this is one lookup per request
+def profile_store():
+    return ProfileStore(app.config['PROFILE_DIR'], keep=app.config['PROFILE_KEEP'])
+
+def profile_header_valid():
+    return verify_profile_token(app.config['PROFILE_SECRET'], request.headers.get(PROFILE_HEADER))
+
+@app.before_request
+def start_request_profile():
+    if app.config['PROFILE_REQUESTS'] or (PROFILE_HEADER in request.headers and profile_header_valid()):
+        g.request_profile = RequestProfile(trace_allocations=app.config['PROFILE_ALLOCATIONS']).start()
+
+@app.after_request
+def save_request_profile(response):
+    profile = g.pop('request_profile', None)
+    if profile is not None:
+        profile.stop()
+        summary = profile_store().save(profile, endpoint=request.endpoint, method=request.method,
+                                       path=request.full_path.rstrip('?'), status=response.status_code)
+        response.headers['X-Profile-Name'] = summary['name']
+    return response
+
+# Statements on one connection run one at a time, so a single start time per connection is enough
+@event.listens_for(Engine, 'before_cursor_execute')
+def sql_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def sql_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('query_started', time.perf_counter())
+    endpoint = metrics_endpoint_label()
+    sql_queries_total.inc(endpoint=endpoint)
+    sql_seconds_total.inc(elapsed, endpoint=endpoint)
+    if has_app_context() and 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_seconds += elapsed
+
+def job_metrics(queue):
+    def record(job, waited, ran):
+        job_wait_seconds.observe(waited, queue=queue)
+        job_run_seconds.observe(ran, queue=queue, status=job.status)
+    return record
+
+def record_inference(seconds, batch_size):
+    inference_seconds.observe(seconds)
+    inference_prompts_total.inc(batch_size)
+
+def record_upload(kind, filename, created):
+    uploads_total.inc(kind=kind, stored=str(created).lower())
+    upload_bytes_total.inc(os.path.getsize(os.path.join(app.config['UPLOAD_FOLDER'], kind, filename)), kind=kind)
+
 # Models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -46,28 +274,119 @@ class User(UserMixin, db.Model):
     experience_level = db.Column(db.String(50), nullable=False)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
 
     workouts = db.relationship('Workout', backref='user', lazy=True)
 
 class Workout(db.Model):
+    # Per-user history is always read newest first
+    __table_args__ = (db.Index('ix_workout_user_id_date', 'user_id', 'date'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     exercises = db.relationship('Exercise', backref='workout', lazy=True)
 
+    def to_dict(self):
+        exercises = [{
+            'name': exercise.name,
+            'sets': exercise.sets,
+            'reps': exercise.reps,
+            'weight': exercise.weight
+        } for exercise in self.exercises]
+        return {
+            'id': self.id,
+            'date': self.date.isoformat(),
+            'exercises': exercises,
+            'volume': sum(exercise_volume(e['sets'], e['reps'], e['weight']) for e in exercises)
+        }
+
 class Exercise(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    workout_id = db.Column(db.Integer, db.ForeignKey('workout.id'), nullable=False)
+    workout_id = db.Column(db.Integer, db.ForeignKey('workout.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     sets = db.Column(db.Integer)
     reps = db.Column(db.Integer)
     weight = db.Column(db.Float)
 
+# Progress summaries, maintained as workouts are logged (see update_progress)
+class WeeklyVolume(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'week_start', name='uq_weekly_volume_user_week'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    week_start = db.Column(db.Date, nullable=False)  # Monday
+    workouts = db.Column(db.Integer, nullable=False, default=0)
+    sets = db.Column(db.Integer, nullable=False, default=0)
+    reps = db.Column(db.Integer, nullable=False, default=0)  # sets x reps
+    volume = db.Column(db.Float, nullable=False, default=0)  # sets x reps x weight
+
+    def to_dict(self):
+        return {
+            'week_start': self.week_start.isoformat(),
+            'workouts': self.workouts,
+            'sets': self.sets,
+            'reps': self.reps,
+            'volume': self.volume
+        }
+
+class PersonalBest(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'exercise_name', name='uq_personal_best_user_exercise'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    exercise_name = db.Column(db.String(100), nullable=False)
+    max_weight = db.Column(db.Float, nullable=False, default=0)
+    max_reps = db.Column(db.Integer, nullable=False, default=0)
+    max_volume = db.Column(db.Float, nullable=False, default=0)
+    last_performed = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'exercise': self.exercise_name,
+            'max_weight': self.max_weight,
+            'max_reps': self.max_reps,
+            'max_volume': self.max_volume,
+            'last_performed': self.last_performed.isoformat() if self.last_performed else None
+        }
+
+# Idempotency keys of recent workout writes with their results, see idempotency.py
+class IdempotencyKey(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_key_user_key'),
+        db.Index('ix_idempotency_key_created_at', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    endpoint = db.Column(db.String(64), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # SHA-256 of the request
+    result = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Workout jobs, so a poll reaching another worker process finds them, see jobs.py
+class BackgroundJob(db.Model):
+    __table_args__ = (db.Index('ix_background_job_expires_at', 'expires_at'),)
+
+    id = db.Column(db.String(32), primary_key=True)
+    queue = db.Column(db.String(32), nullable=False)
+    owner_id = db.Column(db.Integer)  # None for jobs started with a partner token
+    status = db.Column(db.String(16), nullable=False)
+    result = db.Column(db.Text, nullable=False)  # JSON
+    error = db.Column(db.Text)
+    version = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
 class ExerciseMedia(db.Model):
+    __table_args__ = (
+        db.Index('ix_exercise_media_category_difficulty', 'category', 'difficulty'),
+        db.Index('ix_exercise_media_difficulty', 'difficulty'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -82,21 +401,123 @@ class ExerciseMedia(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'image_url': url_for('static', filename=f'media/exercises/images/{self.image_filename}') if self.image_filename else None,
-            'video_url': url_for('static', filename=f'media/exercises/videos/{self.video_filename}') if self.video_filename else None,
+            'image_url': url_for('media_file', kind='images', filename=self.image_filename) if self.image_filename else None,
+            'video_url': url_for('media_file', kind='videos', filename=self.video_filename) if self.video_filename else None,
+            'image_variants': image_variant_urls(self.image_filename) if self.image_filename else {},
             'category': self.category,
             'difficulty': self.difficulty
         }
 
+# Thumbnails and resized copies written by the media pipeline, keyed by label ('thumb', '480w', ...)
+def image_variant_urls(image_filename):
+    variants_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'images', 'variants')
+    urls = {}
+    for label in image_variant_labels():
+        name = image_variant_name(image_filename, label)
+        if os.path.exists(os.path.join(variants_dir, name)):
+            urls[label] = url_for('media_file', kind='variants', filename=name)
+    return urls
+
+def image_srcset(variants):
+    return ', '.join(f"{variants[f'{width}w']} {width}w" for width in IMAGE_VARIANT_WIDTHS if f'{width}w' in variants)
+
+app.jinja_env.filters['srcset'] = image_srcset
+
+# Media folders under UPLOAD_FOLDER that /media serves
+MEDIA_KINDS = {
+    'images': 'images',
+    'videos': 'videos',
+    'variants': os.path.join('images', 'variants')
+}
+# Uploads are named after their SHA-256, so their URLs never change content
+HASHED_MEDIA_NAME = re.compile(r'^[0-9a-f]{64}(-\w+)?\.\w+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+@app.route('/media/<kind>/<filename>')
+def media_file(kind, filename):
+    if kind not in MEDIA_KINDS:
+        abort(404)
+    directory = os.path.join(app.config['UPLOAD_FOLDER'], MEDIA_KINDS[kind])
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    hashed = HASHED_MEDIA_NAME.match(filename) is not None
+
+    accel_prefix = app.config['MEDIA_ACCEL_REDIRECT_PREFIX']
+    if accel_prefix:
+        # nginx streams the bytes (including Range requests) from an internal location
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{MEDIA_KINDS[kind]}/{filename}"
+    else:
+        # conditional=True answers Range and If-None-Match requests with 206/304
+        response = send_from_directory(
+            directory, filename, conditional=True,
+            etag=filename.rsplit('.', 1)[0] if hashed else True,
+            max_age=IMMUTABLE_MAX_AGE if hashed else app.config['MEDIA_MAX_AGE']
+        )
+
+    response.cache_control.public = True
+    if hashed:
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = app.config['MEDIA_MAX_AGE']
+    return response
+
 # Helper function to check if a file has an allowed extension
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def exercise_page(category, difficulty, after, limit):
+    # Keyset pagination: fetch one extra row to know whether there is a next page
+    query = ExerciseMedia.query
+    if category:
+        query = query.filter_by(category=category)
+    if difficulty:
+        query = query.filter_by(difficulty=difficulty)
+    if after:
+        query = query.filter(ExerciseMedia.id > after)
+    rows = query.order_by(ExerciseMedia.id).limit(limit + 1).all()
+    next_after = rows[limit - 1].id if len(rows) > limit else None
+    return [ex.to_dict() for ex in rows[:limit]], next_after
+
+def exercise_list_args():
+    limit = request.args.get('limit', app.config['EXERCISES_PER_PAGE'], type=int)
+    return (
+        request.args.get('category') or None,
+        request.args.get('difficulty') or None,
+        request.args.get('after', type=int),
+        max(1, min(limit, app.config['MAX_EXERCISES_PER_PAGE']))
+    )
+
+# Rendered exercise pages, cleared whenever the catalog changes
+exercise_list_cache = TTLCache(maxsize=256, ttl=app.config['EXERCISE_LIST_CACHE_TTL'])
+
 # Route to list all exercises
 @app.route('/exercises', methods=['GET'])
 def list_exercises():
-    exercises = ExerciseMedia.query.all()
-    return render_template('exercises.html', exercises=[ex.to_dict() for ex in exercises])
+    category, difficulty, after, limit = exercise_list_args()
+    key = ('html', category, difficulty, after, limit)
+    cached = exercise_list_cache.get(key)
+    if cached is None:
+        exercises, next_after = exercise_page(category, difficulty, after, limit)
+        # Only the user-independent card grid is cached; the page chrome depends on the session
+        cached = (render_template('_exercise_cards.html', exercises=exercises), next_after)
+        exercise_list_cache.set(key, cached)
+    exercise_cards, next_after = cached
+    return render_template('exercises.html', exercise_cards=exercise_cards, next_after=next_after,
+                           category=category, difficulty=difficulty)
+
+@app.route('/exercises.json', methods=['GET'])
+def list_exercises_json():
+    category, difficulty, after, limit = exercise_list_args()
+    key = ('json', category, difficulty, after, limit)
+    cached = exercise_list_cache.get(key)
+    if cached is None:
+        exercises, next_after = exercise_page(category, difficulty, after, limit)
+        cached = {'exercises': exercises, 'next_after': next_after}
+        exercise_list_cache.set(key, cached)
+    return jsonify(cached)
 
 # Route to view an exercise
 @app.route('/exercises/<int:id>', methods=['GET'])
@@ -104,6 +525,16 @@ def view_exercise(id):
     exercise = ExerciseMedia.query.get_or_404(id)
     return render_template('exercise_detail.html', exercise=exercise.to_dict())
 
+# Thumbnails and responsive variants are generated off the request path
+media_jobs = JobQueue(max_workers=app.config['MEDIA_WORKERS'], on_finish=job_metrics('media'))
+
+def process_image_upload(image_filename):
+    images_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'images')
+    variants = generate_image_variants(os.path.join(images_dir, image_filename), os.path.join(images_dir, 'variants'))
+    # Cached listings were rendered without the new thumbnails
+    exercise_list_cache.clear()
+    return {'variants': variants}
+
 # Route to create a new exercise
 @app.route('/exercises/new', methods=['GET', 'POST'])
 @login_required
@@ -115,19 +546,21 @@ def new_exercise():
             category = request.form.get('category')
             difficulty = request.form.get('difficulty')
 
-            # Handle image upload
+            # Handle image upload; identical files are stored once under their content hash
             image_file = request.files.get('image')
             image_filename = None
             if image_file and allowed_file(image_file.filename):
-                image_filename = secure_filename(image_file.filename)
-                image_file.save(os.path.join(app.config['UPLOAD_FOLDER'], 'images', image_filename))
+                image_filename, image_created = store_upload(image_file, os.path.join(app.config['UPLOAD_FOLDER'], 'images'))
+                record_upload('images', image_filename, image_created)
+                if image_created:
+                    media_jobs.submit(media_jobs.create(current_user.id), process_image_upload, image_filename)
 
             # Handle video upload
             video_file = request.files.get('video')
             video_filename = None
             if video_file and allowed_file(video_file.filename):
-                video_filename = secure_filename(video_file.filename)
-                video_file.save(os.path.join(app.config['UPLOAD_FOLDER'], 'videos', video_filename))
+                video_filename, video_created = store_upload(video_file, os.path.join(app.config['UPLOAD_FOLDER'], 'videos'))
+                record_upload('videos', video_filename, video_created)
 
             exercise = ExerciseMedia(
                 name=name,
@@ -140,6 +573,7 @@ def new_exercise():
 
             db.session.add(exercise)
             db.session.commit()
+            exercise_list_cache.clear()
             flash('Exercise created successfully!', 'success')
             return redirect(url_for('list_exercises'))
         except Exception as e:
@@ -150,117 +584,288 @@ def new_exercise():
 
     return render_template('exercise_form.html')
 
-# Exercise database organized by categories
-EXERCISE_DATABASE = {
-    'cardio': [
-        {'name': 'Jumping Jacks', 'sets': 3, 'reps': 20, 'description': 'Full body cardio exercise'},
-        {'name': 'Burpees', 'sets': 3, 'reps': 10, 'description': 'High-intensity full body movement'}
-    ],
-    'bodyweight': [
-        {'name': 'Push-ups', 'sets': 3, 'reps': 12, 'description': 'Upper body strength exercise'},
-        {'name': 'Squats', 'sets': 3, 'reps': 15, 'description': 'Lower body compound movement'}
-    ],
-    'strength': [
-        {'name': 'Dumbbell Rows', 'sets': 3, 'reps': 12, 'description': 'Back strength exercise'},
-        {'name': 'Shoulder Press', 'sets': 3, 'reps': 10, 'description': 'Upper body pushing movement'}
-    ],
-    'flexibility': [
-        {'name': 'Forward Fold', 'sets': 1, 'reps': 30, 'description': 'Hamstring and lower back stretch'},
-        {'name': 'Cat-Cow Stretch', 'sets': 1, 'reps': 10, 'description': 'Spine mobility exercise'}
-    ]
-}
+# Call workout_plan_table.rebuild() after changing EXERCISE_DATABASE
+workout_plan_table = WorkoutPlanTable(EXERCISE_DATABASE)
+
+# Built-in and catalog exercises by (category, difficulty) for personalized plans. Catalog
+# changes are applied entry by entry once committed; a full reload only happens every
+# EXERCISE_INDEX_MAX_AGE seconds, to pick up changes made by other processes
+exercise_index = ExerciseIndex(EXERCISE_DATABASE, max_age=app.config['EXERCISE_INDEX_MAX_AGE'])
+
+def current_exercise_index():
+    if exercise_index.needs_rebuild():
+        exercise_index.rebuild(ExerciseMedia.query.all())
+    return exercise_index
+
+@event.listens_for(ExerciseMedia, 'after_insert')
+@event.listens_for(ExerciseMedia, 'after_update')
+def exercise_media_saved(mapper, connection, target):
+    object_session(target).info.setdefault('exercise_index_changes', []).append(('upsert', media_entry(target)))
+
+@event.listens_for(ExerciseMedia, 'after_delete')
+def exercise_media_deleted(mapper, connection, target):
+    object_session(target).info.setdefault('exercise_index_changes', []).append(('remove', ('media', target.id)))
+
+@event.listens_for(Session, 'after_commit')
+def apply_exercise_index_changes(db_session):
+    for action, value in db_session.info.pop('exercise_index_changes', []):
+        if action == 'upsert':
+            exercise_index.upsert(value)
+        else:
+            exercise_index.remove(value)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_exercise_index_changes(db_session):
+    db_session.info.pop('exercise_index_changes', None)
+
+# Personal bests by exercise name, cleared whenever the user logs a workout
+exercise_history_cache = TTLCache(maxsize=4096, ttl=app.config['EXERCISE_HISTORY_CACHE_TTL'])
+
+def exercise_history(user_id):
+    if user_id is None:
+        return {}
+    history = exercise_history_cache.get(user_id)
+    if history is None:
+        history = {}
+        # Logged names carry the plan's warm-up/cool-down prefixes; fold them into one entry
+        for row in PersonalBest.query.filter_by(user_id=user_id):
+            best = history.setdefault(base_name(row.exercise_name), empty_best())
+            merge_best(best, row.max_weight, row.max_reps, row.max_volume, row.last_performed)
+        exercise_history_cache.set(user_id, history)
+    return history
+
+class UserSnapshot(UserMixin):
+    # Read-only copy of the User columns request handlers use, safe to share between requests
+    FIELDS = ('id', 'username', 'email', 'age', 'weight', 'fitness_goal', 'experience_level')
+
+    def __init__(self, **fields):
+        for field in self.FIELDS:
+            setattr(self, field, fields[field])
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(**{field: getattr(user, field) for field in cls.FIELDS})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+# Authenticated requests are served from here instead of a SELECT per request
+user_cache = TTLCache(maxsize=4096)
+
+def invalidate_cached_user(user_id):
+    user_cache.pop(user_id)
+    snapshot = session.get('_user_snapshot') if has_request_context() else None
+    if snapshot and snapshot.get('id') == user_id:
+        session.pop('_user_snapshot')
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def user_changed(mapper, connection, target):
+    invalidate_cached_user(target.id)
+
+def session_user_snapshot(user_id):
+    # The session cookie is signed, so the copy stored at load time can be trusted until it expires.
+    # Returns (snapshot, seconds left) or None
+    snapshot = session.get('_user_snapshot')
+    if not snapshot or snapshot.get('id') != user_id:
+        return None
+    remaining = snapshot.get('cached_at', 0) + app.config['USER_CACHE_TTL'] - time.time()
+    if remaining <= 0:
+        return None
+    return UserSnapshot(**snapshot), remaining
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    ttl = app.config['USER_CACHE_TTL']
+    if ttl <= 0:
+        return User.query.get(user_id)
 
-def get_ai_workout(user):
-    # Initialize the text generation pipeline with API key
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    if app.config['USER_SESSION_SNAPSHOT']:
+        cached = session_user_snapshot(user_id)
+        if cached is not None:
+            # Expire the process copy together with the session copy
+            snapshot, ttl = cached
+    if snapshot is None:
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        if app.config['USER_SESSION_SNAPSHOT']:
+            session['_user_snapshot'] = dict(snapshot.to_dict(), cached_at=time.time())
+    user_cache.set(user_id, snapshot, ttl=ttl)
+    return snapshot
+
+def load_health_tip_generator():
     api_key = os.getenv('HUGGINGFACE_API_KEY')
-    if not api_key:
-        raise ValueError("Hugging Face API key not found. Please set HUGGINGFACE_API_KEY in your .env file")
-    
-    generator = pipeline('text-generation', model='gpt2-medium', token=api_key)
-    
-    # Select exercises based on user's profile
-    workout_exercises = []
-    
-    # Add warm-up exercises
-    warm_up = EXERCISE_DATABASE['cardio'][:3]  # Select first 3 warm-up exercises
-    for exercise in warm_up:
-        workout_exercises.append({
-            'name': f" Warm-up: {exercise['name']}",
-            'sets': exercise['sets'],
-            'reps': exercise['reps']
-        })
-    
-    # Select main exercises based on fitness goal
-    if user.fitness_goal.lower() == 'weight_loss':
-        # Focus on cardio and bodyweight
-        main_exercises = (
-            EXERCISE_DATABASE['cardio'][:2] +  # 2 cardio exercises
-            EXERCISE_DATABASE['bodyweight'][:2] +  # 2 bodyweight exercises
-            EXERCISE_DATABASE['flexibility'][:1]  # 1 flexibility exercise
-        )
-    elif user.fitness_goal.lower() == 'muscle_gain':
-        # Focus on strength and bodyweight
-        main_exercises = (
-            EXERCISE_DATABASE['strength'][:3] +  # 3 strength exercises
-            EXERCISE_DATABASE['bodyweight'][:1] +  # 1 bodyweight exercise
-            EXERCISE_DATABASE['flexibility'][:1]  # 1 flexibility exercise
-        )
-    else:  # maintenance
-        # Balanced mix
-        main_exercises = (
-            EXERCISE_DATABASE['cardio'][:1] +  # 1 cardio exercise
-            EXERCISE_DATABASE['bodyweight'][:2] +  # 2 bodyweight exercises
-            EXERCISE_DATABASE['strength'][:1] +  # 1 strength exercise
-            EXERCISE_DATABASE['flexibility'][:1]  # 1 flexibility exercise
-        )
-    
-    # Adjust sets and reps based on experience level
-    for exercise in main_exercises:
-        adjusted_exercise = exercise.copy()
-        if user.experience_level.lower() == 'beginner':
-            adjusted_exercise['sets'] = min(exercise['sets'], 2)
-            adjusted_exercise['reps'] = int(exercise['reps'] * 0.7)
-        elif user.experience_level.lower() == 'advanced':
-            adjusted_exercise['sets'] = exercise['sets'] + 1
-            adjusted_exercise['reps'] = int(exercise['reps'] * 1.3)
-        
-        workout_exercises.append(adjusted_exercise)
-    
-    # Add cool-down exercises
-    cool_down = EXERCISE_DATABASE['flexibility'][:3]  # Select first 3 cool-down exercises
-    for exercise in cool_down:
-        workout_exercises.append({
-            'name': f"Cool-down: {exercise['name']}",
-            'sets': exercise['sets'],
-            'reps': exercise['reps']
-        })
-    
-    # Generate a health tip using AI
-    prompt = f"""As a fitness trainer, give a short health tip for a {user.age} year old person with {user.fitness_goal} goal."""
-    try:
-        tip_response = generator(prompt, max_length=100, num_return_sequences=1)[0]['generated_text']
+    return load_text_generator(app.config['HEALTH_TIP_MODEL'], token=api_key,
+                               quantize=app.config['HEALTH_TIP_QUANTIZE'], threads=app.config['INFERENCE_THREADS'])
+
+# Models are loaded once per process and shared by all request threads
+model_registry = ModelRegistry()
+model_registry.register('health_tip', load_health_tip_generator)
+
+# Concurrent health-tip prompts are run through the model as one padded batch
+tip_batcher = MicroBatcher(
+    lambda: model_registry.get('health_tip'),
+    max_batch_size=app.config['HEALTH_TIP_BATCH_SIZE'],
+    max_wait_ms=app.config['HEALTH_TIP_BATCH_WAIT_MS'],
+    on_batch=record_inference,
+    **generation_kwargs(app.config['HEALTH_TIP_MAX_LENGTH'], app.config['HEALTH_TIP_MAX_NEW_TOKENS'])
+)
+
+# Generated tips only depend on the age bracket and fitness goal
+HEALTH_TIP_AGES = range(10, 100)
+DEFAULT_HEALTH_TIP = "Remember to stay hydrated and maintain proper form throughout your workout."
+tip_cache = TTLCache(maxsize=app.config['HEALTH_TIP_CACHE_SIZE'], ttl=app.config['HEALTH_TIP_CACHE_TTL'])
+
+def health_tip_key(age, fitness_goal):
+    bucket = app.config['HEALTH_TIP_AGE_BUCKET']
+    if bucket > 1:
+        age = age // bucket * bucket
+    return (age, (fitness_goal or 'maintenance').strip().lower())
+
+def health_tip_prompt(key):
+    age, fitness_goal = key
+    bucket = app.config['HEALTH_TIP_AGE_BUCKET']
+    age_text = f"{age}-{age + bucket - 1}" if bucket > 1 else str(age)
+    return f"""As a fitness trainer, give a short health tip for a {age_text} year old person with {fitness_goal} goal."""
+
+def get_health_tip(age, fitness_goal):
+    key = health_tip_key(age, fitness_goal)
+    tip = tip_cache.get(key)
+    if tip is None:
+        tip_response = tip_batcher.generate(health_tip_prompt(key))
         # Extract a reasonable tip from the response
         tip = tip_response.split('\n')[0][:100]  # Take first line, limit to 100 chars
-        workout_exercises.append({
+        tip_cache.set(key, tip)
+    return tip
+
+def prewarm_tip_cache():
+    # Generate a tip for every goal/age bucket so workers never wait on the model
+    keys = sorted({health_tip_key(age, goal) for goal in FITNESS_GOALS for age in HEALTH_TIP_AGES})
+    for age, goal in keys:
+        get_health_tip(age, goal)
+    return len(keys)
+
+def save_tip_cache(path=None):
+    path = path or app.config['HEALTH_TIP_CACHE_FILE']
+    entries = [[age, goal, tip] for (age, goal), tip in tip_cache.items()]
+    with open(path, 'w') as f:
+        json.dump({'age_bucket': app.config['HEALTH_TIP_AGE_BUCKET'], 'tips': entries}, f, indent=2)
+    return len(entries)
+
+def load_tip_cache(path=None):
+    path = path or app.config['HEALTH_TIP_CACHE_FILE']
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        data = json.load(f)
+    # Tips generated for a different bracket size don't line up with our keys
+    if data.get('age_bucket') != app.config['HEALTH_TIP_AGE_BUCKET']:
+        logger.warning(f"Ignoring {path}: generated for a different age bucket")
+        return 0
+    for age, goal, tip in data['tips']:
+        tip_cache.set((age, goal), tip)
+    return len(data['tips'])
+
+def build_workout_plan(user):
+    if app.config['PERSONALIZED_WORKOUTS']:
+        return select_workout(current_exercise_index(), user.fitness_goal, user.experience_level,
+                              exercise_history(user.id))
+    # Fixed plans are precomputed for every goal/level combination
+    return workout_plan_table.get(user.fitness_goal, user.experience_level)
+
+def health_tip_exercise(age, fitness_goal):
+    # Generate a health tip using AI
+    try:
+        tip = get_health_tip(age, fitness_goal)
+        return {
             'name': f"Health Tip: {tip}",
             'sets': 0,
             'reps': 0
-        })
+        }
     except Exception as e:
         print(f"Error generating health tip: {str(e)}")
         # Add a default tip
-        workout_exercises.append({
-            'name': "Health Tip: Remember to stay hydrated and maintain proper form throughout your workout.",
+        return {
+            'name': f"Health Tip: {DEFAULT_HEALTH_TIP}",
             'sets': 0,
             'reps': 0
-        })
+        }
+
+def get_ai_workout(user):
+    # The text generation pipeline needs the API key
+    api_key = os.getenv('HUGGINGFACE_API_KEY')
+    if not api_key:
+        raise ValueError("Hugging Face API key not found. Please set HUGGINGFACE_API_KEY in your .env file")
     
+    # Fail fast if the model can't be loaded so the caller falls back to a basic workout
+    if health_tip_key(user.age, user.fitness_goal) not in tip_cache:
+        model_registry.get('health_tip')
+    
+    workout_exercises = build_workout_plan(user)
+    workout_exercises.append(health_tip_exercise(user.age, user.fitness_goal))
     return workout_exercises
 
+class DatabaseJobStore:
+    """Keeps jobs in the background_job table for JobQueue.
+
+    Saves come from job threads and from the middle of requests, so they use
+    connections of their own rather than db.session.
+    """
+
+    def __init__(self, queue, ttl):
+        self.queue = queue
+        self.ttl = ttl
+        self.table = BackgroundJob.__table__
+
+    def _values(self, job):
+        return {'owner_id': job.owner_id, 'status': job.status, 'result': json.dumps(job.result),
+                'error': job.error, 'version': job.version,
+                'expires_at': datetime.utcnow() + timedelta(seconds=self.ttl)}
+
+    def add(self, job):
+        with db.engine.begin() as connection:
+            connection.execute(self.table.delete().where(self.table.c.expires_at < datetime.utcnow()))
+            connection.execute(self.table.insert().values(id=job.id, queue=self.queue, **self._values(job)))
+
+    def save(self, job):
+        with db.engine.begin() as connection:
+            connection.execute(self.table.update().where(self.table.c.id == job.id).values(**self._values(job)))
+
+    def load(self, job_id):
+        with db.engine.connect() as connection:
+            row = connection.execute(self.table.select().where(
+                self.table.c.id == job_id, self.table.c.queue == self.queue,
+                self.table.c.expires_at >= datetime.utcnow()
+            )).first()
+        if row is None:
+            return None
+        return Job.restore(row.id, row.owner_id, row.status, json.loads(row.result), row.error, row.version)
+
+# Slow health-tip generation runs here so it doesn't hold a request thread. Jobs are also
+# kept in the database: under several worker processes a poll can reach any of them
+workout_jobs = JobQueue(max_workers=app.config['WORKOUT_JOB_WORKERS'], ttl=app.config['WORKOUT_JOB_TTL'],
+                        on_finish=job_metrics('workout'),
+                        store=DatabaseJobStore('workout', app.config['WORKOUT_JOB_TTL']))
+
+def generate_tip_job(age, fitness_goal):
+    return {'tip': health_tip_exercise(age, fitness_goal)}
+
+def get_workout_job_or_404(job_id):
+    job = workout_jobs.get(job_id)
+    if job is None or job.owner_id != current_user.id:
+        abort(404)
+    return job
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 # Routes
 @app.route('/')
 def index():
@@ -293,13 +898,14 @@ def register():
             fitness_goal = request.form.get('fitness_goal', 'maintenance')
             experience_level = request.form.get('experience_level', 'beginner')
             
-            # Check if username exists
-            if User.query.filter_by(username=username).first():
+            # One lookup for both unique fields, so the form can say which one is taken
+            taken = User.query.with_entities(User.username, User.email).filter(
+                or_(User.username == username, User.email == email)
+            ).all()
+            if any(row.username == username for row in taken):
                 flash('Username already exists', 'danger')
                 return redirect(url_for('register'))
-            
-            # Check if email exists
-            if User.query.filter_by(email=email).first():
+            if taken:
                 flash('Email already registered', 'danger')
                 return redirect(url_for('register'))
             
@@ -314,9 +920,14 @@ def register():
             )
             user.set_password(password)
             
-            # Add to database
+            # Add to database; the unique constraints catch sign-ups racing with this one
             db.session.add(user)
-            db.session.commit()
+            try:
+                db.session.commit()
+            except IntegrityError as e:
+                db.session.rollback()
+                flash(duplicate_user_message(e), 'danger')
+                return redirect(url_for('register'))
             
             logger.info(f"Successfully registered user: {username}")
             flash('Registration successful! Please login.', 'success')
@@ -330,14 +941,77 @@ def register():
     
     return render_template('register.html')
 
+def onboard_members(members):
+    return MemberImporter(db.session, User, password_hasher).run(members)
+
+# Large rosters take minutes to hash; they are imported here instead of holding a request thread
+onboarding_jobs = JobQueue(max_workers=1, ttl=app.config['WORKOUT_JOB_TTL'], on_finish=job_metrics('onboarding'),
+                           store=DatabaseJobStore('onboarding', app.config['WORKOUT_JOB_TTL']))
+
+def onboard_members_job(members):
+    with app.app_context():
+        return onboard_members(members)
+
+def check_onboarding_token():
+    # Partner integrations authenticate with a shared token rather than a user session
+    token = app.config['ONBOARDING_API_TOKEN']
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(make_response(jsonify({'error': 'Unauthorized'}), 401))
+
+@app.route('/onboard_members', methods=['POST'])
+def onboard_members_api():
+    check_onboarding_token()
+    try:
+        members = parse_members(request.get_data(), request.content_type or 'application/json')
+    except ValueError:
+        return jsonify({'error': 'Invalid input data'}), 400
+    if not isinstance(members, list):
+        return jsonify({'error': 'Invalid input data'}), 400
+    if len(members) > app.config['ONBOARDING_SYNC_LIMIT']:
+        job = onboarding_jobs.submit(onboarding_jobs.create(None), onboard_members_job, members)
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('onboarding_job_status', job_id=job.id)
+        }), 202
+    return jsonify(onboard_members(members))
+
+@app.route('/onboard_members/<job_id>')
+def onboarding_job_status(job_id):
+    # The import report is merged into the job once it's done
+    check_onboarding_token()
+    job = onboarding_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.to_dict())
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+
+        # Checked before any hashing so a login storm can't tie up the hash pool
+        if not login_limiter.allow((username or '').lower()):
+            flash('Too many login attempts. Please try again later.', 'danger')
+            return render_template('login.html'), 429
+
         user = User.query.filter_by(username=username).first()
         
-        if user and user.check_password(password):
+        try:
+            authenticated = user is not None and user.check_password(password)
+            if authenticated and password_hasher.needs_rehash(user.password_hash):
+                # Upgrade hashes made with older cost parameters while we have the password
+                user.set_password(password)
+                db.session.commit()
+        except PasswordHashTimeout:
+            flash('Login is busy right now. Please try again in a moment.', 'danger')
+            return render_template('login.html'), 503
+
+        if authenticated:
+            login_limiter.reset((username or '').lower())
             login_user(user)
             flash('Logged in successfully!', 'success')
             return redirect(url_for('dashboard'))
@@ -349,6 +1023,7 @@ def login():
 @login_required
 def logout():
     logout_user()
+    session.pop('_user_snapshot', None)
     return redirect(url_for('index'))
 
 @app.route('/dashboard')
@@ -359,6 +1034,18 @@ def dashboard():
 @app.route('/generate_workout', methods=['POST'])
 @login_required
 def generate_workout():
+    if request.args.get('async', '').lower() in ('1', 'true'):
+        # Return the deterministic plan right away and generate the tip in the background
+        job = workout_jobs.create(current_user.id, exercises=build_workout_plan(current_user), tip=None)
+        workout_jobs.submit(job, generate_tip_job, current_user.age, current_user.fitness_goal)
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'exercises': job.result['exercises'],
+            'status_url': url_for('workout_job_status', job_id=job.id),
+            'stream_url': url_for('workout_job_stream', job_id=job.id)
+        }), 202
+
     try:
         # Generate AI-based workout
         print("Starting workout generation for user:", current_user.username)
@@ -377,25 +1064,447 @@ def generate_workout():
         ]
         return jsonify(basic_workout)
 
+@app.route('/workout_jobs/<job_id>')
+@login_required
+def workout_job_status(job_id):
+    return jsonify(get_workout_job_or_404(job_id).to_dict())
+
+@app.route('/workout_jobs/<job_id>/stream')
+@login_required
+def workout_job_stream(job_id):
+    # For API clients that want push updates. Each open stream holds a server thread for up to
+    # WORKOUT_JOB_STREAM_TIMEOUT seconds, so the dashboard polls /workout_jobs/<id> instead
+    job = get_workout_job_or_404(job_id)
+    timeout = app.config['WORKOUT_JOB_STREAM_TIMEOUT']
+
+    def events():
+        # The exercise list is ready as soon as the job exists
+        yield sse_event('exercises', job.result['exercises'])
+        version = job.version
+        waited = 0
+        while not job.finished and waited < timeout:
+            new_version = workout_jobs.wait(job, version, timeout=15)
+            if new_version == version:
+                waited += 15
+                yield ": keep-alive\n\n"
+            version = new_version
+        if job.result.get('tip') is not None:
+            yield sse_event('tip', job.result['tip'])
+        yield sse_event('done', {'status': job.status, 'error': job.error})
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/model_status')
+def model_status():
+    # Load time and memory footprint of the models held by this process
+    return jsonify({
+        'models': model_registry.stats(),
+        'health_tip_backend': {
+            'model': app.config['HEALTH_TIP_MODEL'],
+            'quantize': app.config['HEALTH_TIP_QUANTIZE'],
+            'threads': app.config['INFERENCE_THREADS'],
+            'generate': tip_batcher.generate_kwargs
+        },
+        'health_tip_batching': tip_batcher.stats(),
+        # Unique vs. shared pages of this worker; under prefork.py the model weights count as shared
+        'memory': process_memory(),
+        'health_tip_cache': tip_cache.stats()
+    })
+
+# Values kept elsewhere are read when /metrics is scraped, not on every request
+@metrics.collector
+def collect_cache_metrics():
+    caches = {'health_tip': tip_cache, 'user': user_cache, 'exercise_list': exercise_list_cache,
+              'exercise_history': exercise_history_cache}
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    yield 'cache_hits_total', 'counter', 'Cache hits', [({'cache': name}, s['hits']) for name, s in stats.items()]
+    yield 'cache_misses_total', 'counter', 'Cache misses', [({'cache': name}, s['misses']) for name, s in stats.items()]
+    yield 'cache_evictions_total', 'counter', 'Entries evicted to stay under maxsize', [
+        ({'cache': name}, s['evictions']) for name, s in stats.items()]
+    yield 'cache_entries', 'gauge', 'Entries held per cache', [({'cache': name}, s['size']) for name, s in stats.items()]
+
+@metrics.collector
+def collect_model_metrics():
+    models = model_registry.stats()
+    yield 'model_loaded', 'gauge', 'Whether the model is loaded in this process', [
+        ({'model': name}, int(model['loaded'])) for name, model in models.items()]
+    yield 'model_load_seconds', 'gauge', 'Time taken to load the model', [
+        ({'model': name}, model.get('load_seconds')) for name, model in models.items()]
+
+@metrics.collector
+def collect_job_metrics():
+    queues = {'workout': workout_jobs, 'media': media_jobs, 'onboarding': onboarding_jobs}
+    yield 'job_queue_depth', 'gauge', 'Jobs waiting for a worker', [({'queue': name}, q.queued) for name, q in queues.items()]
+    yield 'jobs_running', 'gauge', 'Jobs being run', [({'queue': name}, q.running) for name, q in queues.items()]
+
+@app.route('/metrics')
+def metrics_view():
+    # Per process: under prefork.py each worker reports its own numbers
+    token = app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/profiles')
+def list_profiles():
+    # The slowest profiled requests of this machine, for holders of a signed X-Profile header
+    if not app.config['PROFILE_SECRET']:
+        abort(404)
+    if not profile_header_valid():
+        return jsonify({'error': 'Unauthorized'}), 401
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    return jsonify({'profiles': profile_store().slowest(limit)})
+
+# Upper bounds for a logged exercise; well past any real set, they keep typos and
+# overflowing integers out of the summaries (reps also counts seconds for holds)
+EXERCISE_LIMITS = {'sets': 100, 'reps': 10000, 'weight': 1000}
+
+def exercise_count(value, field):
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= EXERCISE_LIMITS[field]:
+        raise ValueError(f"{field} must be an integer from 0 to {EXERCISE_LIMITS[field]}")
+    return value
+
+def exercise_rows(workout_id, exercises):
+    # Raises ValueError for anything that isn't a list of well-formed exercises
+    if not isinstance(exercises, list) or not exercises:
+        raise ValueError('exercises must be a non-empty list')
+    rows = []
+    for exercise_data in exercises:
+        name, weight = exercise_data['name'], exercise_data.get('weight') or 0
+        if not isinstance(name, str) or not name.strip() or len(name) > 100:
+            raise ValueError('name must be 1-100 characters')
+        # The range check comes first: math.isfinite can't convert very large ints to float
+        if (isinstance(weight, bool) or not isinstance(weight, (int, float))
+                or not 0 <= weight <= EXERCISE_LIMITS['weight'] or not math.isfinite(weight)):
+            raise ValueError(f"weight must be a number from 0 to {EXERCISE_LIMITS['weight']}")
+        rows.append({
+            'workout_id': workout_id,
+            'name': name,
+            'sets': exercise_count(exercise_data['sets'], 'sets'),
+            'reps': exercise_count(exercise_data['reps'], 'reps'),
+            'weight': weight
+        })
+    return rows
+
+def workout_date(value):
+    # Dates are stored as naive UTC; an offset from the client is applied rather than kept
+    date = datetime.fromisoformat(value)
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+def insert_workouts(user_id, workouts_data):
+    # One flush assigns all workout ids, then every exercise goes in a single executemany
+    workouts = []
+    for data in workouts_data:
+        if not isinstance(data, dict):
+            raise ValueError('each workout must be an object')
+        workout = Workout(user_id=user_id)
+        if data.get('date'):
+            workout.date = workout_date(data['date'])
+        workouts.append(workout)
+    db.session.add_all(workouts)
+    db.session.flush()
+
+    rows = []
+    logged = []
+    for workout, data in zip(workouts, workouts_data):
+        workout_rows = exercise_rows(workout.id, data['exercises'])
+        rows.extend(workout_rows)
+        logged.append((workout.date, workout_rows))
+    if rows:
+        db.session.execute(Exercise.__table__.insert(), rows)
+    # The bulk insert bypasses ORM events, so the summaries are updated here in the same transaction
+    update_progress(user_id, *summarize(logged))
+    return workouts, len(rows)
+
+def update_progress(user_id, weeks, bests):
+    exercise_history_cache.pop(user_id)
+    # Fold new totals into the summary rows; FOR UPDATE serialises concurrent logs on databases that support it
+    if weeks:
+        existing = {row.week_start: row for row in WeeklyVolume.query.filter(
+            WeeklyVolume.user_id == user_id, WeeklyVolume.week_start.in_(list(weeks))
+        ).with_for_update()}
+        for start, totals in weeks.items():
+            row = existing.get(start)
+            if row is None:
+                row = WeeklyVolume(user_id=user_id, week_start=start, **empty_week())
+                db.session.add(row)
+            for field, value in totals.items():
+                setattr(row, field, (getattr(row, field) or 0) + value)
+    if bests:
+        existing = {row.exercise_name: row for row in PersonalBest.query.filter(
+            PersonalBest.user_id == user_id, PersonalBest.exercise_name.in_(list(bests))
+        ).with_for_update()}
+        for name, best in bests.items():
+            row = existing.get(name)
+            if row is None:
+                row = PersonalBest(user_id=user_id, exercise_name=name, **empty_best())
+                db.session.add(row)
+            merged = merge_best({field: getattr(row, field) for field in empty_best()}, best['max_weight'],
+                                best['max_reps'], best['max_volume'], best['last_performed'])
+            for field, value in merged.items():
+                setattr(row, field, value)
+
+def rebuild_progress(user_id):
+    # Recompute a user's summaries from their full history, e.g. for workouts logged before the tables existed
+    WeeklyVolume.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    PersonalBest.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    exercise_history_cache.pop(user_id)
+
+    volume = Exercise.sets * Exercise.reps * func.coalesce(Exercise.weight, 0)
+    per_workout = db.session.query(
+        Workout.date, func.count(Exercise.id), func.sum(Exercise.sets),
+        func.sum(Exercise.sets * Exercise.reps), func.sum(volume)
+    ).outerjoin(Exercise).filter(Workout.user_id == user_id).group_by(Workout.id, Workout.date)
+    weeks = {}
+    for date, _, sets, reps, total_volume in per_workout:
+        week = weeks.setdefault(week_start(date), empty_week())
+        week['workouts'] += 1
+        week['sets'] += sets or 0
+        week['reps'] += reps or 0
+        week['volume'] += total_volume or 0
+    for start, totals in weeks.items():
+        db.session.add(WeeklyVolume(user_id=user_id, week_start=start, **totals))
+
+    per_exercise = db.session.query(
+        Exercise.name, func.max(Exercise.weight), func.max(Exercise.reps), func.max(volume), func.max(Workout.date)
+    ).join(Workout).filter(Workout.user_id == user_id).group_by(Exercise.name)
+    for name, max_weight, max_reps, max_volume, last_performed in per_exercise:
+        db.session.add(PersonalBest(user_id=user_id, exercise_name=name, max_weight=max_weight or 0,
+                                    max_reps=max_reps or 0, max_volume=max_volume or 0,
+                                    last_performed=last_performed))
+    return len(weeks)
+
+# Results of recent idempotent writes, so most retries are answered without the database
+idempotency_cache = TTLCache(maxsize=app.config['IDEMPOTENCY_CACHE_SIZE'], ttl=app.config['IDEMPOTENCY_KEY_TTL'])
+idempotency_pruned_at = 0.0
+
+def run_idempotent(user_id, idempotency, write, *args):
+    # Runs write(*args) once per idempotency key; on SQLite on the writer thread
+    if idempotency is not None:
+        cached = idempotency_cache.get((user_id, idempotency.key))
+        if cached is not None:
+            return replay(idempotency, *cached)
+    result = run_write(store_idempotent, user_id, idempotency, write, *args)
+    if idempotency is not None:
+        idempotency_cache.set((user_id, idempotency.key), (idempotency.endpoint, idempotency.fingerprint, result))
+    return result
+
+def store_idempotent(user_id, idempotency, write, *args):
+    # A concurrent log may create the same week's summary row or idempotency key first; retry once against it
+    for attempt in range(2):
+        try:
+            if idempotency is not None:
+                stored = IdempotencyKey.query.filter_by(user_id=user_id, key=idempotency.key).first()
+                if stored is not None:
+                    return replay(idempotency, stored.endpoint, stored.fingerprint, json.loads(stored.result))
+            result = write(*args)
+            if idempotency is not None:
+                save_idempotency_key(user_id, idempotency, result)
+            db.session.commit()
+            return result
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                raise
+        except Exception:
+            db.session.rollback()
+            raise
+
+def save_idempotency_key(user_id, idempotency, result):
+    global idempotency_pruned_at
+    db.session.add(IdempotencyKey(user_id=user_id, key=idempotency.key, endpoint=idempotency.endpoint,
+                                  fingerprint=idempotency.fingerprint, result=json.dumps(result)))
+    # Expired keys are deleted in passing, at most once a minute per process, to keep the table bounded
+    if time.monotonic() - idempotency_pruned_at > 60:
+        idempotency_pruned_at = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(seconds=app.config['IDEMPOTENCY_KEY_TTL'])
+        IdempotencyKey.query.filter(IdempotencyKey.created_at < cutoff).delete(synchronize_session=False)
+
+def commit_workouts(user_id, workouts_data, idempotency=None):
+    # Returns {'workout_ids': [...], 'exercises': n}
+    return run_idempotent(user_id, idempotency, store_workouts, user_id, workouts_data)
+
+def store_workouts(user_id, workouts_data):
+    workouts, exercise_count = insert_workouts(user_id, workouts_data)
+    # Ids are read before the commit expires them, saving a SELECT per workout
+    return {'workout_ids': [workout.id for workout in workouts], 'exercises': exercise_count}
+
+class WorkoutNotFound(LookupError):
+    pass
+
+class WorkoutClosed(Exception):
+    pass
+
+def append_exercises(user_id, workout_id, exercises):
+    # Adds to a workout still in progress. Appended sets are always new rows: exercise rows are
+    # never edited, which keeps per-set history and lets exports resume by exercise id
+    workout = Workout.query.filter_by(id=workout_id, user_id=user_id).first()
+    if workout is None:
+        raise WorkoutNotFound(workout_id)
+    if datetime.utcnow() - workout.date > timedelta(seconds=app.config['WORKOUT_APPEND_WINDOW']):
+        raise WorkoutClosed(workout_id)
+    rows = exercise_rows(workout.id, exercises)
+    logged = Exercise.query.filter_by(workout_id=workout.id).count()
+    db.session.execute(Exercise.__table__.insert(), rows)
+    weeks, bests = summarize([(workout.date, rows)])
+    for week in weeks.values():
+        week['workouts'] = 0  # Counted when the workout was logged
+    update_progress(user_id, weeks, bests)
+    return {'workout_id': workout.id, 'exercises': logged + len(rows)}
+
+def request_idempotency(endpoint, payload):
+    return idempotent_request(request.headers.get(IDEMPOTENCY_HEADER), endpoint, payload)
+
 @app.route('/log_workout', methods=['POST'])
 @login_required
 def log_workout():
     data = request.json
-    workout = Workout(user_id=current_user.id)
-    db.session.add(workout)
-    
-    for exercise_data in data['exercises']:
-        exercise = Exercise(
-            workout_id=workout.id,
-            name=exercise_data['name'],
-            sets=exercise_data['sets'],
-            reps=exercise_data['reps'],
-            weight=exercise_data.get('weight', 0)
-        )
-        db.session.add(exercise)
-    
-    db.session.commit()
-    return jsonify({'status': 'success'}) 
+    try:
+        result = commit_workouts(current_user.id, [{'exercises': data['exercises']}],
+                                 request_idempotency('log_workout', data))
+    except IdempotencyKeyReused:
+        return jsonify({'error': 'Idempotency key already used for a different request'}), 409
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Invalid input data'}), 400
+    return jsonify({'status': 'success', 'workout_id': result['workout_ids'][0]}) 
+
+@app.route('/log_workouts', methods=['POST'])
+@login_required
+def log_workouts():
+    # Batch endpoint for offline sync: all workouts are stored in one transaction
+    data = request.json
+    if not data or not isinstance(data.get('workouts'), list):
+        return jsonify({'error': 'Invalid input data'}), 400
+    if len(data['workouts']) > app.config['MAX_WORKOUTS_PER_BATCH']:
+        return jsonify({'error': f"At most {app.config['MAX_WORKOUTS_PER_BATCH']} workouts per batch"}), 400
+
+    try:
+        result = commit_workouts(current_user.id, data['workouts'], request_idempotency('log_workouts', data))
+    except IdempotencyKeyReused:
+        return jsonify({'error': 'Idempotency key already used for a different request'}), 409
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Invalid input data'}), 400
+
+    return jsonify({
+        'status': 'success',
+        'workout_ids': result['workout_ids'],
+        'exercises': result['exercises']
+    })
+
+@app.route('/workouts/<int:workout_id>/exercises', methods=['POST'])
+@login_required
+def append_workout_exercises(workout_id):
+    # Log sets as they are done instead of resubmitting the whole workout at the end
+    data = request.json
+    try:
+        idempotency = request_idempotency(f'append_workout_exercises:{workout_id}', data)
+        result = run_idempotent(current_user.id, idempotency, append_exercises,
+                                current_user.id, workout_id, data['exercises'])
+    except WorkoutNotFound:
+        abort(404)
+    except WorkoutClosed:
+        return jsonify({'error': 'Workout is no longer in progress'}), 409
+    except IdempotencyKeyReused:
+        return jsonify({'error': 'Idempotency key already used for a different request'}), 409
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Invalid input data'}), 400
+    return jsonify(dict(result, status='success'))
+
+def export_pages(since=None, after=0, page_size=None):
+    # Keyset pages on the exercise primary key, joined to their workouts in SQL. Each page is
+    # its own short query and the connection is handed back in between, so an export of any
+    # size neither holds a transaction open nor more than one page in memory
+    page_size = page_size or app.config['EXPORT_PAGE_SIZE']
+    while True:
+        query = db.session.query(
+            Exercise.id, Exercise.workout_id, Workout.user_id, Workout.date,
+            Exercise.name, Exercise.sets, Exercise.reps, Exercise.weight
+        ).join(Workout, Exercise.workout_id == Workout.id).filter(Exercise.id > after)
+        if since is not None:
+            query = query.filter(Workout.date >= since)
+        rows = [tuple(row) for row in query.order_by(Exercise.id).limit(page_size)]
+        db.session.close()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        after = rows[-1][0]
+
+def export_args():
+    return parse_since(request.args.get('since')), request.args.get('after', 0, type=int)
+
+def check_export_token():
+    # Analytics exports cover every user, so they need the shared token, not a user session
+    token = app.config['EXPORT_API_TOKEN']
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        # Aborts with the same JSON body the other token-protected endpoints return
+        abort(make_response(jsonify({'error': 'Unauthorized'}), 401))
+
+@app.route('/export/workouts.csv', methods=['GET'])
+def export_workouts_csv():
+    check_export_token()
+    try:
+        since, after = export_args()
+    except ValueError:
+        return jsonify({'error': 'Invalid input data'}), 400
+    return Response(stream_with_context(stream_csv(export_pages(since, after))), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=workouts.csv'})
+
+@app.route('/export/workouts.npz', methods=['GET'])
+def export_workouts_npz():
+    # One chunk per call; X-Export-Next-After is the ?after= for the next one, absent on the last
+    check_export_token()
+    try:
+        since, after = export_args()
+    except ValueError:
+        return jsonify({'error': 'Invalid input data'}), 400
+    page_size = app.config['EXPORT_PAGE_SIZE']
+    rows = next(export_pages(since, after, page_size), [])
+    buffer = io.BytesIO()
+    write_npz(buffer, rows_to_columns(rows))
+    headers = {'Content-Disposition': 'attachment; filename=workouts.npz'}
+    if len(rows) == page_size:
+        headers['X-Export-Next-After'] = str(rows[-1][0])
+    return Response(buffer.getvalue(), mimetype='application/octet-stream', headers=headers)
+
+def workout_history_page(user_id, before, limit):
+    # Keyset pagination newest first on (date, id), served by ix_workout_user_id_date.
+    # Exercises for the whole page are loaded in one extra IN query instead of one per workout
+    query = Workout.query.filter_by(user_id=user_id).options(selectinload(Workout.exercises))
+    if before:
+        cursor = db.session.query(Workout.date).filter_by(id=before, user_id=user_id).scalar()
+        if cursor is not None:
+            query = query.filter(or_(Workout.date < cursor, and_(Workout.date == cursor, Workout.id < before)))
+    rows = query.order_by(Workout.date.desc(), Workout.id.desc()).limit(limit + 1).all()
+    next_before = rows[limit - 1].id if len(rows) > limit else None
+    return [workout.to_dict() for workout in rows[:limit]], next_before
+
+# Route to page through the user's logged workouts
+@app.route('/history', methods=['GET'])
+@login_required
+def workout_history():
+    limit = request.args.get('limit', app.config['HISTORY_PER_PAGE'], type=int)
+    limit = max(1, min(limit, app.config['MAX_HISTORY_PER_PAGE']))
+    workouts, next_before = workout_history_page(current_user.id, request.args.get('before', type=int), limit)
+    return jsonify({'workouts': workouts, 'next_before': next_before})
+
+# Route for progress summaries; reads only the summary rows, never the full history
+@app.route('/progress', methods=['GET'])
+@login_required
+def progress():
+    weeks = request.args.get('weeks', app.config['PROGRESS_WEEKS'], type=int)
+    weekly = (WeeklyVolume.query.filter_by(user_id=current_user.id)
+              .order_by(WeeklyVolume.week_start.desc()).limit(max(1, min(weeks, 520))).all())
+    personal_bests = PersonalBest.query.filter_by(user_id=current_user.id).order_by(PersonalBest.exercise_name).all()
+    return jsonify({
+        'weekly_volume': [week.to_dict() for week in reversed(weekly)],
+        'personal_bests': [best.to_dict() for best in personal_bests]
+    })
 
 @app.route('/adapt_workout', methods=['POST'])
 @login_required
@@ -413,19 +1522,7 @@ def adapt_workout():
         exercises = workout.get('exercises', [])
 
         # Adapt the workout (e.g., increase sets/reps for advanced users)
-        adapted_exercises = []
-        for exercise in exercises:
-            adapted_exercise = exercise.copy()
-            if current_user.experience_level == 'beginner':
-                adapted_exercise['sets'] = max(1, exercise['sets'] - 1)
-                adapted_exercise['reps'] = max(1, int(exercise['reps'] * 0.8))
-            elif current_user.experience_level == 'advanced':
-                adapted_exercise['sets'] = exercise['sets'] + 1
-                adapted_exercise['reps'] = int(exercise['reps'] * 1.2)
-            else:  # Intermediate or default
-                adapted_exercise['sets'] = exercise['sets']
-                adapted_exercise['reps'] = exercise['reps']
-            adapted_exercises.append(adapted_exercise)
+        adapted_exercises = [adapt_exercise(exercise, current_user.experience_level) for exercise in exercises]
 
         # Log the adapted workout
         app.logger.debug(f"Adapted workout: {adapted_exercises}")
@@ -436,6 +1533,32 @@ def adapt_workout():
         app.logger.error(f"Error in adapt_workout: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
+@app.route('/adapt_workouts', methods=['POST'])
+@login_required
+def adapt_workouts_batch():
+    # Batch version of /adapt_workout for coaches adapting a whole class. Accepts
+    # {'workouts': [...]} (each may carry its own experience_level) or column-shaped
+    # {'columns': {'sets': [...], 'reps': [...], ...}}, answered in the same shape
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid input data'}), 400
+    try:
+        if isinstance(data.get('columns'), dict):
+            return jsonify({'columns': adapt_columns(data['columns'], current_user.experience_level)})
+        if isinstance(data.get('workouts'), list):
+            return jsonify({'workouts': adapt_workouts(data['workouts'], current_user.experience_level)})
+    except (KeyError, TypeError, ValueError):
+        pass
+    return jsonify({'error': 'Invalid input data'}), 400
+
+# Load the models at worker start instead of on the first request
+if app.config['PRELOAD_MODELS']:
+    model_registry.preload()
+
+# Tips pre-generated at deploy time by prewarm_tips.py
+if os.path.exists(app.config['HEALTH_TIP_CACHE_FILE']):
+    logger.info(f"Loaded {load_tip_cache()} cached health tips")
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
@@ -0,0 +1,85 @@
+"""Compare the per-dict adaptation loop with the NumPy column path.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_adaptation
+"""
+import random
+import time
+
+from adaptation import LEVEL_CODES, UNCHANGED, adapt_columns, adapt_sets_reps, adapt_workouts
+
+import numpy as np
+
+LEVELS = ['beginner', 'intermediate', 'advanced']
+SIZES = [10000, 100000]
+EXERCISES_PER_WORKOUT = 8
+
+
+def make_workouts(total_exercises, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            'experience_level': rng.choice(LEVELS),
+            'exercises': [
+                {'name': f'Exercise {i}', 'sets': rng.randint(1, 5), 'reps': rng.randint(1, 30)}
+                for i in range(EXERCISES_PER_WORKOUT)
+            ]
+        }
+        for _ in range(total_exercises // EXERCISES_PER_WORKOUT)
+    ]
+
+
+def to_columns(workouts):
+    rows = [(workout['experience_level'], exercise) for workout in workouts for exercise in workout['exercises']]
+    return {
+        'name': [exercise['name'] for _, exercise in rows],
+        'experience_level': [level for level, _ in rows],
+        'sets': [exercise['sets'] for _, exercise in rows],
+        'reps': [exercise['reps'] for _, exercise in rows],
+    }
+
+
+def adapt_rows_with_numpy(workouts, default_level):
+    # Rows -> arrays -> rows; kept here to show why row input stays on the loop
+    counts = [len(workout['exercises']) for workout in workouts]
+    exercises = [exercise for workout in workouts for exercise in workout['exercises']]
+    sets = np.fromiter((exercise['sets'] for exercise in exercises), dtype=np.int64, count=len(exercises))
+    reps = np.fromiter((exercise['reps'] for exercise in exercises), dtype=np.int64, count=len(exercises))
+    levels = np.repeat(np.array([LEVEL_CODES.get(workout.get('experience_level', default_level), UNCHANGED)
+                                 for workout in workouts], dtype=np.int8), counts)
+    new_sets, new_reps = adapt_sets_reps(sets, reps, levels)
+    rows = list(zip(exercises, new_sets.tolist(), new_reps.tolist()))
+    adapted, start = [], 0
+    for workout, count in zip(workouts, counts):
+        adapted.append(dict(workout, exercises=[dict(e, sets=s, reps=r) for e, s, r in rows[start:start + count]]))
+        start += count
+    return adapted
+
+
+def best_of(fn, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    print(f"{'exercises':>10}{'loop ms':>10}{'rows->numpy ms':>16}{'columns ms':>12}")
+    for size in SIZES:
+        workouts = make_workouts(size)
+        columns = to_columns(workouts)
+        expected = adapt_workouts(workouts, 'intermediate')
+        assert adapt_rows_with_numpy(workouts, 'intermediate') == expected
+        assert adapt_columns(columns, 'intermediate')['reps'] == to_columns(expected)['reps']
+
+        loop = best_of(adapt_workouts, workouts, 'intermediate')
+        rows = best_of(adapt_rows_with_numpy, workouts, 'intermediate')
+        cols = best_of(adapt_columns, columns, 'intermediate')
+        print(f"{size:>10}{loop * 1000:>10.1f}{rows * 1000:>16.1f}{cols * 1000:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""Load-test the HTTP hot paths against a seeded database.
+
+Seeds a temporary SQLite database (or --database-url, whose tables are
+dropped and recreated) with users, months of logged workouts and catalog
+exercises, replaces the health-tip model with a stub that takes --model-ms
+per batch, then drives each endpoint from --threads logged-in clients at
+once. Requests go through the whole Flask stack in process, so the numbers
+are the app's own cost without a network or server in front. Run from the
+repository root:
+
+    python -m benchmarks.bench_http
+    python -m benchmarks.bench_http --save bench_http.json
+    python -m benchmarks.bench_http --compare bench_http.json --threshold 0.2
+
+With --compare the run exits with status 1 when an endpoint's p95 grew, or
+its requests/s fell, by more than --threshold against the saved run.
+Compare runs from the same machine and the same options only.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+CATEGORIES = ['cardio', 'bodyweight', 'strength', 'flexibility']
+DIFFICULTIES = ['beginner', 'intermediate', 'advanced']
+GOALS = ['weight_loss', 'muscle_gain', 'maintenance']
+EXERCISE_NAMES = ['Squats', 'Push-ups', 'Deadlift', 'Bench Press', 'Lunges', 'Plank', 'Rows', 'Burpees']
+PASSWORD = 'benchpass'
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(p / 100 * len(sorted_values)) - 1))]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'errors': errors,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Regressions of ``current`` against ``baseline`` results, as messages."""
+    regressions = []
+    for endpoint, result in current.items():
+        base = baseline.get(endpoint)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            regressions.append(f"{endpoint}: p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+        if result['rps'] < base['rps'] * (1 - threshold):
+            regressions.append(f"{endpoint}: {base['rps']} -> {result['rps']} requests/s")
+        if result['errors'] > base['errors']:
+            regressions.append(f"{endpoint}: {base['errors']} -> {result['errors']} errors")
+    return regressions
+
+
+def failed(response):
+    return response.status_code >= 400
+
+
+def generation_failed(response):
+    """/generate_workout answers a failed generation with 200 and a fixed plan that has no health tip."""
+    return failed(response) or not any(exercise['name'].startswith('Health Tip')
+                                       for exercise in response.get_json())
+
+
+# Endpoints whose failures don't all show in the status code
+ERROR_CHECKS = {'generate_workout': generation_failed}
+
+
+def random_workout(rng, date=None):
+    workout = {'exercises': [
+        {'name': name, 'sets': rng.randint(2, 5), 'reps': rng.randint(5, 15), 'weight': rng.choice([0, 20, 40, 60])}
+        for name in rng.sample(EXERCISE_NAMES, 5)
+    ]}
+    if date is not None:
+        workout['date'] = date.isoformat()
+    return workout
+
+
+def seed(app_module, users, workouts_per_user, media, rng):
+    """Create users with a workout history and a catalog; returns the usernames."""
+    app, db = app_module.app, app_module.db
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # One hash for everyone: hashing is what /login measures, not what seeding should wait for
+        password_hash = app_module.password_hasher.hash(PASSWORD)
+        db.session.execute(app_module.User.__table__.insert(), [{
+            'username': f'member{i}', 'email': f'member{i}@example.com', 'password_hash': password_hash,
+            'age': rng.randint(18, 70), 'weight': rng.randint(50, 110), 'fitness_goal': rng.choice(GOALS),
+            'experience_level': rng.choice(DIFFICULTIES),
+        } for i in range(users)])
+        db.session.execute(app_module.ExerciseMedia.__table__.insert(), [{
+            'name': f'Catalog exercise {i}', 'description': 'Seeded for benchmarking',
+            'category': rng.choice(CATEGORIES), 'difficulty': rng.choice(DIFFICULTIES),
+            'created_at': datetime.utcnow(),
+        } for i in range(media)])
+        db.session.commit()
+
+        now = datetime.utcnow()
+        user_ids = [user_id for user_id, in db.session.query(app_module.User.id).order_by(app_module.User.id)]
+        for user_id in user_ids:
+            # About two workouts a week going back in time
+            history = [random_workout(rng, now - timedelta(days=3.5 * n)) for n in range(workouts_per_user)]
+            app_module.insert_workouts(user_id, history)
+            db.session.commit()
+        app_module.exercise_index.rebuild(app_module.ExerciseMedia.query.all())
+    return [f'member{i}' for i in range(len(user_ids))]
+
+
+def install_stub_model(app_module, model_ms):
+    def stub_generator(prompts, **kwargs):
+        time.sleep(model_ms / 1000)
+        return [[{'generated_text': f'{prompt} Warm up well and keep a steady pace.'}] for prompt in prompts]
+
+    app_module.model_registry.register('health_tip', lambda: stub_generator)
+    app_module.tip_cache.clear()
+
+
+def scenarios(rng):
+    """Endpoint name -> function issuing one request with a logged-in client."""
+    categories = itertools.cycle([None] + CATEGORIES)
+    adapt_payload = {'workout': random_workout(rng)}
+    log_payload = random_workout(rng)
+
+    def exercises(client, username):
+        category = next(categories)
+        return client.get('/exercises', query_string={'category': category} if category else None)
+
+    return {
+        'login': lambda client, username: client.post('/login', data={'username': username, 'password': PASSWORD}),
+        'generate_workout': lambda client, username: client.post('/generate_workout'),
+        'log_workout': lambda client, username: client.post('/log_workout', json=log_payload),
+        'adapt_workout': lambda client, username: client.post('/adapt_workout', json=adapt_payload),
+        'exercises': exercises,
+    }
+
+
+def run_endpoint(app, request_fn, usernames, threads, requests, is_error=failed):
+    """Issue ``requests`` requests from ``threads`` concurrent clients; returns the summary."""
+    latencies, errors = [], []
+    per_thread = max(1, requests // threads)
+    start = threading.Barrier(threads + 1)
+
+    def client_loop(username):
+        client = app.test_client()
+        client.post('/login', data={'username': username, 'password': PASSWORD})
+        start.wait()
+        for _ in range(per_thread):
+            started = time.perf_counter()
+            response = request_fn(client, username)
+            latencies.append(time.perf_counter() - started)
+            if is_error(response):
+                errors.append(response.status_code)
+
+    clients = [threading.Thread(target=client_loop, args=(usernames[i % len(usernames)],)) for i in range(threads)]
+    for thread in clients:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in clients:
+        thread.join()
+    return summarize(latencies, len(errors), time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--workouts-per-user', type=int, default=100)
+    parser.add_argument('--media', type=int, default=500, help='catalog exercises')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=400, help='requests per endpoint')
+    parser.add_argument('--login-requests', type=int, default=64, help='requests for /login, which is bound by hashing')
+    parser.add_argument('--model-ms', type=float, default=50, help='stub model time per batch')
+    parser.add_argument('--endpoints', help='comma-separated subset of the endpoints to run')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='benchmark this database instead of a temporary SQLite file')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier --save to check against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args(argv)
+
+    # The app reads its configuration at import
+    directory = tempfile.mkdtemp(prefix='bench_http_')
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ['HEALTH_TIP_CACHE_FILE'] = os.path.join(directory, 'health_tips.json')
+    os.environ['LOGIN_ATTEMPTS_PER_USERNAME'] = '0'
+    os.environ['PRELOAD_MODELS'] = 'false'
+    # Generation refuses to run without a key; the stub model never uses it
+    os.environ['HUGGINGFACE_API_KEY'] = 'bench-stub'
+    logging.disable(logging.WARNING)
+    import app as app_module
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    usernames = seed(app_module, args.users, args.workouts_per_user, args.media, rng)
+    print(f"Seeded {len(usernames)} users, {len(usernames) * args.workouts_per_user} workouts and "
+          f"{args.media} catalog exercises in {time.perf_counter() - started:.1f}s")
+    install_stub_model(app_module, args.model_ms)
+
+    selected = scenarios(rng)
+    if args.endpoints:
+        selected = {name: selected[name] for name in args.endpoints.split(',')}
+
+    print(f"{args.threads} clients, {args.requests} requests per endpoint ({args.login_requests} for login)")
+    print(f"{'endpoint':<18}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    results = {}
+    for name, request_fn in selected.items():
+        # generate_workout prints its plans; keep them out of the report
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            requests = args.login_requests if name == 'login' else args.requests
+            result = run_endpoint(app_module.app, request_fn, usernames, args.threads, requests,
+                                  is_error=ERROR_CHECKS.get(name, failed))
+        results[name] = result
+        print(f"{name:<18}{result['rps']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+              f"{result['errors']:>8}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'options': {key: value for key, value in vars(args).items()
+                                   if key not in ('save', 'compare', 'database_url')},
+                       'python': platform.python_version(), 'results': results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(baseline, results, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} of {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Compare health-tip inference backends on CPU: latency, throughput and RSS.
+
+Each option is loaded in its own process, so RSS numbers are not mixed up
+by earlier models. The first option is the current default configuration.
+Run from the repository root (downloads the models on first use):
+
+    python -m benchmarks.bench_inference
+    python -m benchmarks.bench_inference --threads 2 --max-new-tokens 40
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from inference import MicroBatcher, current_rss_bytes, generation_kwargs, load_text_generator
+
+# (model, int8 quantization)
+OPTIONS = [
+    ('gpt2-medium', False),
+    ('gpt2-medium', True),
+    ('distilgpt2', False),
+    ('distilgpt2', True),
+]
+PROMPTS = [
+    f"As a fitness trainer, give a short health tip for a {age}-{age + 9} year old person with {goal} goal."
+    for age in (20, 30, 40, 50) for goal in ('weight_loss', 'muscle_gain')
+]
+MB = 1024 * 1024
+
+
+def measure(model, quantize, threads, max_length, max_new_tokens, runs):
+    rss_start = current_rss_bytes()
+    started = time.perf_counter()
+    generator = load_text_generator(model, quantize=quantize, threads=threads)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = current_rss_bytes()
+
+    kwargs = generation_kwargs(max_length, max_new_tokens)
+    # Same batched call and padding setup as the app's MicroBatcher
+    batcher = MicroBatcher(lambda: generator, max_batch_size=len(PROMPTS), **kwargs)
+    batcher._generate_batch(PROMPTS[:1])  # Warm up
+
+    latencies = []
+    for i in range(runs):
+        started = time.perf_counter()
+        batcher._generate_batch([PROMPTS[i % len(PROMPTS)]])
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(max(1, runs // len(PROMPTS))):
+        batcher._generate_batch(PROMPTS)
+    batch_seconds = time.perf_counter() - started
+    batch_prompts = max(1, runs // len(PROMPTS)) * len(PROMPTS)
+
+    latencies.sort()
+    return {
+        'model': model,
+        'quantize': quantize,
+        'load_seconds': round(load_seconds, 2),
+        'rss_mb': round(current_rss_bytes() / MB),
+        'model_rss_mb': round((rss_loaded - rss_start) / MB),
+        'p50_ms': round(statistics.median(latencies) * 1000),
+        'p95_ms': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000),
+        'batch_prompts_per_s': round(batch_prompts / batch_seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', type=int, default=0, help='torch threads, 0 for the default')
+    parser.add_argument('--max-length', type=int, default=100)
+    parser.add_argument('--max-new-tokens', type=int, default=0)
+    parser.add_argument('--runs', type=int, default=16)
+    parser.add_argument('--child', nargs=2, metavar=('MODEL', 'QUANTIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        model, quantize = args.child[0], args.child[1] == 'int8'
+        print(json.dumps(measure(model, quantize, args.threads, args.max_length, args.max_new_tokens, args.runs)))
+        return
+
+    print(f"{'model':<14}{'int8':>6}{'load s':>8}{'RSS MB':>8}{'model MB':>10}{'p50 ms':>8}{'p95 ms':>8}{'batch/s':>9}")
+    baseline = None
+    for model, quantize in OPTIONS:
+        command = [sys.executable, '-m', 'benchmarks.bench_inference',
+                   '--threads', str(args.threads), '--max-length', str(args.max_length),
+                   '--max-new-tokens', str(args.max_new_tokens), '--runs', str(args.runs),
+                   '--child', model, 'int8' if quantize else 'fp32']
+        output = subprocess.run(command, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{model:<14}{'yes' if quantize else 'no':>6}  failed: {output.stderr.strip().splitlines()[-1]}")
+            continue
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        baseline = baseline or result
+        print(f"{model:<14}{'yes' if quantize else 'no':>6}{result['load_seconds']:>8}{result['rss_mb']:>8}"
+              f"{result['model_rss_mb']:>10}{result['p50_ms']:>8}{result['p95_ms']:>8}{result['batch_prompts_per_s']:>9}"
+              f"   p50 {baseline['p50_ms'] / max(result['p50_ms'], 1):.1f}x vs baseline")
+
+
+if __name__ == '__main__':
+    main()
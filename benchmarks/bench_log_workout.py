@@ -0,0 +1,126 @@
+"""Measure /log_workout throughput when many users log at the same time.
+
+Simulates the end of a class: every thread is a logged-in user posting
+workouts as fast as it can. Each configuration runs in its own process
+against a fresh database, since the engine is configured at import.
+Run from the repository root:
+
+    python -m benchmarks.bench_log_workout
+    python -m benchmarks.bench_log_workout --threads 32 --database-url postgresql://app@localhost/bench
+
+A --database-url is used as is (its tables are dropped and recreated);
+otherwise each SQLite configuration gets a temporary file.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# name, environment
+SQLITE_OPTIONS = [
+    ('rollback journal, full sync', {'SQLITE_JOURNAL_MODE': 'delete', 'SQLITE_SYNCHRONOUS': 'full',
+                                     'SQLITE_WRITE_QUEUE': 'false'}),
+    ('wal, normal sync', {'SQLITE_JOURNAL_MODE': 'wal', 'SQLITE_SYNCHRONOUS': 'normal', 'SQLITE_WRITE_QUEUE': 'false'}),
+    ('wal, normal sync, writer', {'SQLITE_JOURNAL_MODE': 'wal', 'SQLITE_SYNCHRONOUS': 'normal',
+                                  'SQLITE_WRITE_QUEUE': 'true'}),
+]
+WORKOUT = {'exercises': [
+    {'name': 'Squats', 'sets': 3, 'reps': 10, 'weight': 60},
+    {'name': 'Push-ups', 'sets': 3, 'reps': 15},
+    {'name': 'Plank', 'sets': 3, 'reps': 30},
+]}
+
+
+def measure(threads, workouts):
+    logging.disable(logging.WARNING)
+    from app import User, app, db
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for i in range(threads):
+            user = User(username=f'bench{i}', email=f'bench{i}@example.com', age=30, weight=70,
+                        fitness_goal='muscle_gain', experience_level='intermediate')
+            user.set_password('benchpass')
+            db.session.add(user)
+        db.session.commit()
+
+    latencies, errors = [], []
+    start = threading.Barrier(threads + 1)
+
+    def member(i):
+        client = app.test_client()
+        client.post('/login', data={'username': f'bench{i}', 'password': 'benchpass'})
+        start.wait()
+        for _ in range(workouts):
+            started = time.perf_counter()
+            response = client.post('/log_workout', json=WORKOUT)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    members = [threading.Thread(target=member, args=(i,)) for i in range(threads)]
+    for thread in members:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in members:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'workouts_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+        'errors': len(errors),
+    }
+
+
+def run_child(args, env):
+    command = [sys.executable, '-m', 'benchmarks.bench_log_workout', '--threads', str(args.threads),
+               '--workouts', str(args.workouts), '--child']
+    output = subprocess.run(command, capture_output=True, text=True, env=dict(os.environ, **env))
+    if output.returncode != 0:
+        return None, output.stderr.strip().splitlines()[-1]
+    return json.loads(output.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', type=int, default=16, help='concurrent users')
+    parser.add_argument('--workouts', type=int, default=25, help='workouts logged per user')
+    parser.add_argument('--database-url', help='benchmark this database instead of SQLite files')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.threads, args.workouts)))
+        return
+
+    # Cheap hashes keep the logins out of the measurement
+    base_env = {'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1', 'PASSWORD_HASH_WORKERS': '0', 'PRELOAD_MODELS': 'false'}
+    print(f"{args.threads} users x {args.workouts} workouts")
+    print(f"{'configuration':<28}{'workouts/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+    if args.database_url:
+        runs = [(args.database_url.split(':')[0], {'DATABASE_URL': args.database_url})]
+    else:
+        directory = tempfile.mkdtemp(prefix='bench_log_workout_')
+        runs = [(name, dict(env, DATABASE_URL=f"sqlite:///{os.path.join(directory, f'run{i}.db')}"))
+                for i, (name, env) in enumerate(SQLITE_OPTIONS)]
+    for name, env in runs:
+        result, error = run_child(args, dict(base_env, **env))
+        if result is None:
+            print(f"{name:<28}  failed: {error}")
+            continue
+        print(f"{name:<28}{result['workouts_per_s']:>11}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
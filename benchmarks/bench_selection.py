@@ -0,0 +1,57 @@
+"""Time personalized exercise selection against catalogs of increasing size.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_selection
+"""
+import itertools
+import random
+import timeit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from selection import ExerciseIndex, select_workout
+from workout_plans import EXERCISE_DATABASE, EXPERIENCE_LEVELS, FITNESS_GOALS
+
+ITERATIONS = 5000
+CATALOG_SIZES = [0, 100, 1000]
+CATEGORIES = ['cardio', 'bodyweight', 'strength', 'flexibility']
+
+
+def make_catalog(size, seed=42):
+    rng = random.Random(seed)
+    return [
+        SimpleNamespace(id=i, name=f'Exercise {i}', description='', category=rng.choice(CATEGORIES),
+                        difficulty=rng.choice(EXPERIENCE_LEVELS))
+        for i in range(size)
+    ]
+
+
+def make_history(catalog, now, seed=42):
+    # A user with a few months of training: bests for about a third of the catalog
+    rng = random.Random(seed)
+    names = [exercise['name'] for exercises in EXERCISE_DATABASE.values() for exercise in exercises]
+    names += [media.name for media in catalog[::3]]
+    return {
+        name: {'max_weight': rng.choice([0, 20, 40]), 'max_reps': rng.randint(5, 20), 'max_volume': 0,
+               'last_performed': now - timedelta(days=rng.randint(0, 60))}
+        for name in names
+    }
+
+
+def main():
+    now = datetime(2024, 5, 10)
+    combinations = itertools.cycle([(goal, level) for goal in FITNESS_GOALS for level in EXPERIENCE_LEVELS])
+
+    print(f"{'catalog':>8}{'history':>9}{'us/plan':>10}")
+    for size in CATALOG_SIZES:
+        catalog = make_catalog(size)
+        index = ExerciseIndex(EXERCISE_DATABASE)
+        index.rebuild(catalog)
+        history = make_history(catalog, now)
+        elapsed = timeit.timeit(lambda: select_workout(index, *next(combinations), history, now), number=ITERATIONS)
+        print(f"{size:>8}{len(history):>9}{elapsed / ITERATIONS * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
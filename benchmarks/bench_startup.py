@@ -0,0 +1,67 @@
+"""Measure cold start: time to import the app and to serve a first request.
+
+Each run is a fresh interpreter. 'eager AI stack' also imports transformers
+(and torch when installed), which is what every process paid while
+app.py imported the pipeline at module level.
+
+    python -m benchmarks.bench_startup
+"""
+import importlib.util
+import json
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+MB = 1024 * 1024
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+{extra}
+imported = time.perf_counter()
+from inference import current_rss_bytes
+rss_imported = current_rss_bytes()
+app.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+with app.app.app_context():
+    app.db.create_all()
+    status = app.app.test_client().get('/login').status_code
+first_request = time.perf_counter()
+print(json.dumps({{
+    'import_s': imported - started,
+    'first_request_s': first_request - started,
+    'rss_imported': rss_imported,
+    'rss_first_request': current_rss_bytes(),
+    'status': status,
+    'ai_loaded': 'transformers' in sys.modules,
+}}))
+'''
+
+
+def eager_imports():
+    modules = ['transformers'] + (['torch'] if importlib.util.find_spec('torch') else [])
+    return '\n'.join(f'import {module}' for module in modules)
+
+
+def run(extra):
+    samples = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, '-c', CHILD.format(extra=extra)],
+                                capture_output=True, text=True, check=True)
+        samples.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(sample[key] for sample in samples)
+            for key in ('import_s', 'first_request_s', 'rss_imported', 'rss_first_request')}
+
+
+def main():
+    scenarios = [('lazy (current)', ''), ('eager AI stack', eager_imports())]
+    print(f"{'scenario':<18}{'import ms':>10}{'first req ms':>14}{'RSS MB':>8}{'RSS after req':>15}")
+    for name, extra in scenarios:
+        result = run(extra)
+        print(f"{name:<18}{result['import_s'] * 1000:>10.0f}{result['first_request_s'] * 1000:>14.0f}"
+              f"{result['rss_imported'] / MB:>8.0f}{result['rss_first_request'] / MB:>15.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Compare building workout plans per request with the precomputed table.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_workout_plans
+"""
+import itertools
+import timeit
+
+from workout_plans import EXPERIENCE_LEVELS, FITNESS_GOALS, WorkoutPlanTable, build_plan
+
+ITERATIONS = 100000
+
+
+def main():
+    combinations = itertools.cycle([(goal, level) for goal in FITNESS_GOALS for level in EXPERIENCE_LEVELS])
+    table = WorkoutPlanTable()
+
+    # Sanity check: both paths must return the same plans
+    for goal in FITNESS_GOALS:
+        for level in EXPERIENCE_LEVELS:
+            assert table.get(goal, level) == build_plan(goal, level)
+
+    rebuild = timeit.timeit(lambda: build_plan(*next(combinations)), number=ITERATIONS)
+    lookup = timeit.timeit(lambda: table.get(*next(combinations)), number=ITERATIONS)
+
+    print(f"{'path':<12}{'us/plan':>10}")
+    print(f"{'rebuild':<12}{rebuild / ITERATIONS * 1e6:>10.2f}")
+    print(f"{'table':<12}{lookup / ITERATIONS * 1e6:>10.2f}")
+    print(f"speedup: {rebuild / lookup:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
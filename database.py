@@ -0,0 +1,140 @@
+"""Engine options for SQLite and server databases.
+
+Server databases (PostgreSQL, MySQL) get a bounded connection pool whose
+connections are recycled before the server or a proxy drops them, and
+checked with a cheap ping when taken from the pool.
+
+SQLite allows one writer at a time. WAL lets readers carry on while a
+write is in progress, synchronous=NORMAL drops the fsync from every commit
+(the database stays consistent; a power loss may lose the last commits),
+and busy_timeout makes a blocked writer wait for the lock instead of
+failing with "database is locked". WriteQueue runs a process's write
+transactions one after another on a single thread so they don't contend
+for that lock at all; between prefork workers busy_timeout still applies.
+"""
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+JOURNAL_MODES = {'delete', 'truncate', 'persist', 'memory', 'wal', 'off'}
+SYNCHRONOUS_MODES = {'off', 'normal', 'full', 'extra'}
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def is_sqlite_memory(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(url, pool_size=5, max_overflow=10, pool_recycle=1800, pool_timeout=30, pool_pre_ping=True,
+                   busy_timeout_ms=5000):
+    """Keyword arguments for create_engine (SQLALCHEMY_ENGINE_OPTIONS) for ``url``."""
+    if is_sqlite_memory(url):
+        # Flask-SQLAlchemy keeps the one in-memory connection in a StaticPool
+        return {}
+    if is_sqlite(url):
+        # Pool file connections instead of reopening one per checkout. The pool hands a
+        # connection to one thread at a time, so sqlite3's same-thread check can go
+        return {
+            'poolclass': QueuePool,
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_timeout': pool_timeout,
+            'connect_args': {'timeout': busy_timeout_ms / 1000, 'check_same_thread': False},
+        }
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': pool_recycle,
+        'pool_timeout': pool_timeout,
+        'pool_pre_ping': pool_pre_ping,
+    }
+
+
+def sqlite_pragmas(journal_mode='wal', synchronous='normal', busy_timeout_ms=5000):
+    journal_mode, synchronous = journal_mode.lower(), synchronous.lower()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"Unknown SQLite journal mode: {journal_mode}")
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f"Unknown SQLite synchronous mode: {synchronous}")
+    return [
+        f'PRAGMA journal_mode={journal_mode}',
+        f'PRAGMA synchronous={synchronous}',
+        f'PRAGMA busy_timeout={int(busy_timeout_ms)}',
+    ]
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """Run ``pragmas`` on a new connection; other drivers' connections are left alone."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+class WriteQueue:
+    """Runs write transactions one at a time on a dedicated thread.
+
+    ``run(fn, ...)`` blocks until ``fn`` has run inside its own app context
+    on the writer thread and returns its result (or raises its exception).
+    ``fn`` must commit or roll back itself and return plain data, not ORM
+    objects bound to the writer's session. The thread is started on first
+    use, so a preforking master that never writes doesn't fork with it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.writes = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args, **kwargs):
+        if threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        future = Future()
+        self._ensure_started()
+        self._queue.put((fn, args, kwargs, future))
+        return future.result()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, args, kwargs, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                # The app context's teardown removes the session after every write
+                with self.app.app_context():
+                    result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                self.writes += 1
+                future.set_result(result)
+
+    def stop(self):
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
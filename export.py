@@ -0,0 +1,143 @@
+"""Columnar export of logged workouts for analytics.
+
+    python export.py --out exports/                 # NumPy .npz chunks + manifest.json
+    python export.py --out exports/ --resume        # only rows added since the last run
+    python export.py --format csv --since 2024-01-01 > workouts.csv
+
+One row per logged exercise, joined to its workout in SQL. Rows are read in
+keyset pages on the exercise id, each page a short query of its own, so an
+export holds no long transaction and its memory stays at one page however
+large the tables are. A chunk is written per page: integer and float
+columns as arrays, dates as datetime64, and exercise names dictionary
+encoded (``name`` holds indexes into ``name_dictionary``). The manifest
+records the last exercise id, which --resume continues from; --since only
+keeps workouts dated on or after that day.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+# In the order export queries select them
+COLUMNS = ('exercise_id', 'workout_id', 'user_id', 'date', 'name', 'sets', 'reps', 'weight')
+# Stands in for a missing sets/reps value in the integer columns; weight uses NaN
+MISSING = -1
+MANIFEST = 'manifest.json'
+
+
+def rows_to_columns(rows):
+    """Turn a page of export rows into NumPy arrays keyed by column name."""
+    exercise_ids, workout_ids, user_ids, dates, names, sets, reps, weights = zip(*rows) if rows else ((),) * 8
+    name_dictionary, name_codes = np.unique(np.array(names, dtype=str), return_inverse=True)
+    return {
+        'exercise_id': np.array(exercise_ids, dtype=np.int64),
+        'workout_id': np.array(workout_ids, dtype=np.int64),
+        'user_id': np.array(user_ids, dtype=np.int64),
+        'date': np.array(dates, dtype='datetime64[us]'),
+        'name': name_codes.astype(np.int32),
+        'name_dictionary': name_dictionary,
+        'sets': np.array([MISSING if value is None else value for value in sets], dtype=np.int32),
+        'reps': np.array([MISSING if value is None else value for value in reps], dtype=np.int32),
+        'weight': np.array([np.nan if value is None else value for value in weights], dtype=np.float64),
+    }
+
+
+def write_npz(path, columns):
+    np.savez_compressed(path, **columns)
+
+
+def read_npz(path):
+    """Load a chunk with the names decoded back to strings."""
+    with np.load(path) as chunk:
+        columns = {name: chunk[name] for name in chunk.files}
+    columns['name'] = columns.pop('name_dictionary')[columns['name']]
+    return columns
+
+
+def csv_header():
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(COLUMNS)
+    return buffer.getvalue()
+
+
+def csv_page(rows):
+    """One page of export rows as CSV text."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+    return buffer.getvalue()
+
+
+def stream_csv(pages):
+    yield csv_header()
+    for rows in pages:
+        yield csv_page(rows)
+
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def export_npz(pages, directory, since=None):
+    """Write each page as a chunk and update the manifest; returns the manifest."""
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory) or {'columns': list(COLUMNS), 'chunks': [], 'rows': 0, 'last_exercise_id': 0}
+    exported_at = datetime.utcnow()
+    for rows in pages:
+        name = f"workouts-{exported_at:%Y%m%dT%H%M%S}-{len(manifest['chunks']):05d}.npz"
+        write_npz(os.path.join(directory, name), rows_to_columns(rows))
+        manifest['chunks'].append({'file': name, 'rows': len(rows), 'since': since.isoformat() if since else None,
+                                   'first_exercise_id': rows[0][0], 'last_exercise_id': rows[-1][0]})
+        manifest['rows'] += len(rows)
+        manifest['last_exercise_id'] = max(manifest['last_exercise_id'], rows[-1][0])
+    manifest['exported_at'] = exported_at.isoformat()
+    # Written last, so an interrupted export is resumed from the previous complete state
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def parse_since(value):
+    """``YYYY-MM-DD`` or an ISO timestamp; raises ValueError otherwise."""
+    return datetime.fromisoformat(value) if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export logged workouts for analytics.')
+    parser.add_argument('--format', choices=('npz', 'csv'), default='npz')
+    parser.add_argument('--out', default='exports', help='directory for npz chunks (csv goes to stdout)')
+    parser.add_argument('--since', type=parse_since, help='only workouts dated on or after this day')
+    parser.add_argument('--after', type=int, default=0, help='only rows after this exercise id')
+    parser.add_argument('--resume', action='store_true', help='continue after the last row in --out')
+    parser.add_argument('--page-size', type=int, help='rows per query and per chunk')
+    args = parser.parse_args(argv)
+
+    from app import app, export_pages
+
+    after = args.after
+    if args.resume:
+        manifest = read_manifest(args.out)
+        after = manifest['last_exercise_id'] if manifest else 0
+    with app.app_context():
+        pages = export_pages(since=args.since, after=after, page_size=args.page_size)
+        if args.format == 'csv':
+            for text in stream_csv(pages):
+                sys.stdout.write(text)
+            return
+        manifest = export_npz(pages, args.out, since=args.since)
+    print(f"{args.out} holds {manifest['rows']} rows in {len(manifest['chunks'])} chunks, "
+          f"up to exercise {manifest['last_exercise_id']}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
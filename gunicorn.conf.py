@@ -0,0 +1,32 @@
+"""gunicorn settings for serving the app in production.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is imported in the master (preload_app), and when_ready loads the
+health-tip model there with prefork.prepare_master, so the forked workers
+share its weights copy-on-write. pre_fork freezes the garbage collector
+before every fork, including workers restarted later, so a collection in
+a worker doesn't copy the shared pages (see prefork.py).
+"""
+import gc
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+# Each worker starts its own password-hashing pools, so hashing can use up to
+# workers x (PASSWORD_HASH_WORKERS + PASSWORD_HASH_BULK_WORKERS) cores; size them together
+workers = int(os.getenv('WORKERS', 2))
+# Requests mostly wait on SQL, the job queues or the model batcher, so each worker serves several at once
+worker_class = 'gthread'
+threads = int(os.getenv('THREADS', 8))
+preload_app = True
+
+
+def when_ready(server):
+    import app as app_module
+    from prefork import prepare_master
+
+    prepare_master(app_module)
+
+
+def pre_fork(server, worker):
+    gc.freeze()
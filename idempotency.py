@@ -0,0 +1,43 @@
+"""Idempotency keys for workout writes.
+
+Mobile clients retry a POST when the response is lost, e.g. on flaky gym
+Wi-Fi. A client that sends an ``Idempotency-Key`` header (any unique string,
+typically a UUID per logical write) gets the stored result of the first
+request back for every retry, instead of a duplicate workout. The key is
+saved in the same transaction as the write, so the two are committed or
+rolled back together. Reusing a key for a different request is refused.
+"""
+import hashlib
+import json
+from collections import namedtuple
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 64
+
+IdempotentRequest = namedtuple('IdempotentRequest', ['key', 'endpoint', 'fingerprint'])
+
+
+class IdempotencyKeyReused(Exception):
+    pass
+
+
+def request_fingerprint(endpoint, payload):
+    body = json.dumps([endpoint, payload], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def idempotent_request(key, endpoint, payload):
+    """None without a key; raises ValueError for keys that are empty or too long."""
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"Idempotency keys must be 1-{MAX_KEY_LENGTH} characters")
+    return IdempotentRequest(key, endpoint, request_fingerprint(endpoint, payload))
+
+
+def replay(request, endpoint, fingerprint, result):
+    """The stored ``result`` for a retry of ``request``; raises if the key was used for something else."""
+    if endpoint != request.endpoint or fingerprint != request.fingerprint:
+        raise IdempotencyKeyReused(request.key)
+    return result
@@ -0,0 +1,322 @@
+"""Model loading and inference helpers for the workout generator.
+
+Building a transformers pipeline takes seconds and hundreds of MB of
+allocations, so each model is loaded once per process and then shared by
+every request thread. Concurrent prompts are grouped into padded batches
+by MicroBatcher so a CPU worker runs one forward pass for many requests.
+
+transformers and torch are imported inside the loader functions, never at
+module level: importing them takes seconds, and most processes (scripts,
+tests, workers serving only pages) never generate a tip.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes():
+    """Return the resident set size of this process in bytes, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is the peak RSS in KB on Linux - the best we can do here
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
+
+
+# /proc/<pid>/smaps_rollup fields, in kB
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def process_memory(pid='self'):
+    """Unique (private) and shared memory of a process in bytes, or None off Linux.
+
+    ``pss`` charges each shared page to the processes mapping it in equal
+    parts, so summing it over the workers gives their real combined footprint.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as smaps:
+            lines = smaps.read().splitlines()
+    except OSError:
+        return None
+    values = {}
+    for line in lines:
+        name, _, rest = line.partition(':')
+        if name in SMAPS_FIELDS:
+            values[name] = int(rest.split()[0]) * 1024
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'unique': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+        'shared': values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0),
+    }
+
+
+def parameter_bytes(model):
+    """Size of the model weights in bytes for torch-backed pipelines.
+
+    Weights packed by dynamic quantization are not parameters, so for int8
+    models this undercounts; rss_delta_bytes in ModelRegistry.stats() does not.
+    """
+    module = getattr(model, 'model', model)
+    parameters = getattr(module, 'parameters', None)
+    if parameters is None:
+        return None
+    try:
+        return sum(p.numel() * p.element_size() for p in parameters())
+    except Exception:
+        return None
+
+
+def set_torch_threads(threads):
+    """Cap the intra-op threads torch uses per process; 0 keeps torch's default (all cores)."""
+    if threads <= 0:
+        return
+    import torch
+    torch.set_num_threads(threads)
+
+
+def conv1d_to_linear(module):
+    """Replace GPT-2's Conv1D projections with equivalent nn.Linear layers in place.
+
+    Dynamic quantization only rewrites nn.Linear, and GPT-2 style models
+    implement their attention and MLP projections as Conv1D (a transposed
+    Linear), so without this only the output head would be quantized.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            linear.weight = torch.nn.Parameter(child.weight.detach().t().contiguous())
+            linear.bias = torch.nn.Parameter(child.bias.detach())
+            setattr(module, name, linear)
+        else:
+            conv1d_to_linear(child)
+    return module
+
+
+def quantize_int8(model):
+    """Dynamically quantize the Linear layers of a torch model to int8 for CPU inference."""
+    import torch
+
+    conv1d_to_linear(model)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_text_generator(model_name, token=None, quantize=False, threads=0):
+    """Build a CPU text-generation pipeline, optionally int8-quantized.
+
+    ``model_name`` can be any causal LM on the Hub or a local path, e.g.
+    'gpt2-medium' or the smaller 'distilgpt2'.
+    """
+    from transformers import pipeline
+
+    set_torch_threads(threads)
+    generator = pipeline('text-generation', model=model_name, token=token)
+    if quantize:
+        generator.model = quantize_int8(generator.model)
+        generator.model.eval()
+    return generator
+
+
+def generation_kwargs(max_length=100, max_new_tokens=0):
+    """Length limits for generate(); ``max_new_tokens`` > 0 takes precedence over ``max_length``."""
+    kwargs = {'num_return_sequences': 1}
+    if max_new_tokens > 0:
+        kwargs['max_new_tokens'] = max_new_tokens
+    else:
+        kwargs['max_length'] = max_length
+    return kwargs
+
+
+class ModelRegistry:
+    """Loads named models lazily and shares them across threads."""
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            model = self._models.get(name)
+            if model is None:
+                model = self._load(name)
+        return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def _load(self, name):
+        loader = self._loaders[name]
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        model = loader()
+        load_seconds = time.perf_counter() - started
+        rss_after = current_rss_bytes()
+
+        self._models[name] = model
+        self._stats[name] = {
+            'load_seconds': round(load_seconds, 3),
+            'rss_delta_bytes': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            'parameter_bytes': parameter_bytes(model),
+            'loaded_at': time.time(),
+        }
+        logger.info(f"Loaded model '{name}' in {load_seconds:.2f}s")
+        return model
+
+    def preload(self):
+        for name in self._loaders:
+            self.get(name)
+
+    def unload(self, name):
+        with self._lock:
+            self._models.pop(name, None)
+            self._stats.pop(name, None)
+
+    def stats(self):
+        return {
+            name: dict(self._stats.get(name, {}), loaded=name in self._models)
+            for name in self._loaders
+        }
+
+
+class MicroBatcher:
+    """Collects concurrent prompts for a few milliseconds and runs them as one batch.
+
+    ``get_generator`` is called from the batching thread to obtain the
+    text-generation pipeline, and ``generate_kwargs`` are passed to every call.
+    ``on_batch(seconds, batch_size)`` is called after each successful batch.
+    """
+
+    def __init__(self, get_generator, max_batch_size=8, max_wait_ms=10, on_batch=None, **generate_kwargs):
+        self.get_generator = get_generator
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.on_batch = on_batch
+        self.generate_kwargs = generate_kwargs
+        self.batches = 0
+        self.prompts = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._prepared = set()
+
+    def submit(self, prompt):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((prompt, future))
+        return future
+
+    def generate(self, prompt, timeout=None):
+        return self.submit(prompt).result(timeout=timeout)
+
+    def stop(self):
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='tip-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then let the run loop see the stop signal
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = self._collect(item)
+            prompts = [prompt for prompt, _ in batch]
+            started = time.perf_counter()
+            try:
+                texts = self._generate_batch(prompts)
+            except Exception as e:
+                logger.error(f"Batched generation failed: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.prompts += len(prompts)
+            if self.on_batch is not None:
+                self.on_batch(time.perf_counter() - started, len(prompts))
+            for (_, future), text in zip(batch, texts):
+                future.set_result(text)
+
+    def _generate_batch(self, prompts):
+        generator = self.get_generator()
+        self._prepare(generator)
+        outputs = generator(prompts, batch_size=len(prompts), **self.generate_kwargs)
+        texts = []
+        for output in outputs:
+            # Pipelines return one list of sequences per prompt
+            if isinstance(output, list):
+                output = output[0]
+            texts.append(output['generated_text'])
+        return texts
+
+    def _prepare(self, generator):
+        # GPT-2 has no pad token; pad on the left with EOS so batched prompts line up
+        if id(generator) in self._prepared:
+            return
+        tokenizer = getattr(generator, 'tokenizer', None)
+        if tokenizer is not None and getattr(tokenizer, 'pad_token_id', None) is None:
+            tokenizer.pad_token_id = generator.model.config.eos_token_id
+            tokenizer.padding_side = 'left'
+        self._prepared.add(id(generator))
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'prompts': self.prompts,
+            'average_batch_size': round(self.prompts / self.batches, 2) if self.batches else 0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+        }
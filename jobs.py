@@ -0,0 +1,145 @@
+"""Background jobs for slow work that shouldn't hold a request thread.
+
+Jobs run on a bounded local thread pool. Results are kept in a TTL cache so
+clients can poll for them or stream them, and old jobs are dropped
+automatically. A queue given a ``store`` also saves every job there, so a
+poll that reaches another worker process still finds it.
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from caching import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, owner_id, **result):
+        self.id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.status = 'pending'
+        self.result = result
+        self.error = None
+        self.version = 0
+        # False for copies loaded from a store; those only change when reloaded
+        self.local = True
+        self.on_change = None
+        self._changed = threading.Condition()
+
+    @classmethod
+    def restore(cls, job_id, owner_id, status, result, error, version):
+        job = cls(owner_id, **result)
+        job.id, job.status, job.error, job.version, job.local = job_id, status, error, version, False
+        return job
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def update(self, status=None, error=None, **result):
+        with self._changed:
+            if status is not None:
+                self.status = status
+            if error is not None:
+                self.error = error
+            self.result.update(result)
+            self.version += 1
+            self._changed.notify_all()
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def wait(self, version, timeout=None):
+        """Block until the job changes past ``version``; returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def to_dict(self):
+        return dict(self.result, job_id=self.id, status=self.status, error=self.error)
+
+
+class JobQueue:
+    """``on_finish(job, waited, ran)`` is called with the seconds a job queued and ran.
+
+    ``store`` shares jobs between processes: ``add(job)`` and ``save(job)``
+    write a new and a changed job, ``load(job_id)`` returns a restored Job
+    or None once it expired.
+    """
+
+    def __init__(self, max_workers=2, max_jobs=1024, ttl=600, on_finish=None, store=None, poll_interval=1.0):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = TTLCache(maxsize=max_jobs, ttl=ttl)
+        self.on_finish = on_finish
+        self.store = store
+        self.poll_interval = poll_interval
+        self.queued = 0
+        self.running = 0
+        self._lock = threading.Lock()
+
+    def create(self, owner_id, **result):
+        job = Job(owner_id, **result)
+        self._jobs.set(job.id, job)
+        if self.store is not None:
+            self.store.add(job)
+            job.on_change = self._save
+        return job
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            # Created by another process; a copy as of now
+            job = self.store.load(job_id)
+        return job
+
+    def wait(self, job, version, timeout=None):
+        """Like ``job.wait``, but copies from the store are reloaded every ``poll_interval`` seconds."""
+        if job.local:
+            return job.wait(version, timeout)
+        deadline = time.monotonic() + (timeout if timeout is not None else float('inf'))
+        while job.version == version and time.monotonic() < deadline:
+            time.sleep(max(0, min(self.poll_interval, deadline - time.monotonic())))
+            current = self.store.load(job.id)
+            if current is None:
+                break
+            job.status, job.result, job.error, job.version = current.status, current.result, current.error, current.version
+        return job.version
+
+    def _save(self, job):
+        # The job itself still finishes if the store is unavailable; only other processes miss the update
+        try:
+            self.store.save(job)
+        except Exception as e:
+            logger.error(f"Saving job {job.id} failed: {str(e)}")
+
+    def submit(self, job, fn, *args, **kwargs):
+        """Run ``fn`` in the pool; the dict it returns is merged into the job result."""
+        submitted = time.monotonic()
+
+        def run():
+            started = time.monotonic()
+            self._count(queued=-1, running=1)
+            job.update(status='running')
+            try:
+                job.update(status='done', **fn(*args, **kwargs))
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {str(e)}")
+                job.update(status='failed', error=str(e))
+            finally:
+                self._count(running=-1)
+                if self.on_finish is not None:
+                    self.on_finish(job, started - submitted, time.monotonic() - started)
+
+        self._count(queued=1)
+        self._executor.submit(run)
+        return job
+
+    def _count(self, queued=0, running=0):
+        with self._lock:
+            self.queued += queued
+            self.running += running
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
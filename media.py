@@ -0,0 +1,92 @@
+"""Storage and processing for uploaded exercise media.
+
+Uploads are copied to disk in fixed-size chunks under a content-hash name,
+so identical files are stored once. Resized thumbnails and responsive
+image variants are produced later, off the request path.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (320, 320)
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+
+
+def store_upload(file_storage, directory, chunk_size=CHUNK_SIZE):
+    """Write an upload to ``directory`` and return ``(filename, created)``.
+
+    ``created`` is False when an identical file was already stored.
+    """
+    extension = file_storage.filename.rsplit('.', 1)[1].lower()
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file_storage.stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+
+        filename = f"{digest.hexdigest()}.{extension}"
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            return filename, False
+        # Same directory, so the rename is atomic and readers never see a partial file
+        os.replace(temp_path, path)
+        return filename, True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def image_variant_name(filename, label):
+    stem, extension = filename.rsplit('.', 1)
+    return f"{stem}-{label}.{extension}"
+
+
+def image_variant_labels(widths=IMAGE_VARIANT_WIDTHS):
+    return ['thumb'] + [f'{width}w' for width in widths]
+
+
+def _save_variant(image, image_format, path):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(path, format=image_format, optimize=True)
+
+
+def generate_image_variants(path, output_dir, widths=IMAGE_VARIANT_WIDTHS, thumbnail_size=THUMBNAIL_SIZE):
+    """Write a cropped thumbnail and downscaled copies of the image at ``path``."""
+    filename = os.path.basename(path)
+    os.makedirs(output_dir, exist_ok=True)
+    created = []
+    with Image.open(path) as original:
+        image_format = original.format
+        image = ImageOps.exif_transpose(original)
+
+        thumbnail_name = image_variant_name(filename, 'thumb')
+        _save_variant(ImageOps.fit(image, thumbnail_size), image_format, os.path.join(output_dir, thumbnail_name))
+        created.append(thumbnail_name)
+
+        for width in widths:
+            # Never upscale
+            if width >= image.width:
+                continue
+            height = round(image.height * width / image.width)
+            variant_name = image_variant_name(filename, f'{width}w')
+            _save_variant(image.resize((width, height), Image.LANCZOS), image_format,
+                          os.path.join(output_dir, variant_name))
+            created.append(variant_name)
+
+    logger.info(f"Generated {len(created)} variants for {filename}")
+    return created
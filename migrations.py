@@ -1,5 +1,7 @@
+import sys
+from sqlalchemy import inspect
 from app import app, db
-from app import User, Workout  # Import all your models
+from app import User, rebuild_progress  # Importing app registers every model with db
 
 def init_db():
     with app.app_context():
@@ -11,5 +13,34 @@ def init_db():
         
         print("Database initialized successfully!")
 
+def upgrade():
+    # Add missing tables and indexes without touching existing data
+    with app.app_context():
+        db.create_all()
+        inspector = inspect(db.engine)
+        created = []
+        for table in db.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=db.engine)
+                    created.append(index.name)
+        print(f"Created {len(created)} indexes: {', '.join(created) or 'none'}")
+        return created
+
+def rebuild_summaries():
+    # Backfill weekly volume and personal bests from existing workouts
+    with app.app_context():
+        user_ids = [user_id for user_id, in db.session.query(User.id)]
+        for user_id in user_ids:
+            rebuild_progress(user_id)
+            db.session.commit()
+        print(f"Rebuilt progress summaries for {len(user_ids)} users")
+
 if __name__ == '__main__':
-    init_db()
+    if sys.argv[1:] == ['upgrade']:
+        upgrade()
+    elif sys.argv[1:] == ['rebuild-summaries']:
+        rebuild_summaries()
+    else:
+        init_db()
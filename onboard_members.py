@@ -0,0 +1,20 @@
+import json
+import sys
+from app import app, onboard_members
+from onboarding import parse_members
+
+def onboard(path):
+    content_type = 'text/csv' if path.lower().endswith('.csv') else 'application/json'
+    with open(path, 'rb') as f:
+        members = parse_members(f.read(), content_type)
+    with app.app_context():
+        report = onboard_members(members)
+    print(f"Created {report['created']} users, skipped {report['skipped']}")
+    for error in report['errors']:
+        print(json.dumps(error))
+    return report
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        raise SystemExit("Usage: python onboard_members.py members.csv|members.json")
+    onboard(sys.argv[1])
@@ -0,0 +1,156 @@
+"""Bulk onboarding of members, e.g. a gym partner's roster.
+
+A batch is validated as a whole, checked against existing users with
+set-based queries, hashed in parallel and inserted in chunked
+transactions instead of going through the register form row by row.
+"""
+import csv
+import io
+import json
+import logging
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ('username', 'email', 'password', 'age', 'weight')
+TEXT_FIELDS = ('username', 'email', 'password')
+# Keeps IN lists under the bound-parameter limit of older SQLite builds
+LOOKUP_CHUNK_SIZE = 450
+
+
+def parse_members(data, content_type='application/json'):
+    """Parse a JSON list (or {"members": [...]}) or a CSV document with a header row."""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    if 'csv' in content_type:
+        return list(csv.DictReader(io.StringIO(data)))
+    members = json.loads(data)
+    if isinstance(members, dict):
+        members = members.get('members', [])
+    return members
+
+
+def duplicate_user_message(error):
+    """Map a unique-constraint violation on the user table to the register form's message."""
+    detail = str(getattr(error, 'orig', error)).lower()
+    if 'username' in detail:
+        return 'Username already exists'
+    if 'email' in detail:
+        return 'Email already registered'
+    return 'User already exists'
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class MemberImporter:
+    def __init__(self, session, user_model, password_hasher, chunk_size=500):
+        self.session = session
+        self.User = user_model
+        self.password_hasher = password_hasher
+        self.chunk_size = chunk_size
+
+    def validate(self, members):
+        """Split members into insertable rows and per-row errors."""
+        rows, errors = [], []
+        seen_usernames, seen_emails = set(), set()
+        for index, member in enumerate(members):
+            if not isinstance(member, dict):
+                errors.append({'row': index, 'error': 'Expected an object'})
+                continue
+            missing = [field for field in REQUIRED_FIELDS if not member.get(field)]
+            if missing:
+                errors.append({'row': index, 'username': member.get('username'), 'error': f"Missing {', '.join(missing)}"})
+                continue
+            not_text = [field for field in TEXT_FIELDS if not isinstance(member[field], str)]
+            if not_text:
+                errors.append({'row': index, 'username': member['username'], 'error': f"{', '.join(not_text)} must be text"})
+                continue
+            try:
+                age = int(member['age'])
+                weight = float(member['weight'])
+            except (TypeError, ValueError):
+                errors.append({'row': index, 'username': member['username'], 'error': 'Age and weight must be valid numbers'})
+                continue
+
+            username = member['username'].strip()
+            email = member['email'].strip()
+            if username in seen_usernames or email in seen_emails:
+                errors.append({'row': index, 'username': username, 'error': 'Duplicate within batch'})
+                continue
+            seen_usernames.add(username)
+            seen_emails.add(email)
+            rows.append({
+                'row': index,
+                'username': username,
+                'email': email,
+                'password': member['password'],
+                'age': age,
+                'weight': weight,
+                'fitness_goal': member.get('fitness_goal') or 'maintenance',
+                'experience_level': member.get('experience_level') or 'beginner'
+            })
+        return rows, errors
+
+    def existing(self, rows):
+        """Return the usernames and emails from ``rows`` that are already taken."""
+        User = self.User
+        usernames, emails = set(), set()
+        for chunk in _chunks(rows, LOOKUP_CHUNK_SIZE):
+            matches = self.session.query(User.username, User.email).filter(or_(
+                User.username.in_([row['username'] for row in chunk]),
+                User.email.in_([row['email'] for row in chunk])
+            ))
+            for username, email in matches:
+                usernames.add(username)
+                emails.add(email)
+        return usernames, emails
+
+    def _insert(self, rows):
+        table = self.User.__table__
+        values = [{key: value for key, value in row.items() if key not in ('row', 'password')} for row in rows]
+        try:
+            self.session.execute(table.insert(), values)
+            self.session.commit()
+            return rows, []
+        except IntegrityError:
+            # Someone registered concurrently; retry row by row to isolate the conflict
+            self.session.rollback()
+        created, errors = [], []
+        for row, value in zip(rows, values):
+            try:
+                self.session.execute(table.insert(), [value])
+                self.session.commit()
+                created.append(row)
+            except IntegrityError as e:
+                self.session.rollback()
+                errors.append({'row': row['row'], 'username': row['username'], 'error': duplicate_user_message(e)})
+        return created, errors
+
+    def run(self, members):
+        rows, errors = self.validate(members)
+        taken_usernames, taken_emails = self.existing(rows)
+        new_rows = []
+        for row in rows:
+            if row['username'] in taken_usernames:
+                errors.append({'row': row['row'], 'username': row['username'], 'error': 'Username already exists'})
+            elif row['email'] in taken_emails:
+                errors.append({'row': row['row'], 'username': row['username'], 'error': 'Email already registered'})
+            else:
+                new_rows.append(row)
+
+        created = 0
+        for chunk in _chunks(new_rows, self.chunk_size):
+            hashes = self.password_hasher.hash_many([row['password'] for row in chunk])
+            for row, password_hash in zip(chunk, hashes):
+                row['password_hash'] = password_hash
+            inserted, insert_errors = self._insert(chunk)
+            created += len(inserted)
+            errors.extend(insert_errors)
+
+        logger.info(f"Onboarded {created} members, skipped {len(errors)}")
+        return {'created': created, 'skipped': len(errors), 'errors': sorted(errors, key=lambda error: error['row'])}
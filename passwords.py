@@ -0,0 +1,124 @@
+"""Password hashing off the request threads.
+
+PBKDF2 is deliberately CPU-heavy, so a login storm can otherwise occupy
+every worker. Hashes are computed in a small process pool sized to a fixed
+core budget per app process (each server worker has its own pool), and
+callers are rate limited per username before any hashing happens. Bulk
+hashing (member imports) has a pool of its own, so a long import can't
+queue ahead of logins and time them out.
+
+The pool is created on first use, inside a process that by then runs the
+batcher, database writer and job threads. Forking that process could copy
+a lock some other thread holds, so workers are started by a fork server
+(or spawned where there is none) instead of forked from it.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from itertools import repeat
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from caching import TTLCache
+
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class PasswordHashTimeout(Exception):
+    """The pool didn't hash within the timeout, e.g. because every worker is busy."""
+
+
+def normalize_method(method):
+    # 'pbkdf2:sha256' is stored as 'pbkdf2:sha256:<iterations>'
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2' and len(parts) == 2:
+        parts.append(str(DEFAULT_PBKDF2_ITERATIONS))
+    return ':'.join(parts)
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords, in a process pool when ``max_workers`` > 0.
+
+    ``hash_many`` uses a separate pool of ``bulk_workers`` processes, or the
+    calling thread when that is 0.
+    """
+
+    def __init__(self, method='pbkdf2:sha256', max_workers=0, timeout=30, bulk_workers=0):
+        self.method = normalize_method(method)
+        self.max_workers = max_workers
+        self.bulk_workers = bulk_workers
+        self.timeout = timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self, bulk=False):
+        pool = self._pools.get(bulk)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(bulk)
+                if pool is None:
+                    pool = self._pools[bulk] = ProcessPoolExecutor(
+                        max_workers=self.bulk_workers if bulk else self.max_workers,
+                        mp_context=multiprocessing.get_context(START_METHOD))
+        return pool
+
+    def _run(self, fn, *args):
+        if self.max_workers <= 0:
+            return fn(*args)
+        try:
+            return self._get_pool().submit(fn, *args).result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHashTimeout() from None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords, chunksize=32):
+        """Hash a batch of passwords in parallel, preserving order."""
+        if self.bulk_workers <= 0:
+            return [generate_password_hash(password, self.method) for password in passwords]
+        return list(self._get_pool(bulk=True).map(generate_password_hash, passwords, repeat(self.method),
+                                                  chunksize=chunksize))
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when the hash was made with different cost parameters than configured."""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.shutdown()
+            self._pools.clear()
+
+
+class RateLimiter:
+    """Sliding-window limit on attempts per key, e.g. per username."""
+
+    def __init__(self, max_attempts, window, maxsize=100000, timer=time.monotonic):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.timer = timer
+        self._attempts = TTLCache(maxsize=maxsize, ttl=window, timer=timer)
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Record an attempt and return False if ``key`` is over its limit."""
+        if self.max_attempts <= 0:
+            return True
+        now = self.timer()
+        with self._lock:
+            attempts = [t for t in self._attempts.get(key, []) if t > now - self.window]
+            if len(attempts) >= self.max_attempts:
+                return False
+            attempts.append(now)
+            self._attempts.set(key, attempts)
+            return True
+
+    def reset(self, key):
+        self._attempts.pop(key)
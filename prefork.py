@@ -0,0 +1,171 @@
+"""Preforking launcher that shares the loaded model between workers.
+
+    python prefork.py --workers 4 --bind 0.0.0.0:8000
+
+This is not a production server: each worker runs Werkzeug's development
+server. It exists to try the shared-model setup locally and measure it
+(SIGUSR1 below). In production run gunicorn with gunicorn.conf.py, which
+prepares its master with prepare_master() the same way.
+
+The master imports the app and loads the health-tip model, then forks the
+workers. The weights stay in pages that every worker maps copy-on-write,
+so N workers cost roughly one model plus their private heaps instead of N
+models. Before forking, gc.freeze() moves every existing object into the
+permanent generation: otherwise the first garbage collection in each
+worker writes to the GC headers of millions of shared objects and copies
+the pages holding them.
+
+Nothing may run inference in the master: torch's thread pools are not
+fork-safe once started. Send SIGUSR1 to the master to log the memory report
+(unique vs. shared per worker); /model_status shows it for the serving worker.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from inference import process_memory
+
+logger = logging.getLogger(__name__)
+
+MASTER_SIGNALS = {signal.SIGTERM, signal.SIGINT, signal.SIGUSR1}
+
+
+def memory_report(pids):
+    """Per-process memory plus totals, for the master and its workers."""
+    processes = {pid: process_memory(pid) for pid in pids}
+    processes = {pid: memory for pid, memory in processes.items() if memory is not None}
+    return {
+        'processes': processes,
+        'total_pss': sum(memory['pss'] for memory in processes.values()),
+        'total_rss': sum(memory['rss'] for memory in processes.values()),
+    }
+
+
+def format_report(report, master_pid):
+    mb = 1024 * 1024
+    lines = [f"{'pid':>8} {'role':<7}{'rss MB':>9}{'unique MB':>11}{'shared MB':>11}{'pss MB':>9}"]
+    for pid, memory in sorted(report['processes'].items()):
+        role = 'master' if pid == master_pid else 'worker'
+        lines.append(f"{pid:>8} {role:<7}{memory['rss'] / mb:>9.1f}{memory['unique'] / mb:>11.1f}"
+                     f"{memory['shared'] / mb:>11.1f}{memory['pss'] / mb:>9.1f}")
+    lines.append(f"total: {report['total_pss'] / mb:.1f} MB PSS (the sum of RSS would claim {report['total_rss'] / mb:.1f} MB)")
+    return '\n'.join(lines)
+
+
+def listen(bind, backlog=2048):
+    host, _, port = bind.rpartition(':')
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host.strip('[]') or '0.0.0.0', int(port)))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def prepare_master(app_module, preload=True):
+    """Load everything workers share, then make it safe to fork."""
+    if preload:
+        app_module.model_registry.preload()
+    with app_module.app.app_context():
+        app_module.current_exercise_index()
+        # Connections must not be shared between processes; workers open their own
+        app_module.db.session.remove()
+        app_module.db.engine.dispose()
+    gc.collect()
+    gc.freeze()
+
+
+def serve_worker(app, sock, threaded=True):
+    from werkzeug.serving import make_server
+
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=threaded, fd=sock.fileno())
+    server.serve_forever()
+
+
+class Master:
+    def __init__(self, app, sock, workers):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.children = set()
+        self.stopping = False
+
+    def spawn(self):
+        # Until the child has reset them, a signal would run the master's handlers in the worker
+        signal.pthread_sigmask(signal.SIG_BLOCK, MASTER_SIGNALS)
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            # Only the master reports; a `pkill -USR1` aimed at it must not kill the workers
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, MASTER_SIGNALS)
+            try:
+                serve_worker(self.app, self.sock)
+            except BaseException:
+                logger.exception(f"Worker {os.getpid()} crashed")
+                os._exit(1)
+            os._exit(0)
+        self.children.add(pid)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, MASTER_SIGNALS)
+        return pid
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.discard(pid)
+
+    def report(self, signum=None, frame=None):
+        logger.info('\n' + format_report(memory_report([os.getpid()] + sorted(self.children)), os.getpid()))
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGUSR1, self.report)
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info(f"Master {os.getpid()} serving on {self.sock.getsockname()} with {self.workers} workers")
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            self.children.discard(pid)
+            if self.stopping:
+                continue
+            # Respawned workers fork from the same prepared master, so they share the model too
+            logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            time.sleep(0.1)
+            if not self.stopping:
+                self.spawn()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the app from preforked workers sharing one model.')
+    parser.add_argument('--bind', default=os.getenv('BIND', '0.0.0.0:8000'))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WORKERS', 2)))
+    parser.add_argument('--no-preload', action='store_true', help='load the model lazily in each worker instead')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    import app as app_module
+
+    sock = listen(args.bind)
+    prepare_master(app_module, preload=not args.no_preload)
+    Master(app_module.app, sock, args.workers).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import os
+from app import app, prewarm_tip_cache, save_tip_cache
+
+def prewarm():
+    # Run at deploy time; workers load the file on start
+    if not os.getenv('HUGGINGFACE_API_KEY'):
+        raise SystemExit("Hugging Face API key not found. Please set HUGGINGFACE_API_KEY in your .env file")
+    buckets = prewarm_tip_cache()
+    saved = save_tip_cache()
+    print(f"Generated tips for {buckets} goal/age buckets, saved {saved} to {app.config['HEALTH_TIP_CACHE_FILE']}")
+
+if __name__ == '__main__':
+    prewarm()
@@ -0,0 +1,206 @@
+"""Opt-in CPU and allocation profiles of individual requests.
+
+A request is profiled when PROFILE_REQUESTS is on, or when it carries an
+``X-Profile`` header signed with PROFILE_SECRET:
+
+    python profiling.py token --ttl 600
+    curl -H "X-Profile: <token>" -X POST https://.../generate_workout
+
+The request runs under cProfile (its own thread only) and, with
+PROFILE_ALLOCATIONS, tracemalloc. Each profile is written to PROFILE_DIR as
+a ``.prof`` file for pstats/snakeviz plus a ``.json`` summary with the
+dominant frames and allocation sites; only the newest PROFILE_KEEP are
+kept. List the slowest with ``python profiling.py slowest`` or GET
+/profiles with the same header. Requests without the header and with the
+flag off only pay for one dict lookup.
+
+tracemalloc is process-wide: allocations of other requests running at the
+same time are counted too.
+"""
+import argparse
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+PROFILE_HEADER = 'X-Profile'
+TOP_FRAMES = 15
+TOP_ALLOCATIONS = 10
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def profile_token(secret, expires):
+    """Header value allowing profiles until the ``expires`` UNIX time."""
+    signature = hmac.new(secret.encode(), str(int(expires)).encode(), hashlib.sha256).hexdigest()
+    return f'{int(expires)}.{signature}'
+
+
+def verify_profile_token(secret, token, now=None):
+    if not secret or not token:
+        return False
+    expires, _, signature = token.partition('.')
+    try:
+        if int(expires) < (now or time.time()):
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(profile_token(secret, expires), token)
+
+
+def _start_tracing(frames):
+    # Shared by overlapping profiled requests; the last one to finish stops tracing
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _tracing_users = 1
+        elif _tracing_users:
+            _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users:
+            _tracing_users -= 1
+            if _tracing_users == 0:
+                tracemalloc.stop()
+
+
+def _frame_name(frame):
+    filename, line, function = frame
+    return f'{filename}:{line}({function})' if line else function
+
+
+class RequestProfile:
+    def __init__(self, trace_allocations=True, frames=1):
+        self.trace_allocations = trace_allocations
+        self.frames = frames
+        self.profiler = cProfile.Profile()
+        self.duration = None
+        self.allocations = []
+        self._before = None
+
+    def start(self):
+        if self.trace_allocations:
+            _start_tracing(self.frames)
+            self._before = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def stop(self):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self._started
+        if self._before is not None:
+            after = tracemalloc.take_snapshot()
+            _stop_tracing()
+            ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            self.allocations = after.filter_traces(ignored).compare_to(self._before.filter_traces(ignored), 'lineno')
+            self._before = None
+        return self
+
+    def top_frames(self, limit=TOP_FRAMES):
+        """Functions by time spent in their own code, the ones dominating the request first."""
+        stats = pstats.Stats(self.profiler).stats
+        frames = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [{
+            'frame': _frame_name(frame),
+            'calls': calls,
+            'self_ms': round(self_time * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        } for frame, (_, calls, self_time, cumulative, _) in frames]
+
+    def top_allocations(self, limit=TOP_ALLOCATIONS):
+        growing = [stat for stat in self.allocations if stat.size_diff > 0][:limit]
+        return [{'line': str(stat.traceback[0]), 'bytes': stat.size_diff, 'blocks': stat.count_diff}
+                for stat in growing]
+
+
+class ProfileStore:
+    def __init__(self, directory, keep=200):
+        self.directory = directory
+        self.keep = keep
+
+    def save(self, profile, **info):
+        """Write the profile and its summary; ``info`` describes the request."""
+        os.makedirs(self.directory, exist_ok=True)
+        # Names sort by time, to the microsecond, which is what pruning relies on
+        now = time.time()
+        name = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}{int(now % 1 * 1e6):06d}-{uuid.uuid4().hex[:8]}"
+        profile.profiler.dump_stats(os.path.join(self.directory, f'{name}.prof'))
+        summary = dict(info, name=name, recorded_at=time.time(), duration_ms=round(profile.duration * 1000, 2),
+                       top_frames=profile.top_frames(), top_allocations=profile.top_allocations())
+        with open(os.path.join(self.directory, f'{name}.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        self._prune()
+        return summary
+
+    def summaries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, filename)) as f:
+                        summaries.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # Pruned or still being written by another worker
+        return summaries
+
+    def slowest(self, limit=20):
+        return sorted(self.summaries(), key=lambda summary: summary['duration_ms'], reverse=True)[:limit]
+
+    def _prune(self):
+        # Runs after every saved profile, so it goes by file names and reads no summaries
+        names = sorted({os.path.splitext(filename)[0] for filename in os.listdir(self.directory)
+                        if filename.endswith(('.json', '.prof'))})
+        for name in names[:max(0, len(names) - self.keep)]:
+            for extension in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(self.directory, name + extension))
+                except FileNotFoundError:
+                    pass
+
+
+def format_slowest(summaries, frames=3):
+    lines = []
+    for summary in summaries:
+        lines.append(f"{summary['duration_ms']:>10.1f} ms  {summary.get('method', '')} {summary.get('path', '')} "
+                     f"-> {summary.get('status', '')}  {summary['name']}.prof")
+        for frame in summary['top_frames'][:frames]:
+            lines.append(f"{'':>15}{frame['self_ms']:>9.1f} ms self  {frame['frame']}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Request profiles: signed header tokens and the slowest requests.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    token = commands.add_parser('token', help='print an X-Profile header value signed with PROFILE_SECRET')
+    token.add_argument('--ttl', type=int, default=600, help='seconds the token is valid')
+    slowest = commands.add_parser('slowest', help='list the slowest profiled requests')
+    slowest.add_argument('--dir', default=os.getenv('PROFILE_DIR', 'profiles'))
+    slowest.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == 'token':
+        secret = os.getenv('PROFILE_SECRET')
+        if not secret:
+            raise SystemExit('PROFILE_SECRET is not set')
+        print(profile_token(secret, time.time() + args.ttl))
+    else:
+        print(format_slowest(ProfileStore(args.dir).slowest(args.limit)) or f'No profiles in {args.dir}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
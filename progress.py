@@ -0,0 +1,56 @@
+"""Progress summaries derived from logged workouts.
+
+Weekly volume and per-exercise personal bests are kept in summary rows that
+are updated as workouts are logged, so reading a user's progress costs the
+same after a week of training as after five years. The functions here only
+fold workouts into plain dicts; app.py applies them to the summary tables.
+"""
+from datetime import timedelta
+
+
+def week_start(date):
+    """Monday of the week containing ``date``."""
+    day = date.date() if hasattr(date, 'date') else date
+    return day - timedelta(days=day.weekday())
+
+
+def exercise_volume(sets, reps, weight):
+    return (sets or 0) * (reps or 0) * (weight or 0)
+
+
+def empty_week():
+    return {'workouts': 0, 'sets': 0, 'reps': 0, 'volume': 0.0}
+
+
+def empty_best():
+    return {'max_weight': 0.0, 'max_reps': 0, 'max_volume': 0.0, 'last_performed': None}
+
+
+def merge_best(best, max_weight, max_reps, max_volume, performed):
+    """Fold new maxima into ``best`` in place and return it."""
+    best['max_weight'] = max(best['max_weight'] or 0, max_weight or 0)
+    best['max_reps'] = max(best['max_reps'] or 0, max_reps or 0)
+    best['max_volume'] = max(best['max_volume'] or 0, max_volume or 0)
+    if performed is not None and (best['last_performed'] is None or performed > best['last_performed']):
+        best['last_performed'] = performed
+    return best
+
+
+def summarize(workouts):
+    """Aggregate ``(date, exercises)`` pairs into weekly totals and personal bests.
+
+    Each exercise is a dict with ``name``, ``sets``, ``reps`` and optional
+    ``weight``. Returns ``(weeks, bests)`` keyed by week start and exercise name.
+    """
+    weeks, bests = {}, {}
+    for date, exercises in workouts:
+        week = weeks.setdefault(week_start(date), empty_week())
+        week['workouts'] += 1
+        for exercise in exercises:
+            sets, reps, weight = exercise['sets'], exercise['reps'], exercise.get('weight', 0)
+            volume = exercise_volume(sets, reps, weight)
+            week['sets'] += sets or 0
+            week['reps'] += (sets or 0) * (reps or 0)
+            week['volume'] += volume
+            merge_best(bests.setdefault(exercise['name'], empty_best()), weight, reps, volume, date)
+    return weeks, bests
@@ -0,0 +1,74 @@
+"""Run EXPLAIN on the queries the app issues and flag full table scans.
+
+    python query_audit.py
+
+Exits with status 1 if any query scans a table without using an index.
+"""
+import sys
+from sqlalchemy import text
+from app import app, db, User, Workout, Exercise, ExerciseMedia, BackgroundJob, IdempotencyKey, PersonalBest, WeeklyVolume
+
+# Representative versions of the queries the request handlers run
+APP_QUERIES = {
+    'login: user by username': lambda: User.query.filter_by(username='someone'),
+    'register: user by email': lambda: User.query.filter_by(email='someone@example.com'),
+    'history: workouts by user, newest first': lambda: Workout.query.filter_by(user_id=1).order_by(Workout.date.desc(), Workout.id.desc()),
+    'history: exercises of a workout': lambda: Exercise.query.filter_by(workout_id=1),
+    'progress: weekly volume by user': lambda: WeeklyVolume.query.filter_by(user_id=1).order_by(WeeklyVolume.week_start.desc()),
+    'progress: personal bests by user': lambda: PersonalBest.query.filter_by(user_id=1).order_by(PersonalBest.exercise_name),
+    'exercises: by category': lambda: ExerciseMedia.query.filter_by(category='strength'),
+    'exercises: by category and difficulty': lambda: ExerciseMedia.query.filter_by(category='strength', difficulty='beginner'),
+    'exercises: by difficulty': lambda: ExerciseMedia.query.filter_by(difficulty='beginner'),
+    'log_workout: idempotency key': lambda: IdempotencyKey.query.filter_by(user_id=1, key='retry-1'),
+    'log_workout: expired idempotency keys': lambda: IdempotencyKey.query.filter(IdempotencyKey.created_at < '2024-01-01'),
+    'workout_jobs: job by id': lambda: BackgroundJob.query.filter(BackgroundJob.id == 'job', BackgroundJob.queue == 'workout', BackgroundJob.expires_at >= '2024-01-01'),
+    'workout_jobs: expired jobs': lambda: BackgroundJob.query.filter(BackgroundJob.expires_at < '2024-01-01'),
+    'exercises: keyset page': lambda: ExerciseMedia.query.filter(ExerciseMedia.id > 100).order_by(ExerciseMedia.id).limit(25),
+}
+
+def compile_query(query):
+    return str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+def explain(sql):
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return [row[-1] for row in rows]
+    rows = db.session.execute(text(f"EXPLAIN {sql}")).fetchall()
+    return [row[0] for row in rows]
+
+def is_flagged(plan_line):
+    # SQLite: "SCAN workout" without an index / temp sorts; PostgreSQL: "Seq Scan"
+    line = plan_line.upper()
+    if line.startswith('SCAN') and 'INDEX' not in line:
+        return True
+    return 'USE TEMP B-TREE' in line or 'SEQ SCAN' in line
+
+def audit_queries(queries=APP_QUERIES):
+    results = []
+    for name, build in queries.items():
+        plan = explain(compile_query(build()))
+        results.append({
+            'query': name,
+            'plan': plan,
+            'flagged': [line for line in plan if is_flagged(line)]
+        })
+    return results
+
+def main():
+    with app.app_context():
+        results = audit_queries()
+    for result in results:
+        status = 'SCAN' if result['flagged'] else 'ok'
+        print(f"[{status:>4}] {result['query']}")
+        for line in result['plan']:
+            print(f"         {line}")
+    flagged = [result for result in results if result['flagged']]
+    if flagged:
+        print(f"\n{len(flagged)} queries scan a table without an index")
+        if db.engine.dialect.name != 'sqlite':
+            print("Note: PostgreSQL prefers sequential scans on small tables; audit against realistic data")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""History-aware exercise selection.
+
+Exercises from the built-in EXERCISE_DATABASE and the ExerciseMedia catalog
+are held in an in-memory index keyed by (category, difficulty). Picking a
+workout scores the few candidates per slot against the user's recent
+history: exercises done in the last days are rotated out for variety, and
+ones with a logged best get a slightly heavier target (progressive
+overload). The index is updated entry by entry as the catalog changes, so
+no request has to query the catalog.
+"""
+import heapq
+import math
+import threading
+import time
+from datetime import datetime
+from operator import itemgetter
+
+from workout_plans import normalize_goal, normalize_level
+
+# Built-in exercises have no difficulty and suit every level
+ANY_DIFFICULTY = 'any'
+# Levels whose exercises a user may be given
+ALLOWED_DIFFICULTIES = {
+    'beginner': ('beginner', ANY_DIFFICULTY),
+    'intermediate': ('beginner', 'intermediate', ANY_DIFFICULTY),
+    'advanced': ('beginner', 'intermediate', 'advanced', ANY_DIFFICULTY),
+}
+# Catalog entries don't prescribe sets/reps, so they get their category's defaults
+CATEGORY_DEFAULTS = {
+    'cardio': (3, 15),
+    'bodyweight': (3, 12),
+    'strength': (3, 10),
+    'flexibility': (1, 30),
+}
+DEFAULT_SETS_REPS = (3, 10)
+
+WARM_UP = ('cardio', 3)
+COOL_DOWN = ('flexibility', 3)
+# Same category mix as workout_plans.build_plan
+GOAL_SLOTS = {
+    'weight_loss': (('cardio', 2), ('bodyweight', 2), ('flexibility', 1)),
+    'muscle_gain': (('strength', 3), ('bodyweight', 1), ('flexibility', 1)),
+    'maintenance': (('cardio', 1), ('bodyweight', 2), ('strength', 1), ('flexibility', 1)),
+}
+
+WARM_UP_PREFIX = ' Warm-up: '
+COOL_DOWN_PREFIX = 'Cool-down: '
+
+RECENT_DAYS = 7
+OVERLOAD_STEP = 0.025  # +2.5% on the best logged weight
+WEIGHT_INCREMENT = 0.5  # kg
+
+
+def base_name(name):
+    """Strip the warm-up/cool-down prefix a plan adds, so logged names match the catalog."""
+    name = name.strip()
+    for prefix in (WARM_UP_PREFIX.strip(), COOL_DOWN_PREFIX.strip()):
+        if name.startswith(prefix):
+            return name[len(prefix):].strip()
+    return name
+
+
+def builtin_entries(catalog):
+    entries = []
+    for category, exercises in catalog.items():
+        for exercise in exercises:
+            entries.append({
+                'key': ('builtin', category, exercise['name']),
+                'name': exercise['name'],
+                'category': category,
+                'difficulty': ANY_DIFFICULTY,
+                'sets': exercise['sets'],
+                'reps': exercise['reps'],
+                'description': exercise.get('description'),
+            })
+    return entries
+
+
+def media_entry(media):
+    """Index entry for an ExerciseMedia row (or anything with the same attributes)."""
+    sets, reps = CATEGORY_DEFAULTS.get(media.category, DEFAULT_SETS_REPS)
+    return {
+        'key': ('media', media.id),
+        'name': media.name,
+        'category': media.category,
+        'difficulty': (media.difficulty or ANY_DIFFICULTY).lower(),
+        'sets': sets,
+        'reps': reps,
+        'description': media.description,
+        'media_id': media.id,
+    }
+
+
+class ExerciseIndex:
+    def __init__(self, catalog, max_age=None, timer=time.monotonic):
+        self.catalog = catalog
+        self.max_age = max_age
+        self.timer = timer
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._keys = {}
+        self._loaded_at = None
+
+    def rebuild(self, media=()):
+        buckets, keys = {}, {}
+        for entry in builtin_entries(self.catalog) + [media_entry(row) for row in media]:
+            buckets.setdefault((entry['category'], entry['difficulty']), []).append(entry)
+            keys[entry['key']] = (entry['category'], entry['difficulty'])
+        # Buckets are tuples and replaced, never mutated, so readers need no lock
+        buckets = {bucket: tuple(entries) for bucket, entries in buckets.items()}
+        with self._lock:
+            self._buckets, self._keys = buckets, keys
+            self._loaded_at = self.timer()
+
+    def needs_rebuild(self):
+        if self._loaded_at is None:
+            return True
+        return self.max_age is not None and self.timer() - self._loaded_at > self.max_age
+
+    def upsert(self, entry):
+        with self._lock:
+            self._remove(entry['key'])
+            bucket = (entry['category'], entry['difficulty'])
+            self._buckets[bucket] = self._buckets.get(bucket, ()) + (entry,)
+            self._keys[entry['key']] = bucket
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        bucket = self._keys.pop(key, None)
+        if bucket is not None:
+            self._buckets[bucket] = tuple(entry for entry in self._buckets[bucket] if entry['key'] != key)
+
+    def buckets(self, category, experience_level):
+        buckets = self._buckets
+        return [buckets.get((category, difficulty), ()) for difficulty in ALLOWED_DIFFICULTIES[experience_level]]
+
+    def candidates(self, category, experience_level):
+        for entries in self.buckets(category, experience_level):
+            yield from entries
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def score(entry, experience_level, history, now):
+    """Higher is better. ``history`` maps exercise name to its personal best dict."""
+    value = 1.0 if entry['difficulty'] == experience_level else 0.5
+    best = history.get(entry['name'])
+    if best is None:
+        return value + 0.25  # Never done: a little novelty
+    last_performed = best.get('last_performed')
+    if last_performed is not None:
+        days_ago = (now - last_performed).total_seconds() / 86400
+        if days_ago < RECENT_DAYS:
+            # Rotate out what was just trained, most recent first
+            value -= (RECENT_DAYS - max(days_ago, 0)) / RECENT_DAYS
+    return value
+
+
+def prescribe(entry, experience_level, history):
+    """Sets/reps for the level, plus a target weight just above the logged best."""
+    sets, reps = entry['sets'], entry['reps']
+    # Same adjustment as workout_plans.build_plan
+    if experience_level == 'beginner':
+        sets, reps = min(sets, 2), int(reps * 0.7)
+    elif experience_level == 'advanced':
+        sets, reps = sets + 1, int(reps * 1.3)
+    exercise = {'name': entry['name'], 'sets': sets, 'reps': reps, 'description': entry['description']}
+    if 'media_id' in entry:
+        exercise['media_id'] = entry['media_id']
+
+    best = history.get(entry['name'])
+    if best and best.get('max_weight'):
+        # Round up so the target is always at least one plate increment heavier
+        target = best['max_weight'] * (1 + OVERLOAD_STEP)
+        exercise['target_weight'] = math.ceil(target / WEIGHT_INCREMENT) * WEIGHT_INCREMENT
+    elif best and best.get('max_reps', 0) >= reps:
+        # Bodyweight: aim one rep past the best instead
+        exercise['reps'] = best['max_reps'] + 1
+    return exercise
+
+
+def pick(index, category, count, experience_level, history, now, exclude=()):
+    scored = []
+    for entries in index.buckets(category, experience_level):
+        # Within a bucket an exercise without history outscores every one with history,
+        # so the scan can stop after ``count`` of them instead of scoring the whole catalog
+        unseen = 0
+        for entry in entries:
+            if entry['key'] in exclude:
+                continue
+            # Ties keep catalog order, so a user without history gets the classic plan
+            scored.append((score(entry, experience_level, history, now), -len(scored), entry))
+            if entry['name'] not in history:
+                unseen += 1
+                if unseen == count:
+                    break
+    return [entry for _, _, entry in heapq.nlargest(count, scored, key=itemgetter(0, 1))]
+
+
+def select_workout(index, fitness_goal, experience_level, history=None, now=None):
+    """Build a plan in the same shape as workout_plans.build_plan."""
+    goal = normalize_goal(fitness_goal)
+    level = normalize_level(experience_level)
+    history = history or {}
+    now = now or datetime.utcnow()
+
+    workout = []
+    for entry in pick(index, WARM_UP[0], WARM_UP[1], level, history, now):
+        workout.append({'name': f"{WARM_UP_PREFIX}{entry['name']}", 'sets': entry['sets'], 'reps': entry['reps']})
+
+    chosen = set()
+    for category, count in GOAL_SLOTS[goal]:
+        for entry in pick(index, category, count, level, history, now, exclude=chosen):
+            chosen.add(entry['key'])
+            workout.append(prescribe(entry, level, history))
+
+    for entry in pick(index, COOL_DOWN[0], COOL_DOWN[1], level, history, now):
+        workout.append({'name': f"{COOL_DOWN_PREFIX}{entry['name']}", 'sets': entry['sets'], 'reps': entry['reps']})
+    return workout
+
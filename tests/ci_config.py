@@ -1,5 +1,7 @@
 import os
 
+from database import engine_options
+
 # CI-specific test configuration
 CI_CONFIG = {
     'TESTING': True,
@@ -14,3 +16,4 @@ if 'DATABASE_URL' in os.environ:
     CI_CONFIG['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
 if 'SECRET_KEY' in os.environ:
     CI_CONFIG['SECRET_KEY'] = os.environ['SECRET_KEY']
+CI_CONFIG['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(CI_CONFIG['SQLALCHEMY_DATABASE_URI'])
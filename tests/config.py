@@ -1,6 +1,8 @@
 import os
 import secrets
 
+from database import engine_options
+
 # Test-specific secret key - different from production
 TEST_SECRET_KEY = 'test-only-not-for-production-' + secrets.token_hex(16)
 
@@ -12,3 +14,5 @@ TEST_CONFIG = {
     'WTF_CSRF_ENABLED': False,  # Disable CSRF for testing
     'LOGIN_DISABLED': False     # Enable login functionality in tests
 }
+# The app's options were chosen for its own DATABASE_URL
+TEST_CONFIG['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(TEST_CONFIG['SQLALCHEMY_DATABASE_URI'])
@@ -1,5 +1,5 @@
 import pytest
-from app import app as flask_app, db, User
+from app import app as flask_app, db, User, Workout, Exercise, PersonalBest, WeeklyVolume, IdempotencyKey, idempotency_cache, user_cache
 import os
 from tests.config import TEST_CONFIG
 
@@ -41,9 +41,18 @@ def test_user(app):
         user.set_password('testpass')
         db.session.add(user)
         db.session.commit()
+        user_id = user.id
         
         yield user
         
-        # Cleanup
-        db.session.delete(user)
+        # Cleanup, including anything the test logged for the user
+        workout_ids = [workout.id for workout in Workout.query.filter_by(user_id=user_id)]
+        Exercise.query.filter(Exercise.workout_id.in_(workout_ids)).delete(synchronize_session=False)
+        Workout.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        WeeklyVolume.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        PersonalBest.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        IdempotencyKey.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        User.query.filter_by(id=user_id).delete(synchronize_session=False)
         db.session.commit()
+        user_cache.clear()
+        idempotency_cache.clear()
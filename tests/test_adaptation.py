@@ -0,0 +1,80 @@
+import random
+
+from adaptation import adapt_columns, adapt_exercise, adapt_workouts
+
+
+def test_columns_match_per_exercise_rules():
+    """Test that the NumPy column path gives the same sets/reps as adapt_exercise"""
+    rng = random.Random(7)
+    levels = [rng.choice(['beginner', 'intermediate', 'advanced']) for _ in range(500)]
+    sets = [rng.randint(1, 6) for _ in range(500)]
+    reps = [rng.randint(1, 40) for _ in range(500)]
+
+    adapted = adapt_columns({'sets': sets, 'reps': reps, 'experience_level': levels}, 'intermediate')
+    expected = [adapt_exercise({'sets': s, 'reps': r}, level) for s, r, level in zip(sets, reps, levels)]
+    assert adapted['sets'] == [exercise['sets'] for exercise in expected]
+    assert adapted['reps'] == [exercise['reps'] for exercise in expected]
+
+
+def test_columns_pass_other_columns_through():
+    """Test that the default level applies and extra columns are kept"""
+    adapted = adapt_columns({'name': ['Squats', 'Plank'], 'sets': [1, 3], 'reps': [1, 10]}, 'beginner')
+    assert adapted == {'name': ['Squats', 'Plank'], 'sets': [1, 2], 'reps': [1, 8]}
+
+
+def test_workouts_use_their_own_level():
+    """Test that a workout's experience_level overrides the default"""
+    workouts = [
+        {'experience_level': 'advanced', 'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 10}]},
+        {'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 10}]}
+    ]
+    adapted = adapt_workouts(workouts, 'beginner')
+    assert adapted[0]['exercises'] == [{'name': 'Squats', 'sets': 4, 'reps': 12}]
+    assert adapted[1]['exercises'] == [{'name': 'Squats', 'sets': 2, 'reps': 8}]
+    assert workouts[0]['exercises'][0]['sets'] == 3  # Input is not modified
+
+
+def test_adapt_workouts_route(client, test_user):
+    """Test batch adaptation in both request shapes"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    response = client.post('/adapt_workouts', json={'columns': {
+        'sets': [3, 3], 'reps': [10, 10], 'experience_level': ['advanced', 'beginner']
+    }})
+    assert response.status_code == 200
+    assert response.get_json()['columns'] == {
+        'sets': [4, 2], 'reps': [12, 8], 'experience_level': ['advanced', 'beginner']
+    }
+
+    response = client.post('/adapt_workouts', json={'workouts': [
+        {'exercises': [{'name': 'Push-Ups', 'sets': 2, 'reps': 10}]}
+    ]})
+    assert response.status_code == 200
+    assert response.get_json()['workouts'][0]['exercises'][0]['sets'] == 2  # Intermediate is unchanged
+
+
+def test_adapt_workouts_rejects_mismatched_columns(client, test_user):
+    """Test that columns of different lengths are rejected"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    response = client.post('/adapt_workouts', json={'columns': {'sets': [3, 3], 'reps': [10]}})
+    assert response.status_code == 400
+
+
+def test_adapt_workouts_rejects_malformed_batches(client, test_user):
+    """Test that workouts or exercises that aren't objects are a 400, not a server error"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    for payload in ({'workouts': ['x']}, {'workouts': [{'exercises': ['x']}]}, {'workouts': [{'exercises': 'x'}]},
+                    ['x']):
+        assert client.post('/adapt_workouts', json=payload).status_code == 400
+
+
+def test_batches_take_only_integer_counts_in_range(client, test_user):
+    """Test that both batch shapes reject fractional, boolean and huge sets or reps with 400"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    for sets in (3.7, True, 10 ** 20, -1, '3'):
+        columns = {'columns': {'sets': [sets], 'reps': [10]}}
+        workouts = {'workouts': [{'exercises': [{'name': 'Squats', 'sets': sets, 'reps': 10}]}]}
+        assert client.post('/adapt_workouts', json=columns).status_code == 400
+        assert client.post('/adapt_workouts', json=workouts).status_code == 400
+    assert client.post('/adapt_workouts', json={'columns': {'sets': [3], 'reps': [10 ** 20]}}).status_code == 400
+    assert client.post('/adapt_workouts', json={'columns': {'sets': [], 'reps': []}}).get_json() == \
+        {'columns': {'sets': [], 'reps': []}}
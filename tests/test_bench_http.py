@@ -0,0 +1,42 @@
+import json
+
+from flask import Response
+
+from benchmarks.bench_http import compare, generation_failed, percentile, summarize
+
+
+def test_percentiles_use_nearest_rank():
+    """Test that percentiles pick an observed latency"""
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 99) == 0.099
+    assert percentile([0.2], 95) == 0.2
+    assert percentile([], 95) == 0.0
+
+    result = summarize(values, errors=0, elapsed=2.0)
+    assert result['rps'] == 50.0
+    assert result['p95_ms'] == 95.0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Test that slower p95, lower throughput and new errors are reported"""
+    baseline = {'log_workout': {'p95_ms': 50.0, 'rps': 100.0, 'errors': 0},
+                'exercises': {'p95_ms': 20.0, 'rps': 400.0, 'errors': 0}}
+    current = {'log_workout': {'p95_ms': 55.0, 'rps': 85.0, 'errors': 0},
+               'exercises': {'p95_ms': 30.0, 'rps': 400.0, 'errors': 2},
+               'login': {'p95_ms': 900.0, 'rps': 5.0, 'errors': 0}}
+
+    regressions = compare(baseline, current, threshold=0.2)
+    assert regressions == ['exercises: p95 20.0 -> 30.0 ms', 'exercises: 0 -> 2 errors']
+    assert len(compare(baseline, current, threshold=0.1)) == 3
+
+
+def test_generation_fallback_counts_as_an_error():
+    """Test that the fixed fallback plan from /generate_workout is not counted as a success"""
+    fallback = Response(json.dumps([{'name': 'Push-ups', 'sets': 3, 'reps': 10}]), mimetype='application/json')
+    generated = Response(json.dumps([{'name': 'Squats', 'sets': 3, 'reps': 10},
+                                     {'name': 'Health Tip: Stretch', 'sets': 0, 'reps': 0}]),
+                         mimetype='application/json')
+    assert generation_failed(fallback)
+    assert not generation_failed(generated)
+    assert generation_failed(Response('', status=500))
@@ -0,0 +1,36 @@
+from caching import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the oldest unused entry is evicted when full"""
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.set('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_entries_expire():
+    """Test that entries are dropped once their TTL has passed"""
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=60, timer=timer)
+    cache.set('tip', 'Stay hydrated')
+    timer.now = 59
+    assert cache.get('tip') == 'Stay hydrated'
+    timer.now = 61
+    assert cache.get('tip') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
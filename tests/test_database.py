@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
+
+from database import WriteQueue, apply_sqlite_pragmas, engine_options, sqlite_pragmas
+
+
+def test_server_database_gets_pool_options():
+    """Test that PostgreSQL URLs get a bounded, pre-pinged, recycled pool"""
+    options = engine_options('postgresql://app@db/fitness', pool_size=8, max_overflow=4, pool_recycle=600)
+    assert options == {'pool_size': 8, 'max_overflow': 4, 'pool_recycle': 600, 'pool_timeout': 30,
+                       'pool_pre_ping': True}
+
+
+def test_sqlite_options():
+    """Test that SQLite files get a busy timeout and in-memory databases keep their defaults"""
+    options = engine_options('sqlite:///fitness.db', busy_timeout_ms=2500)
+    assert options['poolclass'] is QueuePool
+    assert options['connect_args'] == {'timeout': 2.5, 'check_same_thread': False}
+    assert engine_options('sqlite:///:memory:') == {}
+
+
+def test_sqlite_pragmas_are_validated():
+    """Test that unknown journal and synchronous modes are rejected"""
+    assert sqlite_pragmas('WAL', 'NORMAL', 100) == [
+        'PRAGMA journal_mode=wal', 'PRAGMA synchronous=normal', 'PRAGMA busy_timeout=100']
+    with pytest.raises(ValueError):
+        sqlite_pragmas('wal; DROP TABLE user', 'normal')
+    with pytest.raises(ValueError):
+        sqlite_pragmas('wal', 'sometimes')
+
+
+def test_pragmas_applied_to_new_connections(tmp_path):
+    """Test that file connections come up in WAL mode with the busy timeout set"""
+    url = f"sqlite:///{tmp_path / 'fitness.db'}"
+    engine = create_engine(url, **engine_options(url, busy_timeout_ms=1234))
+    pragmas = sqlite_pragmas('wal', 'normal', 1234)
+    event.listen(engine, 'connect', lambda dbapi_connection, record: apply_sqlite_pragmas(dbapi_connection, pragmas))
+
+    with engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 1234
+    engine.dispose()
+
+
+def test_write_queue_runs_writes_one_at_a_time(app):
+    """Test that concurrent writes run serially on one thread and return their results"""
+    write_queue = WriteQueue(app)
+    active, overlaps, threads_seen = [], [], set()
+
+    def write(value):
+        active.append(value)
+        overlaps.append(len(active))
+        threads_seen.add(threading.current_thread().name)
+        active.remove(value)
+        return value * 2
+
+    results = {}
+    callers = [threading.Thread(target=lambda i=i: results.update({i: write_queue.run(write, i)})) for i in range(8)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    write_queue.stop()
+
+    assert results == {i: i * 2 for i in range(8)}
+    assert max(overlaps) == 1
+    assert threads_seen == {'db-writer'}
+    assert write_queue.writes == 8
+
+
+def test_write_queue_raises_in_caller(app):
+    """Test that an exception in a write is raised in the waiting request"""
+    write_queue = WriteQueue(app)
+
+    def fail():
+        raise ValueError('bad workout')
+
+    with pytest.raises(ValueError, match='bad workout'):
+        write_queue.run(fail)
+    assert write_queue.run(lambda: 'still running') == 'still running'
+    write_queue.stop()
@@ -0,0 +1,122 @@
+import csv
+import io
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app import app, commit_workouts, export_pages
+from export import export_npz, read_manifest, read_npz, rows_to_columns, stream_csv, write_npz
+
+ROWS = [
+    (1, 10, 7, datetime(2024, 5, 6, 7, 30), 'Squats', 3, 10, 60.0),
+    (2, 10, 7, datetime(2024, 5, 6, 7, 30), 'Plank', 3, None, None),
+    (3, 11, 8, datetime(2024, 5, 7), 'Squats', 4, 8, 80.0),
+]
+
+
+def test_rows_to_columns_round_trip(tmp_path):
+    """Test that a chunk keeps every value, with names dictionary encoded"""
+    columns = rows_to_columns(ROWS)
+    assert columns['name_dictionary'].tolist() == ['Plank', 'Squats']
+    assert columns['name'].tolist() == [1, 0, 1]
+    assert columns['reps'].tolist() == [10, -1, 8]
+    assert np.isnan(columns['weight'][1])
+
+    write_npz(tmp_path / 'chunk.npz', columns)
+    chunk = read_npz(tmp_path / 'chunk.npz')
+    assert chunk['name'].tolist() == ['Squats', 'Plank', 'Squats']
+    assert chunk['date'][0] == np.datetime64('2024-05-06T07:30')
+    assert chunk['user_id'].tolist() == [7, 7, 8]
+
+
+def test_empty_page_gives_empty_columns():
+    """Test that an empty export still has every column"""
+    columns = rows_to_columns([])
+    assert len(columns['exercise_id']) == 0
+    assert len(columns['name_dictionary']) == 0
+
+
+def test_stream_csv_writes_header_then_pages():
+    """Test that CSV output has a header row and ISO dates"""
+    text = ''.join(stream_csv([ROWS[:2], ROWS[2:]]))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0][:4] == ['exercise_id', 'workout_id', 'user_id', 'date']
+    assert rows[1] == ['1', '10', '7', '2024-05-06T07:30:00', 'Squats', '3', '10', '60.0']
+    assert rows[2][6:] == ['', '']
+    assert len(rows) == 4
+
+
+def test_export_npz_appends_chunks_on_resume(tmp_path):
+    """Test that a second export adds chunks and moves the manifest cursor"""
+    export_npz([ROWS[:2]], str(tmp_path))
+    manifest = export_npz([ROWS[2:]], str(tmp_path))
+
+    assert manifest == read_manifest(str(tmp_path))
+    assert manifest['rows'] == 3
+    assert manifest['last_exercise_id'] == 3
+    assert [chunk['rows'] for chunk in manifest['chunks']] == [2, 1]
+
+
+def log_history(user_id):
+    commit_workouts(user_id, [
+        {'date': '2024-01-05T08:00:00', 'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 10, 'weight': 50}]},
+        {'date': '2024-03-05T08:00:00', 'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 10, 'weight': 55},
+                                                      {'name': 'Lunges', 'sets': 3, 'reps': 12}]},
+        {'date': '2024-03-07T08:00:00', 'exercises': [{'name': 'Plank', 'sets': 3, 'reps': 30}]},
+    ])
+
+
+def test_export_pages_use_keyset_and_since(test_user):
+    """Test that pages continue after the last exercise id and filter on workout date"""
+    log_history(test_user.id)
+
+    pages = list(export_pages(page_size=2))
+    assert [len(page) for page in pages] == [2, 2]
+    ids = [row[0] for page in pages for row in page]
+    assert ids == sorted(ids)
+    assert all(row[2] == test_user.id for page in pages for row in page)
+
+    recent = [row for page in export_pages(since=datetime(2024, 3, 1), page_size=2) for row in page]
+    assert [row[4] for row in recent] == ['Squats', 'Lunges', 'Plank']
+    assert [row[0] for page in export_pages(after=ids[1]) for row in page] == ids[2:]
+
+
+@pytest.fixture
+def export_token():
+    app.config['EXPORT_API_TOKEN'] = 'export-secret'
+    yield {'Authorization': 'Bearer export-secret'}
+    app.config['EXPORT_API_TOKEN'] = None
+
+
+def test_export_endpoints(client, test_user, export_token):
+    """Test the CSV stream and the paged npz endpoint"""
+    log_history(test_user.id)
+    unauthorized = client.get('/export/workouts.csv')
+    assert unauthorized.status_code == 401
+    assert unauthorized.get_json() == {'error': 'Unauthorized'}
+    assert client.get('/export/workouts.csv?since=yesterday', headers=export_token).status_code == 400
+
+    response = client.get('/export/workouts.csv?since=2024-03-01', headers=export_token)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert [row[4] for row in rows[1:]] == ['Squats', 'Lunges', 'Plank']
+
+    app.config['EXPORT_PAGE_SIZE'] = 3
+    try:
+        first = client.get('/export/workouts.npz', headers=export_token)
+        after = first.headers['X-Export-Next-After']
+        last = client.get(f'/export/workouts.npz?after={after}', headers=export_token)
+    finally:
+        app.config['EXPORT_PAGE_SIZE'] = 5000
+    assert 'X-Export-Next-After' not in last.headers
+    with np.load(io.BytesIO(first.data)) as chunk:
+        assert len(chunk['exercise_id']) == 3
+    with np.load(io.BytesIO(last.data)) as chunk:
+        assert chunk['name_dictionary'][chunk['name']].tolist() == ['Plank']
+
+
+def test_export_disabled_without_token(client):
+    """Test that the export endpoints don't exist unless EXPORT_API_TOKEN is set"""
+    assert client.get('/export/workouts.csv').status_code == 404
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import Exercise, IdempotencyKey, WeeklyVolume, Workout, db, export_pages, idempotency_cache
+from idempotency import IdempotencyKeyReused, idempotent_request, replay
+
+WORKOUT = {'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 10, 'weight': 60}]}
+
+
+def login(client):
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+
+
+def test_idempotent_request_validates_keys():
+    """Test that keys are optional but must be 1-64 characters when given"""
+    assert idempotent_request(None, 'log_workout', WORKOUT) is None
+    request = idempotent_request(' retry-1 ', 'log_workout', WORKOUT)
+    assert request.key == 'retry-1'
+    assert request.fingerprint == idempotent_request('retry-1', 'log_workout', dict(WORKOUT)).fingerprint
+    with pytest.raises(ValueError):
+        idempotent_request('', 'log_workout', WORKOUT)
+    with pytest.raises(ValueError):
+        idempotent_request('k' * 65, 'log_workout', WORKOUT)
+
+
+def test_replay_refuses_a_different_request():
+    """Test that a key stored for one request can't replay another"""
+    request = idempotent_request('retry-1', 'log_workout', WORKOUT)
+    assert replay(request, 'log_workout', request.fingerprint, {'workout_ids': [1]}) == {'workout_ids': [1]}
+    with pytest.raises(IdempotencyKeyReused):
+        replay(request, 'log_workouts', request.fingerprint, {})
+    with pytest.raises(IdempotencyKeyReused):
+        replay(request, 'log_workout', 'other', {})
+
+
+def test_retried_log_workout_is_stored_once(client, test_user):
+    """Test that retries with the same key return the first result without a new workout"""
+    login(client)
+    headers = {'Idempotency-Key': 'workout-1'}
+    first = client.post('/log_workout', json=WORKOUT, headers=headers)
+    assert first.status_code == 200
+
+    retry = client.post('/log_workout', json=WORKOUT, headers=headers)
+    # A retry reaching another worker finds the key in the database instead of the cache
+    idempotency_cache.clear()
+    late_retry = client.post('/log_workout', json=WORKOUT, headers=headers)
+    assert retry.get_json() == late_retry.get_json() == first.get_json()
+    assert Workout.query.filter_by(user_id=test_user.id).count() == 1
+    assert WeeklyVolume.query.filter_by(user_id=test_user.id).one().workouts == 1
+
+    assert client.post('/log_workout', json=WORKOUT).status_code == 200
+    assert Workout.query.filter_by(user_id=test_user.id).count() == 2
+
+
+def test_key_reused_for_different_workout_is_refused(client, test_user):
+    """Test that reusing a key with another payload or endpoint is a conflict"""
+    login(client)
+    headers = {'Idempotency-Key': 'workout-1'}
+    client.post('/log_workout', json=WORKOUT, headers=headers)
+    other = {'exercises': [{'name': 'Lunges', 'sets': 3, 'reps': 12}]}
+    assert client.post('/log_workout', json=other, headers=headers).status_code == 409
+    assert client.post('/log_workouts', json={'workouts': [WORKOUT]}, headers=headers).status_code == 409
+    assert client.post('/log_workout', json=WORKOUT, headers={'Idempotency-Key': 'k' * 65}).status_code == 400
+    assert Workout.query.filter_by(user_id=test_user.id).count() == 1
+
+
+def test_invalid_exercises_are_rejected(client, test_user):
+    """Test that malformed exercises are refused and nothing is stored"""
+    login(client)
+    for exercises in ([], [{'name': 'Squats', 'sets': '3', 'reps': 10}],
+                      [{'name': 'Squats', 'sets': 3, 'reps': -1}], [{'name': '', 'sets': 3, 'reps': 10}],
+                      [{'name': 'Squats', 'sets': 3, 'reps': 10, 'weight': 'heavy'}],
+                      [{'name': 'Squats', 'sets': 2 ** 70, 'reps': 10}], [{'name': 'Squats', 'sets': 3, 'reps': 10 ** 6}],
+                      [{'name': 'Squats', 'sets': 3, 'reps': 10, 'weight': 10 ** 400}],
+                      [{'name': 'Squats', 'sets': 3, 'reps': 10, 'weight': 5000}]):
+        assert client.post('/log_workout', json={'exercises': exercises}).status_code == 400
+    # Infinity and NaN aren't valid JSON, but Python's parser accepts them
+    for weight in ('Infinity', '-Infinity', 'NaN'):
+        body = '{"exercises": [{"name": "Squats", "sets": 3, "reps": 10, "weight": %s}]}' % weight
+        assert client.post('/log_workout', data=body, content_type='application/json').status_code == 400
+    assert Workout.query.filter_by(user_id=test_user.id).count() == 0
+    assert IdempotencyKey.query.filter_by(user_id=test_user.id).count() == 0
+
+
+def test_append_adds_sets_to_workout_in_progress(client, test_user):
+    """Test that appended sets become new rows and update the summaries"""
+    login(client)
+    workout_id = client.post('/log_workout', json=WORKOUT).get_json()['workout_id']
+    url = f'/workouts/{workout_id}/exercises'
+
+    response = client.post(url, json={'exercises': [
+        {'name': 'Squats', 'sets': 1, 'reps': 10, 'weight': 60},
+        {'name': 'Plank', 'sets': 1, 'reps': 30}
+    ]}, headers={'Idempotency-Key': 'append-1'})
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'success', 'workout_id': workout_id, 'exercises': 3}
+    # Retried append: no extra sets
+    client.post(url, json={'exercises': [
+        {'name': 'Squats', 'sets': 1, 'reps': 10, 'weight': 60},
+        {'name': 'Plank', 'sets': 1, 'reps': 30}
+    ]}, headers={'Idempotency-Key': 'append-1'})
+
+    # Earlier rows are left as they were, so an export resuming after the first row sees every appended set
+    exercises = Exercise.query.filter_by(workout_id=workout_id).order_by(Exercise.id).all()
+    assert [(exercise.name, exercise.sets) for exercise in exercises] == [('Squats', 3), ('Squats', 1), ('Plank', 1)]
+    assert [row[0] for page in export_pages(after=exercises[0].id) for row in page] == [exercises[1].id, exercises[2].id]
+    week = WeeklyVolume.query.filter_by(user_id=test_user.id).one()
+    assert (week.workouts, week.sets, week.volume) == (1, 5, 4 * 10 * 60)
+
+
+def test_append_only_to_own_open_workouts(client, test_user):
+    """Test that old workouts are closed and other users' workouts don't exist"""
+    login(client)
+    old_id = client.post('/log_workouts', json={'workouts': [
+        dict(WORKOUT, date=(datetime.utcnow() - timedelta(days=2)).isoformat())
+    ]}).get_json()['workout_ids'][0]
+    assert client.post(f'/workouts/{old_id}/exercises', json=WORKOUT).status_code == 409
+
+    other = Workout(user_id=test_user.id + 1000)
+    db.session.add(other)
+    db.session.commit()
+    try:
+        assert client.post(f'/workouts/{other.id}/exercises', json=WORKOUT).status_code == 404
+    finally:
+        db.session.delete(other)
+        db.session.commit()
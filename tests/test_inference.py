@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from unittest.mock import Mock, patch
+
+from inference import ModelRegistry, MicroBatcher, conv1d_to_linear, generation_kwargs, load_text_generator
+
+
+def test_registry_loads_model_once():
+    """Test that concurrent callers share a single model load"""
+    loader = Mock(return_value=object())
+    registry = ModelRegistry()
+    registry.register('health_tip', loader)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('health_tip'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loader.call_count == 1
+    assert len(set(id(model) for model in results)) == 1
+
+
+def test_registry_stats():
+    """Test that load time is reported once a model is loaded"""
+    registry = ModelRegistry()
+    registry.register('health_tip', lambda: object())
+    assert registry.stats()['health_tip']['loaded'] is False
+
+    registry.get('health_tip')
+    stats = registry.stats()['health_tip']
+    assert stats['loaded'] is True
+    assert stats['load_seconds'] >= 0
+
+    registry.unload('health_tip')
+    assert not registry.is_loaded('health_tip')
+
+
+def test_failed_load_is_retried():
+    """Test that a failing loader does not poison the registry"""
+    loader = Mock(side_effect=[RuntimeError('download failed'), 'model'])
+    registry = ModelRegistry()
+    registry.register('health_tip', loader)
+
+    with pytest.raises(RuntimeError):
+        registry.get('health_tip')
+    assert registry.get('health_tip') == 'model'
+
+
+def test_micro_batcher_groups_concurrent_prompts():
+    """Test that prompts submitted together run as one batch and fan back out"""
+    calls = []
+
+    def fake_generator(prompts, **kwargs):
+        calls.append((list(prompts), kwargs))
+        return [[{'generated_text': f'tip for {prompt}'}] for prompt in prompts]
+
+    batcher = MicroBatcher(lambda: fake_generator, max_batch_size=4, max_wait_ms=200, max_length=100)
+    futures = [batcher.submit(f'prompt {i}') for i in range(4)]
+    results = [future.result(timeout=5) for future in futures]
+    batcher.stop()
+
+    assert results == [f'tip for prompt {i}' for i in range(4)]
+    assert len(calls) == 1
+    assert calls[0][1]['max_length'] == 100
+    assert batcher.stats()['average_batch_size'] == 4
+
+
+def test_micro_batcher_propagates_errors():
+    """Test that a failed batch raises in every waiting request"""
+    def failing_generator(prompts, **kwargs):
+        raise RuntimeError('out of memory')
+
+    batcher = MicroBatcher(lambda: failing_generator, max_batch_size=2, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match='out of memory'):
+        batcher.generate('prompt', timeout=5)
+    batcher.stop()
+
+
+def test_micro_batcher_reports_batch_time():
+    """Test that on_batch is called with the model time and batch size"""
+    batches = []
+    batcher = MicroBatcher(lambda: lambda prompts, **kwargs: [[{'generated_text': 'tip'}] for _ in prompts],
+                           max_wait_ms=1, on_batch=lambda seconds, size: batches.append((seconds, size)))
+    batcher.generate('prompt', timeout=5)
+    batcher.stop()
+
+    assert len(batches) == 1
+    assert batches[0][0] >= 0 and batches[0][1] == 1
+
+
+def test_generation_kwargs():
+    """Test that max_new_tokens replaces max_length when set"""
+    assert generation_kwargs(100) == {'num_return_sequences': 1, 'max_length': 100}
+    assert generation_kwargs(100, 40) == {'num_return_sequences': 1, 'max_new_tokens': 40}
+
+
+def test_load_text_generator_without_quantization():
+    """Test that the default backend is a plain pipeline for the configured model"""
+    with patch('transformers.pipeline') as mock_pipeline:
+        generator = load_text_generator('distilgpt2', token='key')
+    mock_pipeline.assert_called_once_with('text-generation', model='distilgpt2', token='key')
+    assert generator is mock_pipeline.return_value
+
+
+def test_conv1d_to_linear_keeps_outputs():
+    """Test that GPT-2 Conv1D layers are swapped for equivalent Linear layers"""
+    torch = pytest.importorskip('torch')
+    from transformers.pytorch_utils import Conv1D
+
+    model = torch.nn.Sequential(Conv1D(8, 4), torch.nn.ReLU(), torch.nn.Sequential(Conv1D(2, 8)))
+    x = torch.randn(3, 4)
+    expected = model(x)
+    conv1d_to_linear(model)
+
+    assert isinstance(model[0], torch.nn.Linear) and isinstance(model[2][0], torch.nn.Linear)
+    assert torch.allclose(model(x), expected, atol=1e-6)
+
+
+def test_app_import_does_not_load_ai_stack():
+    """Test that transformers/torch are only imported once a model is loaded"""
+    code = "import sys, app; print(sorted(m for m in ('transformers', 'torch') if m in sys.modules))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+    assert output.stdout.strip().splitlines()[-1] == '[]'
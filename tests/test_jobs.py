@@ -0,0 +1,128 @@
+import time
+from unittest.mock import patch
+
+from app import DatabaseJobStore
+from jobs import Job, JobQueue
+
+
+def wait_for(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        job.wait(job.version, timeout=0.1)
+    return job
+
+
+def test_job_queue_runs_job():
+    """Test that a submitted job's result is merged into the job"""
+    queue = JobQueue(max_workers=1)
+    job = queue.create(owner_id=1, exercises=['Squats'], tip=None)
+    queue.submit(job, lambda: {'tip': 'Stay hydrated'})
+
+    wait_for(job)
+    assert queue.get(job.id) is job
+    assert job.to_dict()['status'] == 'done'
+    assert job.result == {'exercises': ['Squats'], 'tip': 'Stay hydrated'}
+    queue.shutdown()
+
+
+def test_job_queue_records_failure():
+    """Test that exceptions mark the job as failed"""
+    queue = JobQueue(max_workers=1)
+    job = queue.create(owner_id=1)
+
+    def fail():
+        raise RuntimeError('model crashed')
+
+    queue.submit(job, fail)
+    wait_for(job)
+    assert job.status == 'failed'
+    assert job.error == 'model crashed'
+    queue.shutdown()
+
+
+def test_job_queue_reports_wait_and_run_times():
+    """Test that on_finish gets the time each job spent queued and running"""
+    finished = []
+    queue = JobQueue(max_workers=1, on_finish=lambda job, waited, ran: finished.append((job.status, waited, ran)))
+    jobs = [queue.create(owner_id=1) for _ in range(2)]
+    for job in jobs:
+        queue.submit(job, lambda: time.sleep(0.05) or {})
+    queue.shutdown()
+
+    assert [status for status, _, _ in finished] == ['done', 'done']
+    assert all(ran >= 0.05 for _, _, ran in finished)
+    # The second job waited for the first one on the single worker
+    assert finished[1][1] >= 0.04
+    assert queue.queued == 0 and queue.running == 0
+
+
+class MemoryStore:
+    """Stands in for a store shared between processes."""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def add(self, job):
+        self.save(job)
+
+    def save(self, job):
+        self.jobs[job.id] = (job.owner_id, job.status, dict(job.result), job.error, job.version)
+
+    def load(self, job_id):
+        return Job.restore(job_id, *self.jobs[job_id]) if job_id in self.jobs else None
+
+
+def test_job_found_through_another_queue_sharing_the_store():
+    """Test that a second queue, like another worker process, sees a job and waits for its result"""
+    store = MemoryStore()
+    queue, other = JobQueue(max_workers=1, store=store), JobQueue(max_workers=1, store=store, poll_interval=0.01)
+    job = queue.create(owner_id=1, exercises=['Squats'], tip=None)
+
+    copy = other.get(job.id)
+    assert not copy.local
+    assert copy.to_dict() == dict(job_id=job.id, status='pending', error=None, exercises=['Squats'], tip=None)
+
+    queue.submit(job, lambda: time.sleep(0.05) or {'tip': 'Stay hydrated'})
+    deadline = time.monotonic() + 5
+    while not copy.finished and time.monotonic() < deadline:
+        other.wait(copy, copy.version, timeout=0.5)
+    assert copy.status == 'done'
+    assert copy.result['tip'] == 'Stay hydrated'
+    assert other.get('missing') is None
+    queue.shutdown()
+    other.shutdown()
+
+
+def test_async_workout_generation(client, test_user):
+    """Test that async generation returns a job id and streams exercises before the tip"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+
+    tip = {'name': 'Health Tip: Stretch daily', 'sets': 0, 'reps': 0}
+    with patch('app.health_tip_exercise', return_value=tip):
+        response = client.post('/generate_workout?async=1')
+        assert response.status_code == 202
+        job = response.get_json()
+
+        stream = client.get(job['stream_url']).get_data(as_text=True)
+
+    assert stream.index('event: exercises') < stream.index('event: tip') < stream.index('event: done')
+
+    status = client.get(job['status_url']).get_json()
+    assert status['status'] == 'done'
+    assert status['tip'] == tip
+    assert status['exercises'] == job['exercises']
+    assert len(job['exercises']) > 0
+
+    # Another worker process finds the job in the database
+    other_worker = JobQueue(max_workers=1, store=DatabaseJobStore('workout', 60))
+    copy = other_worker.get(job['job_id'])
+    assert copy.owner_id == test_user.id
+    assert copy.to_dict() == status
+    other_worker.shutdown()
+
+
+def test_workout_job_not_found(client, test_user):
+    """Test that unknown job ids return 404"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    response = client.get('/workout_jobs/does-not-exist')
+    assert response.status_code == 404
@@ -0,0 +1,91 @@
+import io
+import os
+
+import pytest
+
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from media import generate_image_variants, image_variant_name, store_upload
+
+
+def make_upload(data, filename='photo.JPG'):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+def test_store_upload_deduplicates_by_content(tmp_path):
+    """Test that identical uploads are stored once under their content hash"""
+    filename, created = store_upload(make_upload(b'x' * 200000), str(tmp_path), chunk_size=4096)
+    assert created
+    assert filename.endswith('.jpg')
+
+    same, created_again = store_upload(make_upload(b'x' * 200000, 'copy.jpg'), str(tmp_path))
+    assert same == filename
+    assert not created_again
+
+    other, _ = store_upload(make_upload(b'y' * 10), str(tmp_path))
+    assert other != filename
+    # No temporary files are left behind
+    assert sorted(os.listdir(tmp_path)) == sorted([filename, other])
+
+
+def test_generate_image_variants(tmp_path):
+    """Test that thumbnails and downscaled variants are written without upscaling"""
+    source = tmp_path / 'abc.png'
+    Image.new('RGBA', (1000, 500), (255, 0, 0, 255)).save(source)
+
+    created = generate_image_variants(str(source), str(tmp_path / 'variants'), widths=(480, 960, 1440))
+
+    assert created == [image_variant_name('abc.png', label) for label in ('thumb', '480w', '960w')]
+    with Image.open(tmp_path / 'variants' / 'abc-480w.png') as variant:
+        assert variant.size == (480, 240)
+    with Image.open(tmp_path / 'variants' / 'abc-thumb.png') as thumbnail:
+        assert thumbnail.size == (320, 320)
+
+
+@pytest.fixture
+def media_folder(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    (tmp_path / 'videos').mkdir()
+    filename = 'a' * 64 + '.mp4'
+    (tmp_path / 'videos' / filename).write_bytes(bytes(range(256)) * 4)
+    (tmp_path / 'videos' / 'legacy.mp4').write_bytes(b'legacy video')
+    return filename
+
+
+def test_media_range_request(client, media_folder):
+    """Test that video seeking only downloads the requested bytes"""
+    response = client.get(f'/media/videos/{media_folder}', headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == bytes(range(10, 20))
+    assert response.headers['Content-Range'] == 'bytes 10-19/1024'
+
+
+def test_media_hashed_urls_are_immutable(client, media_folder):
+    """Test strong ETags and far-future caching for content-hashed files"""
+    response = client.get(f'/media/videos/{media_folder}')
+    assert response.status_code == 200
+    assert response.headers['ETag'] == '"' + 'a' * 64 + '"'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+
+    cached = client.get(f'/media/videos/{media_folder}', headers={'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
+
+    legacy = client.get('/media/videos/legacy.mp4')
+    assert 'immutable' not in legacy.headers['Cache-Control']
+
+
+def test_media_accel_redirect(app, client, media_folder, monkeypatch):
+    """Test offloading the file transfer to nginx"""
+    monkeypatch.setitem(app.config, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+    response = client.get(f'/media/videos/{media_folder}')
+    assert response.headers['X-Accel-Redirect'] == f'/protected-media/videos/{media_folder}'
+    assert response.data == b''
+
+
+def test_media_not_found(client, media_folder):
+    """Test unknown folders, missing files and path traversal"""
+    assert client.get('/media/secrets/x.mp4').status_code == 404
+    assert client.get('/media/videos/missing.mp4').status_code == 404
+    assert client.get('/media/videos/..%2F..%2Fapp.py').status_code == 404
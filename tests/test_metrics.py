@@ -0,0 +1,113 @@
+import re
+
+from app import app, request_sql_queries, sql_queries_total
+from metrics import MetricsRegistry
+
+
+def sample(text, name, **labels):
+    """Value of the sample ``name{labels}`` in a rendered exposition, or None."""
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        match = re.match(r'([^{ ]+)(?:\{(.*)\})? (\S+)$', line)
+        if match and match.group(1) == name:
+            found = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or ''))
+            if all(found.get(key) == str(value) for key, value in labels.items()):
+                return float(match.group(3))
+    return None
+
+
+def test_counter_renders_per_label_set():
+    """Test that counters keep one value per label combination"""
+    registry = MetricsRegistry()
+    counter = registry.counter('uploads_total', 'Uploads', ('kind',))
+    counter.inc(kind='images')
+    counter.inc(2, kind='images')
+    counter.inc(kind='videos')
+
+    text = registry.render()
+    assert '# TYPE uploads_total counter' in text
+    assert 'uploads_total{kind="images"} 3' in text
+    assert 'uploads_total{kind="videos"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test that histogram buckets count every observation at or below their bound"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_sum 5.55' in text
+    assert 'latency_seconds_count 3' in text
+
+
+def test_collectors_run_at_render_time():
+    """Test that collector samples are read on render and missing values skipped"""
+    registry = MetricsRegistry()
+    sizes = {'tips': 1}
+    registry.collector(lambda: [('cache_entries', 'gauge', 'Entries', [({'cache': name}, size) for name, size in sizes.items()]
+                                 + [({'cache': 'unloaded'}, None)])])
+    sizes['tips'] = 7
+
+    text = registry.render()
+    assert 'cache_entries{cache="tips"} 7' in text
+    assert 'unloaded' not in text
+
+
+def test_label_values_are_escaped():
+    """Test that quotes and newlines in label values are escaped"""
+    registry = MetricsRegistry()
+    registry.counter('errors_total', 'Errors', ('message',)).inc(message='bad "input"\n')
+    assert 'errors_total{message="bad \\"input\\"\\n"} 1' in registry.render()
+
+
+def test_metrics_endpoint_reports_requests_and_sql(client, test_user):
+    """Test that /metrics shows per-endpoint latency and SQL counts"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    requests_before = request_sql_queries.count(endpoint='progress')
+    queries_before = sql_queries_total.value(endpoint='progress')
+    assert client.get('/progress').status_code == 200
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert sample(text, 'http_requests_total', endpoint='progress', method='GET', status=200) >= 1
+    assert sample(text, 'http_request_duration_seconds_count', endpoint='progress', method='GET') >= 1
+    assert request_sql_queries.count(endpoint='progress') == requests_before + 1
+    assert sql_queries_total.value(endpoint='progress') > queries_before
+    assert sample(text, 'cache_hits_total', cache='user') is not None
+    assert sample(text, 'model_loaded', model='health_tip') is not None
+    assert sample(text, 'job_queue_depth', queue='workout') == 0
+
+
+def test_metrics_endpoint_requires_token_when_configured(client):
+    """Test that METRICS_TOKEN protects /metrics"""
+    app.config['METRICS_TOKEN'] = 'scrape-secret'
+    try:
+        assert client.get('/metrics').status_code == 401
+        response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        assert response.status_code == 200
+        assert '# TYPE http_requests_total counter' in response.get_data(as_text=True)
+    finally:
+        app.config['METRICS_TOKEN'] = None
+
+
+def test_queued_writes_count_towards_their_request(client, test_user):
+    """Test that SQL run on the writer thread is reported for the endpoint that queued it"""
+    assert app.config['SQLITE_WRITE_QUEUE']
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    requests_before = request_sql_queries.count(endpoint='log_workout')
+    queries_before = sql_queries_total.value(endpoint='log_workout')
+    response = client.post('/log_workout', json={'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 10}]})
+    assert response.status_code == 200
+
+    assert request_sql_queries.count(endpoint='log_workout') == requests_before + 1
+    assert sql_queries_total.value(endpoint='log_workout') > queries_before
+    text = client.get('/metrics').get_data(as_text=True)
+    assert sample(text, 'http_request_sql_queries_sum', endpoint='log_workout') > 0
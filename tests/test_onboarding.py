@@ -0,0 +1,128 @@
+import sqlite3
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from app import User, db
+from onboarding import duplicate_user_message, parse_members
+
+ROSTER = '''username,email,password,age,weight,fitness_goal
+member1,member1@gym.com,pass1,30,80,muscle_gain
+member2,member2@gym.com,pass2,41,65,
+testuser,other@gym.com,pass3,25,70,
+member3,test@example.com,pass4,25,70,
+member1,member1b@gym.com,pass5,30,80,
+member4,member4@gym.com,pass6,old,70,
+'''
+
+
+def delete_members():
+    User.query.filter(User.username.like('member%')).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def test_onboard_roster(app, client, test_user, monkeypatch):
+    """Test that a CSV roster is imported in bulk with per-row errors"""
+    monkeypatch.setitem(app.config, 'ONBOARDING_API_TOKEN', 'partner-token')
+    try:
+        response = client.post('/onboard_members', data=ROSTER, content_type='text/csv',
+                               headers={'Authorization': 'Bearer partner-token'})
+        report = response.get_json()
+
+        assert response.status_code == 200
+        assert report['created'] == 2
+        assert [(error['row'], error['error']) for error in report['errors']] == [
+            (2, 'Username already exists'),
+            (3, 'Email already registered'),
+            (4, 'Duplicate within batch'),
+            (5, 'Age and weight must be valid numbers'),
+        ]
+        member = User.query.filter_by(username='member2').first()
+        assert member.fitness_goal == 'maintenance'
+        assert member.check_password('pass2')
+    finally:
+        delete_members()
+
+
+def test_onboard_json_rows_with_non_text_fields(app, client, test_user, monkeypatch):
+    """Test that non-string usernames, emails or passwords are row errors, not a failed batch"""
+    monkeypatch.setitem(app.config, 'ONBOARDING_API_TOKEN', 'partner-token')
+    member = {'username': 'member1', 'email': 'member1@gym.com', 'password': 'pass1', 'age': 30, 'weight': 80}
+    try:
+        response = client.post('/onboard_members', headers={'Authorization': 'Bearer partner-token'}, json=[
+            member, dict(member, username=7), dict(member, username='member2', email=['a@gym.com']),
+            dict(member, username='member3', email='member3@gym.com', password=1234), dict(member, username=None)
+        ])
+        report = response.get_json()
+
+        assert response.status_code == 200
+        assert report['created'] == 1
+        assert [(error['row'], error['error']) for error in report['errors']] == [
+            (1, 'username must be text'),
+            (2, 'email must be text'),
+            (3, 'password must be text'),
+            (4, 'Missing username'),
+        ]
+    finally:
+        delete_members()
+
+
+def test_large_roster_is_imported_as_a_job(app, client, test_user, monkeypatch):
+    """Test that rosters over ONBOARDING_SYNC_LIMIT return 202 and report through the job"""
+    monkeypatch.setitem(app.config, 'ONBOARDING_API_TOKEN', 'partner-token')
+    monkeypatch.setitem(app.config, 'ONBOARDING_SYNC_LIMIT', 2)
+    headers = {'Authorization': 'Bearer partner-token'}
+    try:
+        response = client.post('/onboard_members', data=ROSTER, content_type='text/csv', headers=headers)
+        assert response.status_code == 202
+        status_url = response.get_json()['status_url']
+        assert client.get(status_url).status_code == 401
+
+        deadline = time.monotonic() + 10
+        report = client.get(status_url, headers=headers).get_json()
+        while report['status'] not in ('done', 'failed') and time.monotonic() < deadline:
+            time.sleep(0.05)
+            report = client.get(status_url, headers=headers).get_json()
+        assert report['status'] == 'done'
+        assert report['created'] == 2
+        assert len(report['errors']) == 4
+    finally:
+        delete_members()
+
+
+def test_onboarding_api_requires_token(app, client, monkeypatch):
+    """Test that the endpoint is disabled without a token and rejects wrong tokens"""
+    assert client.post('/onboard_members', json=[]).status_code == 404
+
+    monkeypatch.setitem(app.config, 'ONBOARDING_API_TOKEN', 'partner-token')
+    response = client.post('/onboard_members', json=[], headers={'Authorization': 'Bearer wrong'})
+    assert response.status_code == 401
+
+
+def test_parse_members_json():
+    """Test both accepted JSON shapes"""
+    assert parse_members('[{"username": "a"}]') == [{'username': 'a'}]
+    assert parse_members(b'{"members": [{"username": "a"}]}') == [{'username': 'a'}]
+
+
+def test_duplicate_user_message():
+    """Test mapping unique-constraint errors to the register form messages"""
+    def error(message):
+        return IntegrityError('INSERT INTO user ...', {}, sqlite3.IntegrityError(message))
+
+    assert duplicate_user_message(error('UNIQUE constraint failed: user.username')) == 'Username already exists'
+    assert duplicate_user_message(error('UNIQUE constraint failed: user.email')) == 'Email already registered'
+    assert duplicate_user_message(error('duplicate key value violates unique constraint "user_email_key"')) == \
+        'Email already registered'
+
+
+def test_register_duplicate_email(client, test_user):
+    """Test the register form's message for a taken email"""
+    response = client.post('/register', data={
+        'username': 'someoneelse',
+        'email': 'test@example.com',
+        'password': 'pass',
+        'age': '30',
+        'weight': '70'
+    }, follow_redirects=True)
+    assert b'Email already registered' in response.data
@@ -0,0 +1,105 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app import User, db
+from passwords import PasswordHashTimeout, PasswordHasher, RateLimiter
+from tests.test_caching import FakeTimer
+
+
+def test_hashing_in_process_pool():
+    """Test hashing and verifying passwords in worker processes"""
+    hasher = PasswordHasher('pbkdf2:sha256:1000', max_workers=1)
+    try:
+        password_hash = hasher.hash('secret')
+        assert password_hash.startswith('pbkdf2:sha256:1000$')
+        assert hasher.verify(password_hash, 'secret')
+        assert not hasher.verify(password_hash, 'wrong')
+        assert not hasher.verify(None, 'secret')
+        # Workers aren't forked from the multi-threaded app process
+        assert hasher._get_pool()._mp_context.get_start_method() != 'fork'
+    finally:
+        hasher.shutdown()
+
+
+def test_slow_pool_raises_timeout():
+    """Test that waiting longer than the timeout raises PasswordHashTimeout"""
+    hasher = PasswordHasher(max_workers=1, timeout=0.05)
+    try:
+        with pytest.raises(PasswordHashTimeout):
+            hasher._run(time.sleep, 0.5)
+    finally:
+        hasher.shutdown()
+
+
+def test_bulk_hashing_does_not_hold_up_logins():
+    """Test that a verify isn't queued behind a running import"""
+    hasher = PasswordHasher('pbkdf2:sha256:100000', max_workers=1, bulk_workers=1, timeout=5)
+    try:
+        password_hash = hasher.hash('secret')
+        importing = threading.Thread(target=hasher.hash_many, args=(['secret'] * 40,), kwargs={'chunksize': 1})
+        importing.start()
+        time.sleep(0.2)
+        assert hasher.verify(password_hash, 'secret')
+        assert importing.is_alive()
+        importing.join()
+    finally:
+        hasher.shutdown()
+
+
+def test_needs_rehash_when_cost_changes():
+    """Test that hashes made with other cost parameters are flagged"""
+    old = PasswordHasher('pbkdf2:sha256:1000').hash('secret')
+    assert PasswordHasher('pbkdf2:sha256:2000').needs_rehash(old)
+    assert not PasswordHasher('pbkdf2:sha256:1000').needs_rehash(old)
+    assert not PasswordHasher('pbkdf2:sha256').needs_rehash(PasswordHasher('pbkdf2:sha256').hash('secret'))
+
+
+def test_rate_limiter_window():
+    """Test that attempts are limited per key within the window"""
+    timer = FakeTimer()
+    limiter = RateLimiter(max_attempts=2, window=60, timer=timer)
+    assert limiter.allow('alice')
+    assert limiter.allow('alice')
+    assert not limiter.allow('alice')
+    assert limiter.allow('bob')
+
+    timer.now = 61
+    assert limiter.allow('alice')
+
+
+def test_login_rate_limited_before_hashing(client, test_user):
+    """Test that excess login attempts are rejected without checking the password"""
+    with patch('app.login_limiter', RateLimiter(max_attempts=2, window=60)):
+        for _ in range(2):
+            client.post('/login', data={'username': 'testuser', 'password': 'wrong'})
+        with patch('app.password_hasher.verify') as verify:
+            response = client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    assert response.status_code == 429
+    assert b'Too many login attempts' in response.data
+    verify.assert_not_called()
+
+
+def test_login_rehashes_outdated_password(client, test_user):
+    """Test that a successful login upgrades a hash made with old cost parameters"""
+    user = User.query.get(test_user.id)
+    user.password_hash = PasswordHasher('pbkdf2:sha256:1000').hash('testpass')
+    db.session.commit()
+
+    response = client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    assert response.status_code == 302
+
+    db.session.expire_all()
+    user = User.query.get(test_user.id)
+    assert not user.password_hash.startswith('pbkdf2:sha256:1000$')
+    assert user.check_password('testpass')
+
+
+def test_login_answers_503_when_hashing_times_out(client, test_user):
+    """Test that a busy hash pool fails the login with 503 instead of a server error"""
+    with patch('app.password_hasher.verify', side_effect=PasswordHashTimeout):
+        response = client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    assert response.status_code == 503
+    assert b'Login is busy' in response.data
@@ -0,0 +1,66 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+
+import pytest
+
+from inference import process_memory
+from prefork import format_report, memory_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = textwrap.dedent('''
+    import os, sys
+    from prefork import Master, listen
+
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [str(os.getpid()).encode()]
+
+    sock = listen('127.0.0.1:0')
+    print(sock.getsockname()[1], flush=True)
+    Master(app, sock, int(sys.argv[1])).run()
+''')
+
+
+def test_process_memory_splits_unique_and_shared():
+    """Test that smaps_rollup is parsed into unique and shared bytes"""
+    memory = process_memory()
+    if memory is None:
+        pytest.skip('/proc/self/smaps_rollup is not available')
+    assert memory['rss'] > 0
+    assert memory['unique'] + memory['shared'] == pytest.approx(memory['rss'], rel=0.05)
+
+    report = memory_report([os.getpid()])
+    assert report['total_pss'] == report['processes'][os.getpid()]['pss']
+    assert 'master' in format_report(report, os.getpid())
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='prefork needs os.fork')
+def test_master_serves_from_forked_workers_and_stops():
+    """Test that workers share the listening socket, are restarted, and stop with the master"""
+    master = subprocess.Popen([sys.executable, '-c', SERVER, '2'], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(master.stdout.readline())
+        url = f'http://127.0.0.1:{port}/'
+        worker = int(urllib.request.urlopen(url, timeout=5).read())
+        assert worker != master.pid
+
+        os.kill(worker, signal.SIGKILL)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            time.sleep(0.2)
+            if urllib.request.urlopen(url, timeout=5).read():
+                break
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=5) is not None
+        with pytest.raises(OSError):
+            urllib.request.urlopen(url, timeout=1)
+    finally:
+        if master.poll() is None:
+            master.kill()
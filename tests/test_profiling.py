@@ -0,0 +1,90 @@
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+
+from app import app
+from profiling import ProfileStore, RequestProfile, profile_token, verify_profile_token
+
+
+def busy_work():
+    return sum(len(str(i)) for i in range(20000))
+
+
+def test_profile_tokens_are_signed_and_expire():
+    """Test that only unexpired tokens signed with the secret are accepted"""
+    token = profile_token('secret', 2000)
+    assert verify_profile_token('secret', token, now=1000)
+    assert not verify_profile_token('secret', token, now=3000)
+    assert not verify_profile_token('other', token, now=1000)
+    assert not verify_profile_token('secret', '2000.' + '0' * 64, now=1000)
+    assert not verify_profile_token('secret', 'garbage', now=1000)
+    assert not verify_profile_token(None, token, now=1000)
+
+
+def test_request_profile_records_frames_and_allocations():
+    """Test that a profile names the dominant functions and allocation sites"""
+    profile = RequestProfile(trace_allocations=True).start()
+    busy_work()
+    kept = [bytearray(1024) for _ in range(100)]
+    profile.stop()
+
+    assert profile.duration > 0
+    assert any('busy_work' in frame['frame'] for frame in profile.top_frames())
+    assert any('test_profiling.py' in allocation['line'] for allocation in profile.top_allocations())
+    assert not tracemalloc.is_tracing()
+    assert len(kept) == 100
+
+
+def test_store_keeps_newest_and_lists_slowest(tmp_path):
+    """Test that old profiles are pruned and the slowest are listed first"""
+    store = ProfileStore(str(tmp_path), keep=2)
+    for duration in (0.3, 0.1, 0.2):
+        profile = RequestProfile(trace_allocations=False).start()
+        profile.stop()
+        profile.duration = duration
+        store.save(profile, path='/exercises')
+        time.sleep(0.01)
+
+    slowest = store.slowest()
+    assert [summary['duration_ms'] for summary in slowest] == [200.0, 100.0]
+    assert len(list(tmp_path.glob('*.prof'))) == 2
+
+
+def test_prune_reads_no_summaries(tmp_path):
+    """Test that saving a profile prunes by file name without opening the summaries"""
+    store = ProfileStore(str(tmp_path), keep=1)
+    for _ in range(2):
+        store.save(RequestProfile(trace_allocations=False).start().stop(), path='/exercises')
+    with patch('profiling.json.load') as load:
+        summary = store.save(RequestProfile(trace_allocations=False).start().stop(), path='/exercises')
+    load.assert_not_called()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"{summary['name']}.json", f"{summary['name']}.prof"]
+
+
+@pytest.fixture
+def profiling_config(tmp_path):
+    saved = {key: app.config[key] for key in ('PROFILE_SECRET', 'PROFILE_DIR', 'PROFILE_REQUESTS')}
+    app.config.update(PROFILE_SECRET='profile-secret', PROFILE_DIR=str(tmp_path), PROFILE_REQUESTS=False)
+    yield tmp_path
+    app.config.update(saved)
+
+
+def test_signed_header_profiles_one_request(client, test_user, profiling_config):
+    """Test that only requests with a valid X-Profile header are profiled and listed"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    token = profile_token('profile-secret', time.time() + 60)
+
+    assert 'X-Profile-Name' not in client.get('/exercises.json').headers
+    assert 'X-Profile-Name' not in client.get('/exercises.json', headers={'X-Profile': 'forged.token'}).headers
+    response = client.get('/exercises.json', headers={'X-Profile': token})
+    assert response.status_code == 200
+    name = response.headers['X-Profile-Name']
+    assert (profiling_config / f'{name}.prof').exists()
+
+    assert client.get('/profiles').status_code == 401
+    profiles = client.get('/profiles', headers={'X-Profile': token}).get_json()['profiles']
+    assert [profile['name'] for profile in profiles] == [name]
+    assert profiles[0]['endpoint'] == 'list_exercises_json'
+    assert profiles[0]['top_frames']
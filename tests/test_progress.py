@@ -0,0 +1,78 @@
+from datetime import date, datetime
+
+from app import PersonalBest, WeeklyVolume, db, rebuild_progress
+from progress import summarize, week_start
+
+
+def test_week_start_is_monday():
+    """Test that dates are bucketed into weeks starting on Monday"""
+    assert week_start(datetime(2024, 1, 7, 18, 30)) == date(2024, 1, 1)
+    assert week_start(date(2024, 1, 8)) == date(2024, 1, 8)
+
+
+def test_summarize_weeks_and_bests():
+    """Test weekly totals and per-exercise maxima"""
+    weeks, bests = summarize([
+        (datetime(2024, 1, 1), [{'name': 'Squats', 'sets': 3, 'reps': 10, 'weight': 50}]),
+        (datetime(2024, 1, 3), [{'name': 'Squats', 'sets': 2, 'reps': 12, 'weight': 40},
+                                {'name': 'Plank', 'sets': 1, 'reps': 1}]),
+    ])
+    assert weeks == {date(2024, 1, 1): {'workouts': 2, 'sets': 6, 'reps': 55, 'volume': 2460}}
+    assert bests['Squats'] == {'max_weight': 50, 'max_reps': 12, 'max_volume': 1500,
+                               'last_performed': datetime(2024, 1, 3)}
+    assert bests['Plank']['max_weight'] == 0
+
+
+def test_logging_updates_progress(client, test_user):
+    """Test that each logged workout is folded into the summary rows"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    client.post('/log_workouts', json={'workouts': [
+        {'date': '2024-01-01T10:00:00', 'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 10, 'weight': 50}]},
+        {'date': '2024-01-09T10:00:00', 'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 8, 'weight': 60}]}
+    ]})
+    client.post('/log_workouts', json={'workouts': [
+        {'date': '2024-01-10T10:00:00', 'exercises': [{'name': 'Squats', 'sets': 2, 'reps': 15, 'weight': 40}]}
+    ]})
+
+    data = client.get('/progress').get_json()
+    assert [(week['week_start'], week['workouts'], week['volume']) for week in data['weekly_volume']] == [
+        ('2024-01-01', 1, 1500), ('2024-01-08', 2, 2640)
+    ]
+    assert data['personal_bests'] == [{
+        'exercise': 'Squats', 'max_weight': 60, 'max_reps': 15, 'max_volume': 1500,
+        'last_performed': '2024-01-10T10:00:00'
+    }]
+
+
+def test_rebuild_matches_incremental_summaries(client, test_user):
+    """Test that rebuilding from history gives the same summaries as logging did"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    client.post('/log_workouts', json={'workouts': [
+        {'date': '2024-02-05T10:00:00', 'exercises': [{'name': 'Push-ups', 'sets': 3, 'reps': 12},
+                                                      {'name': 'Rows', 'sets': 3, 'reps': 10, 'weight': 12.5}]},
+        {'date': '2024-02-14T10:00:00', 'exercises': [{'name': 'Rows', 'sets': 4, 'reps': 8, 'weight': 15}]}
+    ]})
+    incremental = client.get('/progress').get_json()
+
+    rebuild_progress(test_user.id)
+    db.session.commit()
+    assert client.get('/progress').get_json() == incremental
+    assert WeeklyVolume.query.filter_by(user_id=test_user.id).count() == 2
+    assert PersonalBest.query.filter_by(user_id=test_user.id).count() == 2
+
+
+def test_history_pages_newest_first(client, test_user):
+    """Test that history is paged by date with exercises included"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    client.post('/log_workouts', json={'workouts': [
+        {'date': f'2024-03-0{day}T10:00:00', 'exercises': [{'name': 'Burpees', 'sets': 3, 'reps': day}]}
+        for day in (3, 1, 2)
+    ]})
+
+    first = client.get('/history?limit=2').get_json()
+    assert [workout['date'][:10] for workout in first['workouts']] == ['2024-03-03', '2024-03-02']
+    assert first['workouts'][0]['exercises'] == [{'name': 'Burpees', 'sets': 3, 'reps': 3, 'weight': 0}]
+
+    second = client.get(f"/history?limit=2&before={first['next_before']}").get_json()
+    assert [workout['date'][:10] for workout in second['workouts']] == ['2024-03-01']
+    assert second['next_before'] is None
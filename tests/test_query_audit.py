@@ -0,0 +1,19 @@
+from query_audit import audit_queries, is_flagged
+
+
+def test_app_queries_use_indexes(app):
+    """Test that none of the app's queries fall back to a full table scan"""
+    with app.app_context():
+        results = audit_queries()
+    assert results
+    assert [result['query'] for result in results if result['flagged']] == []
+
+
+def test_scan_detection():
+    """Test which plan lines count as table scans"""
+    assert is_flagged('SCAN workout')
+    assert is_flagged('SCAN TABLE exercise')
+    assert is_flagged('USE TEMP B-TREE FOR ORDER BY')
+    assert is_flagged('Seq Scan on workout  (cost=0.00..35.50 rows=10 width=16)')
+    assert not is_flagged('SEARCH workout USING INDEX ix_workout_user_id_date (user_id=?)')
+    assert not is_flagged('SCAN exercise_media USING COVERING INDEX ix_exercise_media_difficulty')
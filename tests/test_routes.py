@@ -1,6 +1,8 @@
+from datetime import datetime
+
 import pytest
 from flask_login import current_user
-from app import app
+from app import app, db, Workout, ExerciseMedia, exercise_list_cache
 
 def test_home_page(client):
     """Test that home page loads"""
@@ -60,3 +62,109 @@ def test_protected_route(client):
     response = client.get('/dashboard', follow_redirects=True)
     assert response.status_code == 200
     assert b'Please log in to access this page' in response.data
+
+def test_log_workout(client, test_user):
+    """Test that a logged workout stores all its exercises"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    response = client.post('/log_workout', json={'exercises': [
+        {'name': 'Push-ups', 'sets': 3, 'reps': 12, 'weight': 0},
+        {'name': 'Dumbbell Rows', 'sets': 3, 'reps': 10, 'weight': 12.5}
+    ]})
+    assert response.status_code == 200
+
+    workout = Workout.query.filter_by(user_id=test_user.id).order_by(Workout.id.desc()).first()
+    assert sorted(exercise.name for exercise in workout.exercises) == ['Dumbbell Rows', 'Push-ups']
+
+def test_log_workouts_batch(client, test_user):
+    """Test syncing several workouts in one request"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    response = client.post('/log_workouts', json={'workouts': [
+        {'date': '2024-01-01T10:00:00', 'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 15}]},
+        {'date': '2024-01-03T10:00:00', 'exercises': [
+            {'name': 'Squats', 'sets': 3, 'reps': 15},
+            {'name': 'Burpees', 'sets': 3, 'reps': 10}
+        ]}
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['exercises'] == 3
+
+    workouts = Workout.query.filter(Workout.id.in_(data['workout_ids'])).order_by(Workout.date).all()
+    assert [len(workout.exercises) for workout in workouts] == [1, 2]
+    assert workouts[0].date.year == 2024
+
+def test_log_workouts_invalid_batch_is_rolled_back(client, test_user):
+    """Test that one bad workout rejects the whole batch"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    before = Workout.query.count()
+    response = client.post('/log_workouts', json={'workouts': [
+        {'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 15}]},
+        {'exercises': [{'name': 'Missing sets'}]}
+    ]})
+    assert response.status_code == 400
+    assert Workout.query.count() == before
+
+def test_log_workouts_rejects_items_that_are_not_workouts(client, test_user):
+    """Test that a batch item that isn't an object is a 400, not a server error"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    for workouts in (['x'], [None], [{'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 15}]}, 7]):
+        assert client.post('/log_workouts', json={'workouts': workouts}).status_code == 400
+    assert Workout.query.filter_by(user_id=test_user.id).count() == 0
+
+def test_log_workouts_dates_with_offsets_are_stored_as_utc(client, test_user):
+    """Test that offset dates are accepted alike for new exercises and ones with a personal best"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    for date in ('2024-01-01T10:00:00+02:00', '2024-01-03T10:00:00-05:00'):
+        response = client.post('/log_workouts', json={'workouts': [
+            {'date': date, 'exercises': [{'name': 'Squats', 'sets': 3, 'reps': 15}]}
+        ]})
+        assert response.status_code == 200
+
+    dates = [workout.date for workout in Workout.query.filter_by(user_id=test_user.id).order_by(Workout.date)]
+    assert dates == [datetime(2024, 1, 1, 8), datetime(2024, 1, 3, 15)]
+
+@pytest.fixture
+def exercise_media(app):
+    with app.app_context():
+        exercise_list_cache.clear()
+        rows = [
+            ExerciseMedia(name=f'Exercise {i}', description='Test exercise', category=category, difficulty='beginner')
+            for i, category in enumerate(['strength', 'cardio', 'strength', 'strength', 'flexibility'])
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+
+        yield rows
+
+        ExerciseMedia.query.delete()
+        db.session.commit()
+        exercise_list_cache.clear()
+
+def test_exercises_keyset_pagination(client, exercise_media):
+    """Test paging through a filtered exercise list"""
+    first = client.get('/exercises.json?category=strength&limit=2').get_json()
+    assert [ex['name'] for ex in first['exercises']] == ['Exercise 0', 'Exercise 2']
+    assert first['next_after'] is not None
+
+    second = client.get(f"/exercises.json?category=strength&limit=2&after={first['next_after']}").get_json()
+    assert [ex['name'] for ex in second['exercises']] == ['Exercise 3']
+    assert second['next_after'] is None
+
+    response = client.get('/exercises?category=cardio')
+    assert response.status_code == 200
+    assert b'Exercise 1' in response.data
+    assert b'Exercise 0' not in response.data
+
+def test_exercise_list_cache_invalidated_on_create(client, test_user, exercise_media):
+    """Test that creating an exercise shows up in a previously cached listing"""
+    assert len(client.get('/exercises.json').get_json()['exercises']) == 5
+
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    client.post('/exercises/new', data={
+        'name': 'Plank',
+        'description': 'Core stability hold',
+        'category': 'strength',
+        'difficulty': 'beginner'
+    })
+    names = [ex['name'] for ex in client.get('/exercises.json').get_json()['exercises']]
+    assert 'Plank' in names
@@ -0,0 +1,119 @@
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app import ExerciseMedia, build_workout_plan, current_exercise_index, db, exercise_index
+from selection import ExerciseIndex, media_entry, pick, score, select_workout
+from workout_plans import EXERCISE_DATABASE, EXPERIENCE_LEVELS, FITNESS_GOALS, build_plan
+
+NOW = datetime(2024, 5, 10, 12, 0)
+
+
+def make_index(*media):
+    index = ExerciseIndex(EXERCISE_DATABASE)
+    index.rebuild(media)
+    return index
+
+
+def main_names(workout):
+    return [exercise['name'] for exercise in workout if 'Warm-up' not in exercise['name'] and 'Cool-down' not in exercise['name']]
+
+
+def test_without_history_matches_fixed_plans():
+    """Test that a new user with no catalog gets the classic plan"""
+    index = make_index()
+    for goal in FITNESS_GOALS:
+        for level in EXPERIENCE_LEVELS:
+            assert select_workout(index, goal, level, now=NOW) == build_plan(goal, level)
+
+
+def test_recent_exercises_are_rotated_out():
+    """Test that an exercise trained yesterday gives way to one not done recently"""
+    history = {'Push-ups': {'max_weight': 0, 'max_reps': 12, 'max_volume': 0, 'last_performed': NOW - timedelta(days=1)}}
+    workout = select_workout(make_index(), 'muscle_gain', 'intermediate', history, now=NOW)
+    assert 'Squats' in main_names(workout)
+    assert 'Push-ups' not in main_names(workout)
+
+
+def test_logged_best_sets_a_heavier_target():
+    """Test progressive overload on top of the logged personal best"""
+    history = {'Dumbbell Rows': {'max_weight': 20, 'max_reps': 12, 'max_volume': 720,
+                                 'last_performed': NOW - timedelta(days=30)}}
+    workout = select_workout(make_index(), 'muscle_gain', 'intermediate', history, now=NOW)
+    rows = next(exercise for exercise in workout if exercise['name'] == 'Dumbbell Rows')
+    assert rows['target_weight'] == 20.5
+
+
+def test_catalog_exercises_match_the_users_level():
+    """Test that catalog entries are used only up to the user's level"""
+    hard = SimpleNamespace(id=1, name='Muscle-ups', description='', category='strength', difficulty='advanced')
+    easy = SimpleNamespace(id=2, name='Band Rows', description='', category='strength', difficulty='beginner')
+    index = make_index(hard, easy)
+    assert 'Muscle-ups' not in main_names(select_workout(index, 'muscle_gain', 'beginner', now=NOW))
+    assert main_names(select_workout(index, 'muscle_gain', 'advanced', now=NOW))[0] == 'Muscle-ups'
+
+
+def test_early_exit_matches_scoring_every_candidate():
+    """Test that pick() returns the same exercises as ranking the whole catalog"""
+    rng = random.Random(3)
+    catalog = [SimpleNamespace(id=i, name=f'Exercise {i}', description='', category='strength',
+                               difficulty=rng.choice(EXPERIENCE_LEVELS)) for i in range(200)]
+    index = make_index(*catalog)
+    for _ in range(20):
+        history = {f'Exercise {i}': {'max_weight': 0, 'max_reps': 0, 'max_volume': 0,
+                                     'last_performed': NOW - timedelta(days=rng.randint(0, 14))}
+                   for i in rng.sample(range(200), 80)}
+        level = rng.choice(EXPERIENCE_LEVELS)
+        candidates = list(index.candidates('strength', level))
+        expected = sorted(range(len(candidates)), key=lambda i: (-score(candidates[i], level, history, NOW), i))[:3]
+        assert pick(index, 'strength', 3, level, history, NOW) == [candidates[i] for i in expected]
+
+
+def test_index_updates_incrementally():
+    """Test adding, moving and removing single catalog entries"""
+    index = make_index()
+    size = len(index)
+    entry = media_entry(SimpleNamespace(id=7, name='Rowing', description='', category='cardio', difficulty='beginner'))
+    index.upsert(entry)
+    index.upsert(dict(entry, difficulty='advanced'))
+    assert len(index) == size + 1
+    assert 'Rowing' not in [e['name'] for e in index.candidates('cardio', 'beginner')]
+    assert 'Rowing' in [e['name'] for e in index.candidates('cardio', 'advanced')]
+    index.remove(('media', 7))
+    assert len(index) == size
+
+
+def test_committed_catalog_changes_reach_the_index(app):
+    """Test that new ExerciseMedia rows are indexed on commit and discarded on rollback"""
+    with app.app_context():
+        current_exercise_index()
+        exercise = ExerciseMedia(name='Kettlebell Swings', description='Hip hinge', category='strength', difficulty='beginner')
+        db.session.add(exercise)
+        db.session.flush()
+        assert 'Kettlebell Swings' not in [e['name'] for e in exercise_index.candidates('strength', 'beginner')]
+        db.session.commit()
+        assert 'Kettlebell Swings' in [e['name'] for e in exercise_index.candidates('strength', 'beginner')]
+
+        db.session.delete(exercise)
+        db.session.commit()
+        assert 'Kettlebell Swings' not in [e['name'] for e in exercise_index.candidates('strength', 'beginner')]
+
+        db.session.add(ExerciseMedia(name='Sled Push', description='', category='strength', difficulty='beginner'))
+        db.session.flush()
+        db.session.rollback()
+        assert 'Sled Push' not in [e['name'] for e in exercise_index.candidates('strength', 'beginner')]
+
+
+def test_generated_workout_uses_logged_history(client, test_user):
+    """Test that the plan reacts to what the user just logged"""
+    client.post('/login', data={'username': 'testuser', 'password': 'testpass'})
+    client.post('/log_workout', json={'exercises': [
+        {'name': 'Cool-down: Forward Fold', 'sets': 1, 'reps': 30, 'weight': 0},
+        {'name': 'Push-ups', 'sets': 3, 'reps': 12, 'weight': 10}
+    ]})
+    exercise_index.rebuild(ExerciseMedia.query.all())
+
+    workout = build_workout_plan(test_user)
+    assert 'Forward Fold' not in main_names(workout)
+    assert 'Cat-Cow Stretch' in main_names(workout)
+    assert next(exercise for exercise in workout if exercise['name'] == 'Push-ups')['target_weight'] == 10.5
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+from flask import session
+
+from app import User, db, load_user, user_cache
+
+
+def test_user_loader_cached_between_requests(app, test_user):
+    """Test that authenticated requests don't query the user table each time"""
+    user_id = test_user.id
+    with app.test_request_context():
+        load_user(str(user_id))
+
+    with app.test_request_context(), patch('app.User.query') as query:
+        user = load_user(str(user_id))
+    query.get.assert_not_called()
+    assert user.username == 'testuser'
+    assert user.get_id() == str(user_id)
+
+
+def test_user_cache_invalidated_on_profile_change(app, test_user):
+    """Test that updating a user drops the cached copy"""
+    user_id = test_user.id
+    assert load_user(str(user_id)).fitness_goal == 'weight_loss'
+
+    user = User.query.get(user_id)
+    user.fitness_goal = 'muscle_gain'
+    db.session.commit()
+
+    assert user_id not in user_cache
+    assert load_user(str(user_id)).fitness_goal == 'muscle_gain'
+
+
+def test_user_snapshot_in_session(app, test_user, monkeypatch):
+    """Test that the session copy of the user skips the database in a fresh process"""
+    monkeypatch.setitem(app.config, 'USER_SESSION_SNAPSHOT', True)
+    user_id = test_user.id
+    with app.test_request_context():
+        load_user(str(user_id))
+        stored = dict(session['_user_snapshot'])
+    assert stored['experience_level'] == 'intermediate'
+
+    # Simulate another worker process with an empty cache
+    user_cache.clear()
+    with app.test_request_context(), patch('app.User.query') as query:
+        session['_user_snapshot'] = stored
+        user = load_user(str(user_id))
+    query.get.assert_not_called()
+    assert user.age == 25
@@ -1,6 +1,7 @@
 import pytest
-from app import User, get_ai_workout
+from app import User, get_ai_workout, get_health_tip, tip_cache
 from unittest.mock import patch, Mock
+from workout_plans import EXPERIENCE_LEVELS, FITNESS_GOALS, WorkoutPlanTable, build_plan
 
 
 @pytest.mark.huggingface
@@ -83,4 +84,37 @@ def test_workout_adaptation(client, app, test_user):
             # Validate the adapted workout
             for exercise in data['workout']['exercises']:
                 assert exercise['sets'] >= 1  # Ensure sets are valid
-                assert exercise['reps'] >= 1  # Ensure reps are valid
\ No newline at end of file
+                assert exercise['reps'] >= 1  # Ensure reps are valid
+
+def test_health_tip_cached_per_age_bucket():
+    """Test that users in the same age bracket and goal share a generated tip"""
+    tip_cache.clear()
+    with patch('app.tip_batcher') as mock_batcher:
+        mock_batcher.generate.return_value = 'Warm up before lifting.\nMore text'
+
+        assert get_health_tip(25, 'weight_loss') == 'Warm up before lifting.'
+        assert get_health_tip(29, 'Weight_Loss') == 'Warm up before lifting.'
+        get_health_tip(25, 'muscle_gain')
+
+    assert mock_batcher.generate.call_count == 2
+    tip_cache.clear()
+
+
+def test_precomputed_plans_match_reference():
+    """Test that table lookups return the same plans as building them per request"""
+    table = WorkoutPlanTable()
+    for goal in FITNESS_GOALS:
+        for level in EXPERIENCE_LEVELS:
+            assert table.get(goal, level) == build_plan(goal, level)
+    assert table.get('Weight_Loss', 'BEGINNER') == build_plan('weight_loss', 'beginner')
+    assert table.get('unknown', 'unknown') == build_plan('maintenance', 'intermediate')
+
+
+def test_precomputed_plans_are_read_only():
+    """Test that callers can't mutate plans shared between requests"""
+    table = WorkoutPlanTable()
+    plan = table.get('muscle_gain', 'advanced')
+    with pytest.raises(TypeError):
+        plan[0]['sets'] = 10
+    plan.append({'name': 'Health Tip: Rest well', 'sets': 0, 'reps': 0})
+    assert len(table.get('muscle_gain', 'advanced')) == len(plan) - 1
@@ -0,0 +1,136 @@
+"""Deterministic workout plans.
+
+A plan is a pure function of (fitness_goal, experience_level) and the
+exercise catalog, so every combination is built once up front and served
+from a lookup table. The table is rebuilt whenever the catalog changes.
+"""
+import threading
+
+# Exercise database organized by categories
+EXERCISE_DATABASE = {
+    'cardio': [
+        {'name': 'Jumping Jacks', 'sets': 3, 'reps': 20, 'description': 'Full body cardio exercise'},
+        {'name': 'Burpees', 'sets': 3, 'reps': 10, 'description': 'High-intensity full body movement'}
+    ],
+    'bodyweight': [
+        {'name': 'Push-ups', 'sets': 3, 'reps': 12, 'description': 'Upper body strength exercise'},
+        {'name': 'Squats', 'sets': 3, 'reps': 15, 'description': 'Lower body compound movement'}
+    ],
+    'strength': [
+        {'name': 'Dumbbell Rows', 'sets': 3, 'reps': 12, 'description': 'Back strength exercise'},
+        {'name': 'Shoulder Press', 'sets': 3, 'reps': 10, 'description': 'Upper body pushing movement'}
+    ],
+    'flexibility': [
+        {'name': 'Forward Fold', 'sets': 1, 'reps': 30, 'description': 'Hamstring and lower back stretch'},
+        {'name': 'Cat-Cow Stretch', 'sets': 1, 'reps': 10, 'description': 'Spine mobility exercise'}
+    ]
+}
+
+FITNESS_GOALS = ['weight_loss', 'muscle_gain', 'maintenance']
+EXPERIENCE_LEVELS = ['beginner', 'intermediate', 'advanced']
+
+
+def normalize_goal(fitness_goal):
+    goal = (fitness_goal or '').lower()
+    return goal if goal in FITNESS_GOALS else 'maintenance'
+
+
+def normalize_level(experience_level):
+    level = (experience_level or '').lower()
+    return level if level in EXPERIENCE_LEVELS else 'intermediate'
+
+
+def build_plan(fitness_goal, experience_level, catalog=EXERCISE_DATABASE):
+    """Build a plan from scratch - used to fill the table and as a reference."""
+    # Select exercises based on user's profile
+    workout_exercises = []
+
+    # Add warm-up exercises
+    warm_up = catalog['cardio'][:3]  # Select first 3 warm-up exercises
+    for exercise in warm_up:
+        workout_exercises.append({
+            'name': f" Warm-up: {exercise['name']}",
+            'sets': exercise['sets'],
+            'reps': exercise['reps']
+        })
+
+    # Select main exercises based on fitness goal
+    if fitness_goal.lower() == 'weight_loss':
+        # Focus on cardio and bodyweight
+        main_exercises = (
+            catalog['cardio'][:2] +  # 2 cardio exercises
+            catalog['bodyweight'][:2] +  # 2 bodyweight exercises
+            catalog['flexibility'][:1]  # 1 flexibility exercise
+        )
+    elif fitness_goal.lower() == 'muscle_gain':
+        # Focus on strength and bodyweight
+        main_exercises = (
+            catalog['strength'][:3] +  # 3 strength exercises
+            catalog['bodyweight'][:1] +  # 1 bodyweight exercise
+            catalog['flexibility'][:1]  # 1 flexibility exercise
+        )
+    else:  # maintenance
+        # Balanced mix
+        main_exercises = (
+            catalog['cardio'][:1] +  # 1 cardio exercise
+            catalog['bodyweight'][:2] +  # 2 bodyweight exercises
+            catalog['strength'][:1] +  # 1 strength exercise
+            catalog['flexibility'][:1]  # 1 flexibility exercise
+        )
+
+    # Adjust sets and reps based on experience level
+    for exercise in main_exercises:
+        adjusted_exercise = exercise.copy()
+        if experience_level.lower() == 'beginner':
+            adjusted_exercise['sets'] = min(exercise['sets'], 2)
+            adjusted_exercise['reps'] = int(exercise['reps'] * 0.7)
+        elif experience_level.lower() == 'advanced':
+            adjusted_exercise['sets'] = exercise['sets'] + 1
+            adjusted_exercise['reps'] = int(exercise['reps'] * 1.3)
+
+        workout_exercises.append(adjusted_exercise)
+
+    # Add cool-down exercises
+    cool_down = catalog['flexibility'][:3]  # Select first 3 cool-down exercises
+    for exercise in cool_down:
+        workout_exercises.append({
+            'name': f"Cool-down: {exercise['name']}",
+            'sets': exercise['sets'],
+            'reps': exercise['reps']
+        })
+
+    return workout_exercises
+
+
+class FrozenExercise(dict):
+    """A plan entry shared between requests; copy() it before changing anything."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Precomputed workout plans are read-only')
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def copy(self):
+        return dict(self)
+
+
+class WorkoutPlanTable:
+    def __init__(self, catalog=EXERCISE_DATABASE):
+        self._lock = threading.Lock()
+        self._plans = {}
+        self.rebuild(catalog)
+
+    def rebuild(self, catalog):
+        plans = {
+            (goal, level): tuple(FrozenExercise(exercise) for exercise in build_plan(goal, level, catalog))
+            for goal in FITNESS_GOALS
+            for level in EXPERIENCE_LEVELS
+        }
+        # Swap the whole table at once so readers never see a partial rebuild
+        with self._lock:
+            self._plans = plans
+
+    def get(self, fitness_goal, experience_level):
+        """Return the plan as a new list of shared, read-only exercise dicts."""
+        return list(self._plans[(normalize_goal(fitness_goal), normalize_level(experience_level))])